@@ -0,0 +1,201 @@
+"""
+Admission control for workflow runs.
+
+Every run fans requests back into this server, so a single user firing many concurrent runs
+degrades everybody's latency. `AdmissionController` guards `execute_workflow` with:
+
+- a per-user token bucket (sustained rate + burst);
+- a cap on concurrently executing runs per user and across the server;
+- a bounded priority queue for runs over a cap. Waiting is limited in time and per user;
+  beyond that, requests are rejected at once with `AdmissionRejected` (429 + Retry-After).
+
+Runs are admitted in priority order, first come first served within a priority. A waiter is
+skipped (not blocked on) while its own user is at the per-user cap.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+
+from . import metrics
+
+# --- Configuration ---
+# Sustained runs per second and burst size per user; a rate of 0 disables the rate limit.
+RATE_LIMIT_PER_SEC = float(os.getenv("NEUROGRID_RATE_LIMIT_PER_SEC", "2"))
+RATE_LIMIT_BURST = int(os.getenv("NEUROGRID_RATE_LIMIT_BURST", "10"))
+MAX_RUNS_PER_USER = int(os.getenv("NEUROGRID_MAX_RUNS_PER_USER", "4"))
+MAX_RUNS_GLOBAL = int(os.getenv("NEUROGRID_MAX_RUNS_GLOBAL", "32"))
+# Runs allowed to wait for a slot; 0 rejects immediately when a cap is reached.
+ADMISSION_QUEUE_SIZE = int(os.getenv("NEUROGRID_ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("NEUROGRID_ADMISSION_QUEUE_TIMEOUT", "30"))
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+MAX_TRACKED_USERS = 10000
+
+
+class AdmissionRejected(Exception):
+    """Raised when a run is rate limited, the queue is full, or it waited too long for a slot."""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Takes a token. Returns 0 on success, otherwise the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _Waiter:
+    __slots__ = ("user_id", "future")
+
+    def __init__(self, user_id: int, future: asyncio.Future):
+        self.user_id = user_id
+        self.future = future
+
+
+class AdmissionController:
+    def __init__(self, rate: float = RATE_LIMIT_PER_SEC, burst: int = RATE_LIMIT_BURST,
+                 per_user: int = MAX_RUNS_PER_USER, global_limit: int = MAX_RUNS_GLOBAL,
+                 max_queue: int = ADMISSION_QUEUE_SIZE, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.rate = rate
+        self.burst = burst
+        self.per_user = per_user
+        self.global_limit = global_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        # Only touched from the event loop, so no locking is needed.
+        self._buckets: OrderedDict[int, TokenBucket] = OrderedDict()
+        self._running = 0
+        self._running_by_user: Counter = Counter()
+        self._queued_by_user: Counter = Counter()
+        self._waiters: list = []
+        self._sequence = itertools.count()
+        self._avg_seconds = 1.0
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(self._queued_by_user.values())
+
+    def _estimate_wait(self) -> int:
+        """Seconds until a slot frees up for a request queued behind everything waiting now."""
+        rounds = (self.queue_depth + 1) / max(1, self.global_limit)
+        return max(1, math.ceil(self._avg_seconds * rounds))
+
+    def _check_rate(self, user_id: int):
+        if self.rate <= 0:
+            return
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.rate, self.burst)
+            while len(self._buckets) > MAX_TRACKED_USERS:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(user_id)
+        wait = bucket.take()
+        if wait:
+            metrics.admission_decisions.inc(result="rejected_rate")
+            raise AdmissionRejected(max(1, math.ceil(wait)), "Rate limit exceeded, retry later.")
+
+    def _can_run(self, user_id: int) -> bool:
+        return self._running < self.global_limit and self._running_by_user[user_id] < self.per_user
+
+    def _dequeue(self, user_id: int):
+        self._queued_by_user[user_id] -= 1
+        if self._queued_by_user[user_id] <= 0:
+            del self._queued_by_user[user_id]
+
+    def _grant(self, user_id: int):
+        self._running += 1
+        self._running_by_user[user_id] += 1
+
+    def _dispatch(self):
+        """Admits queued runs, highest priority first, while there are free slots."""
+        skipped = []
+        while self._waiters and self._running < self.global_limit:
+            entry = heapq.heappop(self._waiters)
+            waiter = entry[2]
+            if waiter.future.done():
+                continue
+            if not self._can_run(waiter.user_id):
+                skipped.append(entry)
+                continue
+            self._dequeue(waiter.user_id)
+            self._grant(waiter.user_id)
+            waiter.future.set_result(True)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    async def acquire(self, user_id: int, priority: str = "normal"):
+        """Waits for a run slot or raises `AdmissionRejected`."""
+        self._check_rate(user_id)
+        if self._can_run(user_id):
+            self._grant(user_id)
+            metrics.admission_decisions.inc(result="admitted")
+            return
+
+        if self.queue_depth >= self.max_queue or self._queued_by_user[user_id] >= self.per_user:
+            metrics.admission_decisions.inc(result="rejected_queue_full")
+            raise AdmissionRejected(self._estimate_wait(), "Too many concurrent workflow runs, retry later.")
+
+        waiter = _Waiter(user_id, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, (PRIORITIES.get(priority, PRIORITIES["normal"]), next(self._sequence), waiter))
+        self._queued_by_user[user_id] += 1
+        metrics.admission_decisions.inc(result="queued")
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as we gave up: hand the slot on.
+                self.release(user_id)
+            else:
+                waiter.future.cancel()
+                self._dequeue(user_id)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            metrics.admission_decisions.inc(result="rejected_timeout")
+            raise AdmissionRejected(self._estimate_wait(), "Timed out waiting for a workflow slot, retry later.")
+
+    def release(self, user_id: int, seconds: float | None = None):
+        self._running -= 1
+        self._running_by_user[user_id] -= 1
+        if self._running_by_user[user_id] <= 0:
+            del self._running_by_user[user_id]
+        if seconds is not None:
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * seconds
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, user_id: int, priority: str = "normal"):
+        """Holds a run slot for the duration of the block."""
+        await self.acquire(user_id, priority)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(user_id, time.perf_counter() - started)
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,113 @@
+"""
+Concurrent-write benchmark for WorkflowRun inserts.
+
+Runs the same insert workload against a fresh SQLite file once per PRAGMA profile
+and reports throughput, commit latency percentiles and lock errors.
+
+    python -m neogrid.backend.benchmarks.db_writes --threads 8 --inserts 200
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from ..database import database, models
+from .stats import percentile
+
+# "baseline" mirrors the previous bare create_engine() setup: rollback journal,
+# full fsync on every commit and only the driver's default lock wait.
+PROFILES = {
+    "baseline": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    "tuned": database.SQLITE_PRAGMAS,
+}
+
+
+def run_profile(name: str, pragmas: dict, threads: int, inserts: int, payload_bytes: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        engine = database.build_engine(url, pool_size=threads, max_overflow=0, sqlite_pragmas=pragmas)
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        with Session() as db:
+            user = models.User(username="bench", hashed_password="x")
+            db.add(user)
+            db.flush()
+            workflow = models.Workflow(name="bench", config_json={}, user_id=user.id)
+            db.add(workflow)
+            db.commit()
+            workflow_id = workflow.id
+
+        output = {"output": "x" * payload_bytes}
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def writer():
+            local_latencies = []
+            local_errors = 0
+            with Session() as db:
+                for _ in range(inserts):
+                    start = time.perf_counter()
+                    try:
+                        db.add(models.WorkflowRun(workflow_id=workflow_id, input_json={}, output_json=output))
+                        db.commit()
+                        local_latencies.append(time.perf_counter() - start)
+                    except OperationalError:
+                        db.rollback()
+                        local_errors += 1
+            with lock:
+                latencies.extend(local_latencies)
+                errors.append(local_errors)
+
+        workers = [threading.Thread(target=writer) for _ in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    return {
+        "profile": name,
+        "threads": threads,
+        "attempted": threads * inserts,
+        "committed": len(latencies),
+        "lock_errors": sum(errors),
+        "inserts_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "commit_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark concurrent WorkflowRun inserts on SQLite.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--inserts", type=int, default=200, help="Inserts per thread.")
+    parser.add_argument("--payload-bytes", type=int, default=2048)
+    parser.add_argument("--profile", choices=sorted(PROFILES), action="append",
+                        help="Profile(s) to run; defaults to all.")
+    args = parser.parse_args(argv)
+
+    results = [
+        run_profile(name, PROFILES[name], args.threads, args.inserts, args.payload_bytes)
+        for name in (args.profile or PROFILES)
+    ]
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
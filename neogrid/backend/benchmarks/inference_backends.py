@@ -0,0 +1,113 @@
+"""
+Latency comparison of the inference backends on CPU.
+
+Loads the sentiment and summarizer models with the PyTorch (`transformers`) backend and with
+the ONNX Runtime backend, then measures single-item latency over the evaluation sets in
+`benchmarks/data/` and batched latency for a few batch sizes. The ONNX models must have been
+exported to NEUROGRID_ONNX_MODEL_DIR first (see `inference_backends`). Needs torch,
+optimum[onnxruntime] and the model weights.
+
+    python -m neogrid.backend.benchmarks.inference_backends --threads 4 --batch-size 8 --batch-size 32
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from .db_writes import percentile
+from .quantization import MODELS, load_eval_set
+from .. import inference_backends, model_runtime
+
+SUMMARY_ARGS = {"max_length": 130, "min_length": 30, "do_sample": False}
+
+
+def _latency_ms(latencies):
+    return {
+        "p50": round(percentile(latencies, 50) * 1000, 2),
+        "p95": round(percentile(latencies, 95) * 1000, 2),
+        "mean": round(statistics.fmean(latencies) * 1000, 2),
+    }
+
+
+def run_backend(node_type: str, backend: str, threads: int, repeats: int, batch_sizes) -> dict:
+    task, model = MODELS[node_type]
+    model_runtime.TORCH_THREADS["*"] = threads
+    pipe = inference_backends.load_pipeline(node_type, task, model, backend=backend)
+    texts = [item["text"] for item in load_eval_set("summarization" if node_type == "summarizer" else "sentiment")]
+    kwargs = SUMMARY_ARGS if node_type == "summarizer" else {}
+
+    def call(batch):
+        with model_runtime.inference_mode(node_type):
+            return pipe(batch, batch_size=len(batch), **kwargs)
+
+    call(texts[:1])  # warm-up
+    single = []
+    for _ in range(repeats):
+        for text in texts:
+            started = time.perf_counter()
+            call([text])
+            single.append(time.perf_counter() - started)
+
+    batched = {}
+    for size in batch_sizes:
+        batch = (texts * (size // len(texts) + 1))[:size]
+        latencies = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            call(batch)
+            latencies.append(time.perf_counter() - started)
+        batched[str(size)] = {
+            "latency_ms": _latency_ms(latencies),
+            "items_per_sec": round(size * len(latencies) / sum(latencies), 2),
+        }
+
+    return {
+        "node_type": node_type,
+        "backend": backend,
+        "threads": threads,
+        "single_latency_ms": _latency_ms(single),
+        "batched": batched,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the PyTorch and ONNX Runtime backends on CPU.")
+    parser.add_argument("--node", choices=sorted(MODELS), action="append", help="Defaults to all.")
+    parser.add_argument("--threads", type=int, default=1, help="Intra-op threads per model.")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over each measurement.")
+    parser.add_argument("--batch-size", type=int, action="append", help="Defaults to 8 and 32.")
+    parser.add_argument("--output", help="Write the report JSON here.")
+    args = parser.parse_args(argv)
+
+    missing = [name for name in ("torch", "onnxruntime", "optimum") if not _importable(name)]
+    if missing:
+        parser.exit(2, f"This report needs {', '.join(missing)}: pip install torch optimum[onnxruntime]\n")
+
+    report = []
+    for node_type in args.node or MODELS:
+        rows = [run_backend(node_type, backend, args.threads, args.repeats, args.batch_size or [8, 32])
+                for backend in inference_backends.BACKENDS]
+        baseline = rows[0]["single_latency_ms"]["mean"]
+        for row in rows:
+            mean = row["single_latency_ms"]["mean"]
+            row["single_speedup_vs_transformers"] = round(baseline / mean, 2) if mean else 0.0
+        report.extend(rows)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+def _importable(name: str) -> bool:
+    try:
+        __import__(name)
+    except ImportError:
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Response encoding of multi-megabyte results: FastAPI's default path vs. `serialization`.
+
+Builds run outputs of several sizes (records with a sentiment result each, like a batch
+workflow produces) and measures, through an in-process ASGI app, the request latency of:
+
+- `run/default`: returning `schemas.WorkflowRun`, which FastAPI validates and serializes;
+- `run/raw`: the encoded record sent as a `RawJSONResponse`, as the run endpoints do now;
+- `node/default`: a node-style dict, which goes through `jsonable_encoder` and `json.dumps`;
+- `node/fast`: the same dict as a `FastJSONResponse`, as `tracing.traced_node` returns it;
+
+and, on the engine side, parsing a node response with `httpx.Response.json()` vs.
+`serialization.loads`.
+
+    python -m neogrid.backend.benchmarks.json_encoding --size-mb 1 --size-mb 8 --size-mb 32
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from .. import serialization
+from ..database import schemas
+from .db_writes import percentile
+
+
+def run_output(size_mb: float) -> dict:
+    """A run output of roughly `size_mb` MB of JSON."""
+    record = {"text": "The new release is fast and pleasant to use, although the docs lag behind. " * 2,
+              "label": "POSITIVE", "score": 0.9876543, "tokens": 38, "flags": [True, False, None]}
+    count = max(1, int(size_mb * 1024 * 1024 / len(json.dumps(record))))
+    return {
+        "sent": {"output": [{**record, "id": i} for i in range(count)],
+                 "_execution_metadata": {"node_type": "sentiment", "status": "success", "timing": {"wall_ms": 1.0}}},
+        "_run_metadata": {"status": "success", "wall_ms": 1.0},
+    }
+
+
+def _app(output: dict) -> FastAPI:
+    app = FastAPI()
+    record = {"id": 1, "workflow_id": 1, "created_at": datetime.datetime(2024, 1, 1), "input_json": {},
+              "output_json": output, "output_ref": None, "output_size": None}
+
+    @app.get("/run/default", response_model=schemas.WorkflowRun)
+    async def run_default():
+        return schemas.WorkflowRun(**record)
+
+    @app.get("/run/raw", response_model=schemas.WorkflowRun)
+    async def run_raw():
+        return serialization.RawJSONResponse(serialization.dumps(record))
+
+    @app.get("/node/default")
+    def node_default():
+        return output["sent"]
+
+    @app.get("/node/fast")
+    def node_fast():
+        return serialization.FastJSONResponse(output["sent"])
+
+    return app
+
+
+def _summary(latencies) -> dict:
+    return {"p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2)}
+
+
+async def measure(size_mb: float, repeat: int) -> dict:
+    output = run_output(size_mb)
+    row = {"size_mb": size_mb, "scenarios": {}}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=_app(output)), base_url="http://bench") as client:
+        for path in ("/run/default", "/run/raw", "/node/default", "/node/fast"):
+            latencies = []
+            for _ in range(repeat + 1):
+                started = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            row["scenarios"][path.strip("/")] = {**_summary(latencies[1:]), "bytes": len(response.content)}
+
+        response = await client.get("/node/fast")
+    for name, parse in (("parse/httpx_json", lambda: response.json()),
+                        ("parse/fast", lambda: serialization.loads(response.content))):
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            parse()
+            latencies.append(time.perf_counter() - started)
+        row["scenarios"][name] = _summary(latencies)
+
+    scenarios = row["scenarios"]
+    row["speedup"] = {
+        "run": round(scenarios["run/default"]["p50_ms"] / scenarios["run/raw"]["p50_ms"], 2),
+        "node": round(scenarios["node/default"]["p50_ms"] / scenarios["node/fast"]["p50_ms"], 2),
+        "parse": round(scenarios["parse/httpx_json"]["p50_ms"] / scenarios["parse/fast"]["p50_ms"], 2),
+    }
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare JSON response encoding of large run outputs.")
+    parser.add_argument("--size-mb", type=float, action="append", help="Output sizes to test (default 1, 8, 32).")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="Write the report JSON here.")
+    args = parser.parse_args(argv)
+
+    report = {
+        "encoder": "orjson" if serialization.orjson is not None else "json",
+        "results": [asyncio.run(measure(size, args.repeat)) for size in args.size_mb or [1, 8, 32]],
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
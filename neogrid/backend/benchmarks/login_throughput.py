@@ -0,0 +1,87 @@
+"""
+Login throughput under concurrent load.
+
+Registers a set of users against a throwaway database, then fires concurrent /auth/login
+requests through the ASGI app in-process and reports throughput, latency percentiles and how
+many requests were shed with 429. Argon2 cost and pool size come from the usual
+NEUROGRID_ARGON2_* / NEUROGRID_HASH_* environment variables, so runs are easy to compare:
+
+    NEUROGRID_HASH_WORKERS=4 python -m neogrid.backend.benchmarks.login_throughput --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from .stats import percentile
+
+
+async def _run(concurrency: int, total: int, users: int) -> dict:
+    import httpx
+    from ..hashing import password_hasher
+    from ..main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = [{"username": f"bench-{i}", "password": f"pw-{i}-secret"} for i in range(users)]
+        for creds in credentials:
+            # Registration is throttled by the same pool; retry until accepted.
+            while (await client.post("/auth/register", json=creds)).status_code == 429:
+                await asyncio.sleep(0.05)
+
+        latencies = []
+        statuses = {}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def login(i: int):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/auth/login", json=credentials[i % users])
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    accepted = statuses.get(200, 0)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "hash_workers": password_hasher.workers,
+        "max_pending": password_hasher.max_pending,
+        "statuses": statuses,
+        "logins_per_sec": round(accepted / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark /auth/login throughput under concurrent load.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    # The engine is built when the database module is first imported, so the throwaway
+    # database must be configured before then; the app is only imported in _run().
+    if "neogrid.backend.database.database" in sys.modules:
+        parser.exit(1, "Error: the database was imported before the benchmark could point it at a temp file.\n")
+    tmp = tempfile.mkdtemp(prefix="neurogrid-login-bench-")
+    os.environ["NEUROGRID_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    result = asyncio.run(_run(args.concurrency, args.requests, args.users))
+    print(json.dumps(result, indent=2))
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Memory per worker vs. throughput of the multi-process serving modes.
+
+Starts the API as real processes in two modes and compares them at several worker counts:
+
+- `uvicorn`: `uvicorn --workers N`, where every worker loads its own copy of the model;
+- `preload`: `python -m neogrid.backend.serve`, which loads the model once and forks the
+  workers so they share it copy-on-write.
+
+For each run it warms up every worker, then measures requests/sec and latency of the node's
+`/infer` with concurrent clients. It also reads the memory of every process from
+`/proc/<pid>/smaps_rollup`:
+
+- RSS counts shared pages in full;
+- PSS splits shared pages between the processes sharing them;
+- USS counts only a process's private pages.
+
+The sum of PSS over all processes is what the machine actually spends. Linux only. Needs
+torch and the model weights.
+
+    python -m neogrid.backend.benchmarks.prefork --node sentiment --workers 1 --workers 2 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .db_writes import percentile
+
+PAYLOADS = {
+    "sentiment": lambda i: {"input": f"Review {i}: the new release is fast and pleasant to use."},
+    "summarizer": lambda i: {"input": f"Report {i}. " + "NeuroGrid lets you wire AI models into workflows. " * 30},
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _command(mode: str, node_type: str, workers: int, port: int):
+    if mode == "uvicorn":
+        return [sys.executable, "-m", "uvicorn", "neogrid.backend.main:app", "--port", str(port),
+                "--workers", str(workers), "--log-level", "warning"]
+    return [sys.executable, "-m", "neogrid.backend.serve", "--port", str(port), "--workers", str(workers),
+            "--preload", node_type, "--log-level", "warning"]
+
+
+def process_memory(pid: int) -> dict:
+    """RSS, PSS and USS of a process in MiB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(":")] = int(parts[1])
+    mib = lambda kib: round(kib / 1024, 1)
+    return {
+        "rss_mib": mib(values.get("Rss", 0)),
+        "pss_mib": mib(values.get("Pss", 0)),
+        "uss_mib": mib(values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)),
+    }
+
+
+def _descendants(pid: int) -> list:
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(child) for child in f.read().split())
+    return children + [grandchild for child in children for grandchild in _descendants(child)]
+
+
+async def _load(base_url: str, node_type: str, requests: int, concurrency: int, offset: int = 0):
+    latencies = []
+    counter = iter(range(offset, offset + requests))
+
+    async def client_loop(client):
+        for i in counter:
+            started = time.perf_counter()
+            response = await client.post(f"/nodes/{node_type}/infer", json=PAYLOADS[node_type](i))
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*[client_loop(client) for _ in range(concurrency)])
+        return latencies, time.perf_counter() - started
+
+
+def run_mode(mode: str, node_type: str, workers: int, requests: int, concurrency: int) -> dict:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    workdir = tempfile.mkdtemp(prefix="neurogrid-prefork-")
+    env = {**os.environ, "NEUROGRID_DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+           "NEUROGRID_BLOB_DIR": os.path.join(workdir, "blobs")}
+    server = subprocess.Popen(_command(mode, node_type, workers, port), env=env)
+    try:
+        started = time.perf_counter()
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"{mode} server exited with {server.returncode}")
+            try:
+                if httpx.get(base_url + "/", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.perf_counter() - started > 600:
+                raise RuntimeError(f"{mode} server did not come up")
+            time.sleep(0.5)
+        startup_s = time.perf_counter() - started
+
+        # Enough concurrent requests that every worker serves (and in uvicorn mode loads) the model.
+        asyncio.run(_load(base_url, node_type, workers * 8, workers * 4))
+        latencies, elapsed = asyncio.run(_load(base_url, node_type, requests, concurrency, offset=10_000))
+
+        processes = [server.pid] + _descendants(server.pid)
+        memory = {pid: process_memory(pid) for pid in processes}
+        return {
+            "mode": mode,
+            "node_type": node_type,
+            "workers": workers,
+            "startup_s": round(startup_s, 2),
+            "requests_per_sec": round(len(latencies) / elapsed, 2),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 2),
+                "p95": round(percentile(latencies, 95) * 1000, 2),
+                "mean": round(statistics.fmean(latencies) * 1000, 2),
+            },
+            "processes": [{"pid": pid, "role": "parent" if pid == server.pid else "child", **memory[pid]}
+                          for pid in processes],
+            "total_pss_mib": round(sum(m["pss_mib"] for m in memory.values()), 1),
+            "pss_per_worker_mib": round(sum(m["pss_mib"] for m in memory.values()) / workers, 1),
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare memory and throughput of uvicorn workers and pre-forked workers.")
+    parser.add_argument("--node", choices=sorted(PAYLOADS), default="sentiment")
+    parser.add_argument("--workers", type=int, action="append", help="Worker counts to compare (default 1, 2, 4).")
+    parser.add_argument("--mode", choices=("uvicorn", "preload"), action="append", help="Defaults to both.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--output", help="Write the report JSON here.")
+    args = parser.parse_args(argv)
+
+    if not sys.platform.startswith("linux"):
+        parser.exit(2, "This report reads /proc and only runs on Linux.\n")
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        parser.exit(2, "This report needs torch: pip install torch --index-url https://download.pytorch.org/whl/cpu\n")
+
+    report = [run_mode(mode, args.node, workers, args.requests, args.concurrency)
+              for workers in args.workers or [1, 2, 4]
+              for mode in args.mode or ["uvicorn", "preload"]]
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
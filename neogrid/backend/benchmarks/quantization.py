@@ -0,0 +1,145 @@
+"""
+Accuracy-vs-latency report for the optimized CPU mode.
+
+Loads the sentiment and summarizer models once per mode (fp32 and dynamic int8) and runs them
+over the fixed evaluation sets in `benchmarks/data/`. Reports latency percentiles, throughput
+per core, sentiment accuracy against the labels and ROUGE-L F1 of summaries against the
+references. Agreement with the fp32 outputs is reported as well. Needs torch and the model
+weights (downloaded on first use).
+
+    python -m neogrid.backend.benchmarks.quantization --threads 4 --output quantization.json
+"""
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from .db_writes import percentile
+from .. import model_runtime
+
+DATA_DIR = Path(__file__).parent / "data"
+MODELS = {
+    "sentiment": ("sentiment-analysis", "distilbert-base-uncased-finetuned-sst-2-english"),
+    "summarizer": ("summarization", "facebook/bart-large-cnn"),
+}
+MODES = {"fp32": False, "int8": True}
+
+
+def load_eval_set(name: str):
+    with open(DATA_DIR / f"{name}_eval.jsonl") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def rouge_l(candidate: str, reference: str) -> float:
+    """ROUGE-L F1 on lowercase word tokens (longest common subsequence)."""
+    a, b = candidate.lower().split(), reference.lower().split()
+    if not a or not b:
+        return 0.0
+    previous = [0] * (len(b) + 1)
+    for word in a:
+        current = [0]
+        for j, other in enumerate(b):
+            current.append(previous[j] + 1 if word == other else max(previous[j + 1], current[j]))
+        previous = current
+    lcs = previous[-1]
+    if not lcs:
+        return 0.0
+    precision, recall = lcs / len(a), lcs / len(b)
+    return 2 * precision * recall / (precision + recall)
+
+
+def _timed_outputs(call, items, repeats: int):
+    outputs, latencies = [], []
+    for _ in range(repeats):
+        outputs = []
+        for item in items:
+            started = time.perf_counter()
+            outputs.append(call(item))
+            latencies.append(time.perf_counter() - started)
+    return outputs, latencies
+
+
+def run_mode(node_type: str, mode: str, threads: int, repeats: int) -> dict:
+    import torch
+    from transformers import pipeline
+
+    task, model = MODELS[node_type]
+    torch.set_num_threads(threads)
+    pipe = model_runtime.optimize_pipeline(pipeline(task, model=model), node_type, quantize=MODES[mode])
+
+    if node_type == "sentiment":
+        items = load_eval_set("sentiment")
+
+        def call(item):
+            with torch.inference_mode():
+                return pipe(item["text"])[0]["label"]
+    else:
+        items = load_eval_set("summarization")
+
+        def call(item):
+            with torch.inference_mode():
+                return pipe(item["text"], max_length=130, min_length=30, do_sample=False)[0]["summary_text"]
+
+    call(items[0])  # warm-up
+    outputs, latencies = _timed_outputs(call, items, repeats)
+    total = sum(latencies)
+    result = {
+        "node_type": node_type,
+        "mode": mode,
+        "threads": threads,
+        "items": len(items),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "mean": round(statistics.fmean(latencies) * 1000, 2),
+        },
+        "items_per_sec_per_core": round(len(latencies) / total / threads, 3) if total else 0.0,
+        "outputs": outputs,
+    }
+    if node_type == "sentiment":
+        result["accuracy"] = round(sum(o == i["label"] for o, i in zip(outputs, items)) / len(items), 4)
+    else:
+        result["rouge_l"] = round(statistics.fmean(rouge_l(o, i["reference"]) for o, i in zip(outputs, items)), 4)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare fp32 and dynamic int8 CPU inference.")
+    parser.add_argument("--node", choices=sorted(MODELS), action="append", help="Defaults to all.")
+    parser.add_argument("--threads", type=int, default=1, help="Intra-op threads per model.")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the evaluation set.")
+    parser.add_argument("--output", help="Write the report JSON here.")
+    args = parser.parse_args(argv)
+
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        parser.exit(2, "This report needs torch: pip install torch --index-url https://download.pytorch.org/whl/cpu\n")
+
+    report = []
+    for node_type in args.node or MODELS:
+        rows = {mode: run_mode(node_type, mode, args.threads, args.repeats) for mode in MODES}
+        baseline = rows["fp32"]
+        baseline_outputs = baseline["outputs"]
+        for row in rows.values():
+            outputs = row.pop("outputs")
+            row["agreement_with_fp32"] = round(
+                statistics.fmean(
+                    (o == b) if node_type == "sentiment" else rouge_l(o, b)
+                    for o, b in zip(outputs, baseline_outputs)),
+                4)
+            row["speedup_vs_fp32"] = round(
+                baseline["latency_ms"]["mean"] / row["latency_ms"]["mean"], 2) if row["latency_ms"]["mean"] else 0.0
+            report.append(row)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
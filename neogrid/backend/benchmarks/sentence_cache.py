@@ -0,0 +1,81 @@
+"""
+Model inputs of the sentiment node with and without the sentence cache on templated text.
+
+Generates support-ticket style documents that share a greeting and a signature and differ in one
+templated sentence, and scores them in batches through the sentiment node twice: once a
+document at a time and once sentence by sentence against an empty, memory-only sentence cache.
+The model is a stub that counts the texts it is given, so the report is about how much model
+work the cache saves, not about latency.
+
+    python -m neogrid.backend.benchmarks.sentence_cache --docs 2000 --batch 100
+"""
+
+import argparse
+import json
+import random
+
+from .. import sentence_cache, text_batching
+from ..nodes import sentiment
+from .stubs import StubPipeline, stub_sentiment
+
+
+class CountingPipeline(StubPipeline):
+    """Stub pipeline that also counts the texts passed to it."""
+
+    def __init__(self):
+        super().__init__(stub_sentiment)
+        self.inputs = 0
+
+    def __call__(self, inputs, **kwargs):
+        self.inputs += len(inputs) if isinstance(inputs, list) else 1
+        return super().__call__(inputs, **kwargs)
+
+
+def templated_documents(count: int, orders: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [f"Hi team, thanks for reaching out. Order {rng.randint(0, orders)} arrived late. "
+            f"Best regards, Support." for _ in range(count)]
+
+
+def run(docs: int, batch: int, orders: int, seed: int) -> dict:
+    documents = templated_documents(docs, orders, seed)
+    batches = [documents[i:i + batch] for i in range(0, len(documents), batch)]
+    original = sentiment.sentiment_analyzer_pipeline
+    report = {"documents": docs, "batch": batch,
+              "sentences": sum(len(sentence_cache.split_sentences(d)) for d in documents)}
+    try:
+        sentiment.sentiment_analyzer_pipeline = pipeline = CountingPipeline()
+        for texts in batches:
+            text_batching.run_batched(pipeline, texts, "sentiment", combine=sentiment.combine_chunk_sentiments)
+        report["model_inputs_per_document"] = pipeline.inputs
+
+        sentiment.sentiment_analyzer_pipeline = pipeline = CountingPipeline()
+        cache = sentence_cache.SentenceCache("")
+        for texts in batches:
+            sentiment.analyze_by_sentence(texts, cache=cache)
+        report["model_inputs_sentence_cache"] = pipeline.inputs
+    finally:
+        sentiment.sentiment_analyzer_pipeline = original
+    report["sentences_scored_share"] = round(report["model_inputs_sentence_cache"] / report["sentences"], 3)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count sentiment model inputs with and without the sentence cache.")
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=100, help="Documents per request.")
+    parser.add_argument("--orders", type=int, default=3000, help="Order numbers the templated sentence draws from.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the report JSON here.")
+    args = parser.parse_args(argv)
+
+    report = run(args.docs, args.batch, args.orders, args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Summary statistics shared by the benchmarks.
+
+Kept free of app imports: benchmarks that point the app at a throwaway database must set
+NEUROGRID_DATABASE_URL before `..database.database` is first imported, because the engine is
+built at import time.
+"""
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
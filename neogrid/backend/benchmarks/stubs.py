@@ -0,0 +1,83 @@
+"""
+Offline stand-ins for the transformers pipelines.
+
+`install_stub_pipelines()` puts stub pipelines into the nodes' lazily loaded module globals
+(and stubs the image download), so node and workflow benchmarks run without model weights or
+network access. Each stub sleeps for a fixed "inference" latency, which keeps the numbers
+about the serving path - routing, (de)serialization, the engine - rather than the model.
+"""
+
+import time
+from contextlib import contextmanager
+from io import BytesIO
+
+
+class StubPipeline:
+    """Callable with the calling convention of a transformers pipeline."""
+
+    def __init__(self, make_output, latency_ms: float = 0.0):
+        self.make_output = make_output
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def __call__(self, inputs, **kwargs):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if isinstance(inputs, list):
+            return [self.make_output(item) for item in inputs]
+        return [self.make_output(inputs)]
+
+
+def stub_sentiment(text):
+    """Stub sentiment result: NEGATIVE for texts with a negative keyword, POSITIVE otherwise."""
+    text = str(text)
+    negative = any(word in text.lower() for word in ("bad", "terrible", "disappointed", "awful"))
+    return {"label": "NEGATIVE" if negative else "POSITIVE", "score": 0.99}
+
+
+def _summary(text):
+    return {"summary_text": " ".join(str(text).split()[:30])}
+
+
+def _caption(image):
+    return {"generated_text": f"a stub caption of a {image.size[0]}x{image.size[1]} image"}
+
+
+def _png_bytes(size=(64, 64)) -> bytes:
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGB", size, (120, 80, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class _StubResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+
+@contextmanager
+def install_stub_pipelines(latency_ms: float = 5.0):
+    """Swaps every model node's pipeline (and the image fetch) for stubs while active."""
+    from ..nodes import image_caption, sentiment, summarizer
+
+    image = _png_bytes()
+    patches = [
+        (sentiment, "sentiment_analyzer_pipeline", StubPipeline(stub_sentiment, latency_ms)),
+        (summarizer, "summarizer_pipeline", StubPipeline(_summary, latency_ms)),
+        (image_caption, "captioner_pipeline", StubPipeline(_caption, latency_ms)),
+        (image_caption.requests, "get", lambda url, **kwargs: _StubResponse(image)),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, stub in patches:
+        setattr(module, name, stub)
+    try:
+        yield {name: stub for _, name, stub in patches}
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
@@ -0,0 +1,284 @@
+"""
+Benchmark suite for the node endpoints and the workflow engine.
+
+Measures throughput and p50/p95/p99 latency of every node's `/infer`, of representative
+DAGs run through `WorkflowEngine`, and of the preprocessing/postprocessing nodes at several
+data sizes. Everything runs in-process against the ASGI app with stub model pipelines (see
+`stubs.py`), so the suite works offline and in CI. Results are JSON; passing `--baseline`
+compares against a saved run and exits non-zero when a scenario regressed.
+
+    python -m neogrid.backend.benchmarks --output bench.json
+    python -m neogrid.backend.benchmarks --baseline bench.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from .stats import percentile
+from .stubs import install_stub_pipelines
+
+SAMPLE_TEXT = (
+    "NeuroGrid lets you wire AI models into workflows. The new release is fast and pleasant "
+    "to use, although the documentation could still be better in a few places. "
+)
+
+NODE_PAYLOADS = {
+    "input_node": {"input": "a,b\n1,2\n3,4\n", "input_type": "csv"},
+    "preprocessing_node": {"input": SAMPLE_TEXT * 4, "operations": ["clean_text"]},
+    "sentiment": {"input": SAMPLE_TEXT},
+    "summarizer": {"input": SAMPLE_TEXT * 8},
+    "image_caption": {"input": "http://stub.invalid/image.png"},
+    "code_analyzer": {"input": "import os\n\nclass A:\n    def f(self):\n        return os.sep\n" * 10},
+    "postprocessing_node": {"input": {"label": "POSITIVE", "score": 0.98}, "operations": ["format"],
+                            "format_type": "classification"},
+    "output_node": {"input": {"text": SAMPLE_TEXT}, "output_format": "json"},
+}
+
+DATA_SIZES = (10, 100, 1000)
+
+
+def _node(node_id: str, node_type: str, **params) -> Dict[str, Any]:
+    return {"id": node_id, "data": {"nodeType": node_type, "params": params}}
+
+
+def _edges(*pairs) -> List[Dict[str, str]]:
+    return [{"source": source, "target": target} for source, target in pairs]
+
+
+# Representative workflows: a linear text pipeline, a fan-out/fan-in and a short code check.
+DAGS = {
+    "text_pipeline": {
+        "nodes": [
+            _node("in", "input_node"),
+            _node("clean", "preprocessing_node", operations=["clean_text"]),
+            _node("sentiment", "sentiment"),
+            _node("post", "postprocessing_node", operations=["format"], format_type="classification"),
+            _node("out", "output_node"),
+        ],
+        "edges": _edges(("in", "clean"), ("clean", "sentiment"), ("sentiment", "post"), ("post", "out")),
+        "inputs": {"in": SAMPLE_TEXT * 4},
+    },
+    "fan_in": {
+        "nodes": [
+            _node("in", "input_node"),
+            _node("summary", "summarizer"),
+            _node("sentiment", "sentiment"),
+            _node("post", "postprocessing_node", operations=["aggregate", "format"]),
+            _node("out", "output_node"),
+        ],
+        "edges": _edges(("in", "summary"), ("in", "sentiment"), ("summary", "post"), ("sentiment", "post"),
+                        ("post", "out")),
+        "inputs": {"in": SAMPLE_TEXT * 8},
+    },
+    "code_check": {
+        "nodes": [_node("code", "code_analyzer"), _node("out", "output_node")],
+        "edges": _edges(("code", "out")),
+        "inputs": {"code": NODE_PAYLOADS["code_analyzer"]["input"]},
+    },
+}
+
+
+def records(count: int) -> List[Dict[str, Any]]:
+    """Synthetic tabular records for the preprocessing/postprocessing size sweep."""
+    return [
+        {"id": i, "text": f"  Record #{i}: Some TEXT, with punctuation!!  ", "value": str(i * 1.5),
+         "score": (i % 100) / 100}
+        for i in range(count)
+    ]
+
+
+def summarize(name: str, latencies: List[float], elapsed: float, errors: int) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "iterations": len(latencies),
+        "errors": errors,
+        "throughput_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+async def measure(name: str, call: Callable[[], Awaitable[bool]], iterations: int, warmup: int,
+                  concurrency: int) -> Dict[str, Any]:
+    """Runs `call` (which returns False on failure) and summarizes latency and throughput."""
+    for _ in range(warmup):
+        await call()
+
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            ok = await call()
+            latencies.append(time.perf_counter() - started)
+            errors += 0 if ok else 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(iterations)))
+    return summarize(name, latencies, time.perf_counter() - started, errors)
+
+
+async def run_suite(iterations: int = 50, warmup: int = 3, concurrency: int = 1,
+                    stub_latency_ms: float = 5.0, only: List[str] | None = None) -> Dict[str, Any]:
+    import httpx
+    from ..database import database
+    from ..main import app
+    from ..workflow_engine import WorkflowEngine
+
+    def selected(name: str) -> bool:
+        return not only or any(name.startswith(prefix) for prefix in only)
+
+    scenarios = []
+    transport = httpx.ASGITransport(app=app)
+    engine = WorkflowEngine(base_url="http://bench", transport=transport)
+
+    with install_stub_pipelines(stub_latency_ms):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            def node_call(node_type, payload):
+                async def call():
+                    response = await client.post(f"/nodes/{node_type}/infer", json=payload)
+                    return response.status_code == 200
+                return call
+
+            for node_type, payload in NODE_PAYLOADS.items():
+                name = f"node/{node_type}"
+                if selected(name):
+                    scenarios.append(await measure(name, node_call(node_type, payload), iterations, warmup,
+                                                   concurrency))
+
+            for size in DATA_SIZES:
+                data = records(size)
+                sweeps = {
+                    f"preprocessing/records={size}": ("preprocessing_node", {
+                        "input": {"data": data, "type": "records"},
+                        "operations": ["clean_text", "normalize_numbers", "remove_empty"],
+                    }),
+                    f"postprocessing/records={size}": ("postprocessing_node", {
+                        "input": {"data": data}, "operations": ["confidence_filter", "format"],
+                        "confidence_threshold": 0.5,
+                    }),
+                }
+                for name, (node_type, payload) in sweeps.items():
+                    if selected(name):
+                        scenarios.append(await measure(name, node_call(node_type, payload), iterations, warmup,
+                                                       concurrency))
+
+        for dag_name, dag in DAGS.items():
+            name = f"dag/{dag_name}"
+            if not selected(name):
+                continue
+
+            async def dag_call(dag=dag):
+                results = await engine.execute_workflow(dag["nodes"], dag["edges"], dag["inputs"])
+                return not any(isinstance(result, dict) and result.get("error") for result in results.values())
+
+            scenarios.append(await measure(name, dag_call, iterations, warmup, concurrency))
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "database": database.engine.url.render_as_string(hide_password=True),
+        },
+        "settings": {
+            "iterations": iterations,
+            "warmup": warmup,
+            "concurrency": concurrency,
+            "stub_latency_ms": stub_latency_ms,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2,
+            min_delta_ms: float = 0.5) -> Dict[str, Any]:
+    """
+    Compares two suite results scenario by scenario. A scenario regressed when its p50 or p95
+    latency grew, or its throughput dropped, by more than `threshold` (a fraction). Latency
+    changes smaller than `min_delta_ms` are ignored, so sub-millisecond jitter does not fail
+    the comparison.
+    """
+    baseline_by_name = {scenario["name"]: scenario for scenario in baseline.get("scenarios", [])}
+    rows = []
+    for scenario in current.get("scenarios", []):
+        before = baseline_by_name.get(scenario["name"])
+        if before is None:
+            continue
+        changes = {}
+        regressed = []
+        for stat in ("p50", "p95", "p99"):
+            old, new = before["latency_ms"][stat], scenario["latency_ms"][stat]
+            change = (new - old) / old if old else 0.0
+            changes[stat] = round(change, 4)
+            if stat != "p99" and change > threshold and new - old > min_delta_ms:
+                regressed.append(stat)
+        old, new = before["throughput_per_sec"], scenario["throughput_per_sec"]
+        change = (new - old) / old if old else 0.0
+        changes["throughput"] = round(change, 4)
+        if change < -threshold:
+            regressed.append("throughput")
+        rows.append({"name": scenario["name"], "change": changes, "regressed": regressed})
+
+    return {
+        "threshold": threshold,
+        "scenarios": rows,
+        "regressions": [row["name"] for row in rows if row["regressed"]],
+        "missing_from_baseline": sorted({s["name"] for s in current.get("scenarios", [])} - set(baseline_by_name)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark node endpoints and workflows with stub models.")
+    parser.add_argument("--iterations", type=int, default=50, help="Measured calls per scenario.")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--stub-latency-ms", type=float, default=5.0,
+                        help="Simulated inference time of the stub pipelines.")
+    parser.add_argument("--only", action="append",
+                        help="Run scenarios whose name starts with this prefix (e.g. node/, dag/fan_in).")
+    parser.add_argument("--output", help="Write the results JSON here (e.g. to save a baseline).")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative change counted as a regression (0.2 = 20%%).")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    # The engine is built when the database module is first imported, so the isolated database
+    # must be configured before then; the app is only imported in run_suite().
+    if "neogrid.backend.database.database" in sys.modules:
+        parser.exit(1, "Error: the database was imported before the suite could point it at a temp file.\n")
+    tmp = tempfile.mkdtemp(prefix="neurogrid-bench-")
+    os.environ["NEUROGRID_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["NEUROGRID_BLOB_DIR"] = os.path.join(tmp, "blobs")
+
+    result = asyncio.run(run_suite(args.iterations, args.warmup, args.concurrency, args.stub_latency_ms,
+                                   args.only))
+    if args.baseline:
+        with open(args.baseline) as f:
+            result["comparison"] = compare(result, json.load(f), args.threshold, args.min_delta_ms)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+    if result.get("comparison", {}).get("regressions"):
+        print(f"Regressions: {', '.join(result['comparison']['regressions'])}", file=sys.stderr)
+        return 1
+    return 0
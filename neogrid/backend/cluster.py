@@ -0,0 +1,165 @@
+"""
+Registry of remote node workers.
+
+Node types can be served by worker processes outside the API process (see `node_worker`).
+A worker registers the node types it hosts with `POST /cluster/workers` and repeats that as
+a heartbeat. The engine then sends calls to a node type to one of its healthy workers:
+
+- least outstanding requests: the worker with the fewest calls in flight from this API
+  process wins, with ties broken at random;
+- active health checks: every NEUROGRID_WORKER_HEALTH_INTERVAL seconds each worker's
+  `/health` is polled. NEUROGRID_WORKER_UNHEALTHY_AFTER consecutive failures take it out of
+  rotation, and one success brings it back;
+- passive ejection: a connection error or timeout marks the worker unhealthy at once, and the
+  engine retries the call on another worker;
+- expiry: workers that neither heartbeat nor pass a health check for NEUROGRID_WORKER_TTL
+  seconds are dropped.
+
+Node types without registered workers are served by the API process itself, and so are node
+types whose workers are all unhealthy unless NEUROGRID_WORKER_LOCAL_FALLBACK=0.
+"""
+
+import asyncio
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+import httpx
+
+from . import metrics
+
+# --- Configuration ---
+# Shared secret workers send when registering; without it no worker may register.
+CLUSTER_TOKEN = os.getenv("NEUROGRID_CLUSTER_TOKEN", "")
+CLUSTER_TOKEN_HEADER = "X-NeuroGrid-Cluster-Token"
+WORKER_HEALTH_INTERVAL = float(os.getenv("NEUROGRID_WORKER_HEALTH_INTERVAL", "5"))
+WORKER_UNHEALTHY_AFTER = int(os.getenv("NEUROGRID_WORKER_UNHEALTHY_AFTER", "2"))
+WORKER_TTL = float(os.getenv("NEUROGRID_WORKER_TTL", "30"))
+# Serve a node type from the API process when none of its workers is healthy.
+WORKER_LOCAL_FALLBACK = os.getenv("NEUROGRID_WORKER_LOCAL_FALLBACK", "1") == "1"
+
+
+class NoHealthyWorker(Exception):
+    """Raised when every worker hosting a node type is unhealthy and local fallback is off."""
+
+
+class Worker:
+    def __init__(self, url: str, node_types: List[str]):
+        self.url = url.rstrip("/")
+        self.node_types = set(node_types)
+        self.outstanding = 0
+        self.served = 0
+        self.healthy = True
+        self.failures = 0
+        self.last_seen = time.monotonic()
+
+    def snapshot(self) -> Dict:
+        return {
+            "url": self.url,
+            "node_types": sorted(self.node_types),
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "served": self.served,
+            "seconds_since_seen": round(time.monotonic() - self.last_seen, 1),
+        }
+
+
+class WorkerRegistry:
+    def __init__(self, health_interval: float = WORKER_HEALTH_INTERVAL,
+                 unhealthy_after: int = WORKER_UNHEALTHY_AFTER, ttl: float = WORKER_TTL,
+                 transport: httpx.AsyncBaseTransport | None = None):
+        self.health_interval = health_interval
+        self.unhealthy_after = unhealthy_after
+        self.ttl = ttl
+        self.transport = transport
+        self.workers: Dict[str, Worker] = {}
+        self._health_task: asyncio.Task | None = None
+
+    def register(self, url: str, node_types: List[str]) -> Worker:
+        """Adds a worker or refreshes its heartbeat and node types."""
+        url = url.rstrip("/")
+        worker = self.workers.get(url)
+        if worker is None:
+            worker = self.workers[url] = Worker(url, node_types)
+            metrics.cluster_workers.set_function(lambda: sum(w.healthy for w in self.workers.values()))
+            print(f"Registered node worker {url} for {', '.join(sorted(worker.node_types))}.")
+        else:
+            worker.node_types = set(node_types)
+            worker.last_seen = time.monotonic()
+        self._ensure_health_checks()
+        return worker
+
+    def deregister(self, url: str) -> bool:
+        return self.workers.pop(url.rstrip("/"), None) is not None
+
+    def hosts(self, node_type: str) -> bool:
+        return any(node_type in worker.node_types for worker in self.workers.values())
+
+    def pick(self, node_type: str, exclude=()) -> Worker | None:
+        """The healthy worker hosting `node_type` with the fewest outstanding requests."""
+        candidates = [w for w in self.workers.values()
+                      if node_type in w.node_types and w.healthy and w.url not in exclude]
+        if not candidates:
+            return None
+        fewest = min(w.outstanding for w in candidates)
+        return random.choice([w for w in candidates if w.outstanding == fewest])
+
+    @contextmanager
+    def track(self, worker: Worker):
+        """Counts a request as outstanding on `worker` while it runs."""
+        worker.outstanding += 1
+        try:
+            yield
+        finally:
+            worker.outstanding -= 1
+            worker.served += 1
+
+    def mark_failed(self, worker: Worker):
+        """Takes a worker out of rotation after a failed call; the next passing health check restores it."""
+        if worker.healthy:
+            print(f"Node worker {worker.url} failed a call; taking it out of rotation.")
+        worker.healthy = False
+        worker.failures = max(worker.failures, self.unhealthy_after)
+
+    async def check_health(self):
+        """Polls every worker's /health once and drops workers not seen within the TTL."""
+        async with httpx.AsyncClient(transport=self.transport, timeout=self.health_interval or 5) as client:
+            workers = list(self.workers.values())
+            responses = await asyncio.gather(*[client.get(f"{w.url}/health") for w in workers],
+                                             return_exceptions=True)
+        now = time.monotonic()
+        for worker, response in zip(workers, responses):
+            if isinstance(response, httpx.Response) and response.status_code == 200:
+                worker.failures = 0
+                worker.healthy = True
+                worker.last_seen = now
+            else:
+                worker.failures += 1
+                if worker.failures >= self.unhealthy_after:
+                    worker.healthy = False
+            if now - worker.last_seen > self.ttl:
+                print(f"Node worker {worker.url} expired.")
+                self.workers.pop(worker.url, None)
+
+    def _ensure_health_checks(self):
+        if self.health_interval <= 0 or (self._health_task is not None and not self._health_task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._health_task = loop.create_task(self._health_loop())
+
+    async def _health_loop(self):
+        while self.workers:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                print(f"Node worker health check failed: {e}")
+
+
+# Global registry used by the API and the engine
+worker_registry = WorkerRegistry()
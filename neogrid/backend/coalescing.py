@@ -0,0 +1,93 @@
+"""
+Single-flight coalescing of identical node calls.
+
+When several callers send the same payload to a model node at the same moment (the same text
+to `summarizer` from different users, the same URL to `image_caption` from several rows),
+only the first call runs the handler. The others wait for it and get a copy of its result
+(or its error). Calls are keyed by node type and a hash of the canonical JSON of the payload.
+Only calls that overlap are coalesced; nothing is cached afterwards.
+
+Handlers run on the threadpool, so waiting callers block their worker thread on an event.
+"""
+
+import copy
+import functools
+import hashlib
+import json
+import os
+import threading
+
+from . import metrics, tracing
+
+# --- Configuration ---
+SINGLE_FLIGHT_ENABLED = os.getenv("NEUROGRID_SINGLE_FLIGHT", "1") == "1"
+
+
+def payload_key(node_type: str, payload) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{node_type}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers with the same key share it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def do(self, key: str, fn, *args, **kwargs):
+        """Returns (result, shared): `shared` is True when another caller's execution was reused."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+_single_flight = SingleFlight()
+
+
+def single_flight(fn):
+    """
+    Decorator for node `/infer` handlers (below `tracing.traced_node`) that coalesces concurrent
+    calls with identical payloads.
+    """
+    node_type = fn.__module__.rsplit(".", 1)[-1]
+
+    @functools.wraps(fn)
+    def wrapper(payload: dict):
+        if not SINGLE_FLIGHT_ENABLED:
+            return fn(payload)
+        result, shared = _single_flight.do(payload_key(node_type, payload), fn, payload)
+        tracing.record_cache("single_flight", hit=shared)
+        if shared:
+            metrics.deduplicated_items.inc(node_type=node_type, kind="in_flight")
+        return result
+    return wrapper
@@ -0,0 +1,178 @@
+"""
+Latency model of the node types, used to schedule workflow runs and to estimate how long they take.
+
+For every node type it keeps the most recent successful calls (request bytes, wall time,
+response bytes). The samples come from the node results stored with past WorkflowRuns, read
+once before the first run, and from every node call the engine makes afterwards. Latency is
+fitted as `fixed_ms + ms_per_byte * request_bytes` by least squares, so a summarizer call on a
+long document costs more than one on a sentence. The output size is predicted from the mean
+ratio of response to request bytes, which gives the input size of downstream nodes before
+they run. Node types without samples fall back to a rough prior.
+
+With a cost per node, a workflow is planned as list scheduling on a fixed number of slots:
+
+- a node's priority is its cost plus the longest chain of costs below it (its rank), so the
+  nodes on the critical path start first;
+- ready nodes fill every free slot in rank order, so cheap nodes run next to a long model call
+  instead of queueing behind it;
+- simulating that schedule with the predicted costs gives the estimated completion time.
+"""
+
+import math
+import os
+import threading
+from collections import deque
+from typing import Dict, List
+
+# --- Configuration ---
+COST_MODEL_SAMPLES = int(os.getenv("NEUROGRID_COST_MODEL_SAMPLES", "500"))
+COST_MODEL_HISTORY_RUNS = int(os.getenv("NEUROGRID_COST_MODEL_HISTORY_RUNS", "200"))
+# Latency in ms assumed for node types that have not run yet.
+PRIOR_COSTS_MS = {
+    "summarizer": 3000.0,
+    "image_caption": 2000.0,
+    "sentiment": 300.0,
+    "preprocessing_node": 20.0,
+    "postprocessing_node": 10.0,
+    "code_analyzer": 5.0,
+    "input_node": 5.0,
+    "output_node": 5.0,
+}
+PRIOR_COST_MS = 50.0
+# Samples needed before the request size is used to scale the latency.
+MIN_FIT_SAMPLES = 5
+
+
+class NodeTypeStats:
+    def __init__(self, max_samples: int = COST_MODEL_SAMPLES):
+        self.samples = deque(maxlen=max_samples)
+        self._fit = None
+
+    def add(self, request_bytes: int, wall_ms: float, response_bytes: int):
+        self.samples.append((request_bytes, wall_ms, response_bytes))
+        self._fit = None
+
+    def fit(self):
+        """(fixed_ms, ms_per_byte, output_ratio) from the current samples."""
+        if self._fit is None:
+            xs = [s[0] for s in self.samples]
+            ys = [s[1] for s in self.samples]
+            mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+            var_x = sum((x - mean_x) ** 2 for x in xs)
+            slope = 0.0
+            if len(xs) >= MIN_FIT_SAMPLES and var_x > 0:
+                # Latency does not shrink with bigger inputs; a negative slope is noise.
+                slope = max(0.0, sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x)
+            output_ratio = sum(s[2] for s in self.samples) / max(1, sum(xs))
+            self._fit = (max(0.0, mean_y - slope * mean_x), slope, output_ratio)
+        return self._fit
+
+
+class CostModel:
+    def __init__(self, max_samples: int = COST_MODEL_SAMPLES):
+        self.max_samples = max_samples
+        self.stats: Dict[str, NodeTypeStats] = {}
+        self.history_loaded = False
+        # Samples arrive on the event loop and, while history loads, on a DB executor thread.
+        self._lock = threading.Lock()
+
+    def observe(self, node_type: str, request_bytes: int, wall_ms: float, response_bytes: int):
+        with self._lock:
+            stats = self.stats.get(node_type)
+            if stats is None:
+                stats = self.stats[node_type] = NodeTypeStats(self.max_samples)
+            stats.add(request_bytes, wall_ms, response_bytes)
+
+    def observe_result(self, result) -> bool:
+        """Adds the call recorded in a node result's `_execution_metadata`, if it was a single successful call."""
+        metadata = result.get("_execution_metadata") if isinstance(result, dict) else None
+        if not metadata or metadata.get("status") != "success" or "stream" in metadata:
+            return False
+        try:
+            self.observe(metadata["node_type"], int(metadata["payload"]["request_bytes"]),
+                         float(metadata["timing"]["wall_ms"]), int(metadata["payload"]["response_bytes"]))
+        except (KeyError, TypeError, ValueError):
+            return False
+        return True
+
+    def load_history(self, outputs) -> int:
+        """Seeds the model from stored run outputs (oldest first). Returns the number of samples added."""
+        added = 0
+        for output in outputs:
+            if isinstance(output, dict):
+                added += sum(self.observe_result(result) for key, result in output.items()
+                             if not key.startswith("_"))
+        self.history_loaded = True
+        return added
+
+    def samples(self, node_type: str) -> int:
+        stats = self.stats.get(node_type)
+        return len(stats.samples) if stats else 0
+
+    def predict_ms(self, node_type: str, request_bytes: int) -> float:
+        with self._lock:
+            stats = self.stats.get(node_type)
+            if not stats or not stats.samples:
+                return PRIOR_COSTS_MS.get(node_type, PRIOR_COST_MS)
+            fixed_ms, ms_per_byte, _ = stats.fit()
+        return fixed_ms + ms_per_byte * request_bytes
+
+    def predict_output_bytes(self, node_type: str, request_bytes: int) -> int:
+        with self._lock:
+            stats = self.stats.get(node_type)
+            if not stats or not stats.samples:
+                return request_bytes
+            _, _, output_ratio = stats.fit()
+        return int(output_ratio * request_bytes)
+
+
+def ranks(graph: Dict[str, List[str]], order: List[str], costs: Dict[str, float]) -> Dict[str, float]:
+    """Each node's cost plus the costliest chain of its descendants; `order` is a topological order."""
+    rank = {}
+    for node_id in reversed(order):
+        rank[node_id] = costs.get(node_id, 0.0) + max((rank[s] for s in graph[node_id]), default=0.0)
+    return rank
+
+
+def critical_path(graph: Dict[str, List[str]], rank: Dict[str, float]) -> List[str]:
+    """The chain of nodes with the highest total cost, from a source to a sink."""
+    has_input = {target for targets in graph.values() for target in targets}
+    sources = [node_id for node_id in graph if node_id not in has_input]
+    path = []
+    node_id = max(sources, key=lambda n: rank[n], default=None)
+    while node_id is not None:
+        path.append(node_id)
+        node_id = max(graph[node_id], key=lambda n: rank[n], default=None)
+    return path
+
+
+def simulate(graph: Dict[str, List[str]], costs: Dict[str, float], priority: Dict[str, tuple],
+             slots: int) -> Dict[str, tuple]:
+    """
+    Runs the list schedule the engine uses on `slots` slots with the given costs.
+    Returns node id -> (start_ms, finish_ms).
+    """
+    waiting = {node_id: 0 for node_id in graph}
+    for targets in graph.values():
+        for target in targets:
+            waiting[target] += 1
+    ready = [node_id for node_id, count in waiting.items() if count == 0]
+    running, times, now = [], {}, 0.0
+    while ready or running:
+        ready.sort(key=lambda n: priority[n])
+        while ready and len(running) < slots:
+            node_id = ready.pop(0)
+            times[node_id] = (now, now + costs.get(node_id, 0.0))
+            running.append(node_id)
+        now = min(times[n][1] for n in running)
+        for node_id in [n for n in running if math.isclose(times[n][1], now) or times[n][1] < now]:
+            running.remove(node_id)
+            for target in graph[node_id]:
+                waiting[target] -= 1
+                if waiting[target] == 0:
+                    ready.append(target)
+    return times
+
+
+# Global cost model shared by the engine and the API
+node_costs = CostModel()
@@ -0,0 +1,110 @@
+"""
+Content-addressed blob store for large JSON documents (e.g. WorkflowRun outputs).
+
+Blobs are keyed by the SHA-256 of their canonical JSON encoding, so identical outputs from
+different runs are written to disk once. They are compressed with zstd when the optional
+`zstandard` package is installed and gzip otherwise; both formats are readable regardless
+of the current setting.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+BLOB_DIR = os.getenv("NEUROGRID_BLOB_DIR", "./blobs")
+# Outputs whose encoded JSON is larger than this are moved out of the database row.
+BLOB_THRESHOLD_BYTES = int(os.getenv("NEUROGRID_BLOB_THRESHOLD_BYTES", str(64 * 1024)))
+BLOB_COMPRESSION = os.getenv("NEUROGRID_BLOB_COMPRESSION", "zstd" if zstandard else "gzip")
+
+REF_PREFIX = "sha256:"
+_EXTENSIONS = {"zstd": ".json.zst", "gzip": ".json.gz"}
+
+
+def encode_json(data: Any) -> bytes:
+    """Canonical JSON encoding used for hashing: sorted keys, no insignificant whitespace."""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class BlobStore:
+    def __init__(self, root: str = BLOB_DIR, compression: str = BLOB_COMPRESSION):
+        if compression not in _EXTENSIONS:
+            raise ValueError(f"Unsupported blob compression '{compression}'")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd blob compression requires the 'zstandard' package")
+        self.root = Path(root)
+        self.compression = compression
+
+    def _path(self, digest: str, compression: str) -> Path:
+        return self.root / digest[:2] / f"{digest}{_EXTENSIONS[compression]}"
+
+    def _find(self, ref: str) -> tuple[Path, str] | None:
+        if not ref.startswith(REF_PREFIX):
+            raise ValueError(f"Invalid blob reference '{ref}'")
+        digest = ref[len(REF_PREFIX):]
+        for compression in _EXTENSIONS:
+            path = self._path(digest, compression)
+            if path.exists():
+                return path, compression
+        return None
+
+    def exists(self, ref: str) -> bool:
+        return self._find(ref) is not None
+
+    def put_bytes(self, data: bytes) -> str:
+        """Stores already-encoded JSON and returns its reference. Existing blobs are reused."""
+        ref = REF_PREFIX + hashlib.sha256(data).hexdigest()
+        if self.exists(ref):
+            return ref
+
+        if self.compression == "zstd":
+            compressed = zstandard.ZstdCompressor(level=3).compress(data)
+        else:
+            compressed = gzip.compress(data, compresslevel=6)
+
+        path = self._path(ref[len(REF_PREFIX):], self.compression)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename so concurrent writers of the same blob never
+        # expose a partially written file.
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return ref
+
+    def put_json(self, data: Any) -> str:
+        return self.put_bytes(encode_json(data))
+
+    def get_json(self, ref: str) -> Any:
+        return json.loads(self.get_bytes(ref))
+
+    def get_bytes(self, ref: str) -> bytes:
+        """The stored JSON encoding, decompressed but not parsed."""
+        found = self._find(ref)
+        if found is None:
+            raise FileNotFoundError(f"Blob {ref} not found in {self.root}")
+        path, compression = found
+        raw = path.read_bytes()
+        if compression == "zstd":
+            if zstandard is None:
+                raise RuntimeError("Reading zstd blobs requires the 'zstandard' package")
+            data = zstandard.ZstdDecompressor().decompress(raw)
+        else:
+            data = gzip.decompress(raw)
+        return data
+
+
+blob_store = BlobStore()
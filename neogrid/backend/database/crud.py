@@ -0,0 +1,162 @@
+"""
+Blocking data-access helpers for workflows and runs.
+Async endpoints call these through `database.run_db` so they execute on the DB executor.
+"""
+
+import base64
+import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .. import serialization
+from .blob_store import BLOB_THRESHOLD_BYTES, blob_store, encode_json
+
+
+def get_user_workflow(db: Session, workflow_id: int, user_id: int):
+    return db.query(models.Workflow).filter(
+        models.Workflow.id == workflow_id,
+        models.Workflow.user_id == user_id
+    ).first()
+
+
+# Columns returned when a listing asks for metadata only (no JSON blobs).
+WORKFLOW_SUMMARY_COLUMNS = (models.Workflow.id, models.Workflow.name, models.Workflow.user_id)
+RUN_SUMMARY_COLUMNS = (
+    models.WorkflowRun.id,
+    models.WorkflowRun.workflow_id,
+    models.WorkflowRun.created_at,
+    models.WorkflowRun.output_ref,
+    models.WorkflowRun.output_size,
+)
+# Page size of workflow listings that pass a cursor without a limit.
+WORKFLOW_PAGE_SIZE = 100
+
+
+def encode_run_cursor(created_at: datetime.datetime, run_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{run_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_run_cursor(cursor: str) -> tuple[datetime.datetime, int]:
+    """Raises ValueError for malformed cursors."""
+    try:
+        created_at, run_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.datetime.fromisoformat(created_at), int(run_id)
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _page(rows: list, limit: int, summary: bool, cursor_for):
+    """Trims a limit+1 result to one page and returns (items, next_cursor)."""
+    next_cursor = cursor_for(rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+    if summary:
+        rows = [row._asdict() for row in rows]
+    return rows, next_cursor
+
+
+def list_user_workflows(db: Session, user_id: int, limit: int | None = WORKFLOW_PAGE_SIZE,
+                        after_id: int | None = None, summary: bool = False):
+    """
+    Keyset-paginated workflows of a user, ordered by id. Returns (items, next_cursor);
+    `limit=None` returns all of them.
+    """
+    columns = WORKFLOW_SUMMARY_COLUMNS if summary else (models.Workflow,)
+    query = db.query(*columns).filter(models.Workflow.user_id == user_id)
+    if after_id is not None:
+        query = query.filter(models.Workflow.id > after_id)
+    query = query.order_by(models.Workflow.id)
+    if limit is None:
+        rows = query.all()
+        return _page(rows, len(rows), summary, lambda row: str(row.id))
+    return _page(query.limit(limit + 1).all(), limit, summary, lambda row: str(row.id))
+
+
+def list_workflow_runs(db: Session, workflow_id: int, limit: int = 50, cursor: str | None = None,
+                       summary: bool = True):
+    """Keyset-paginated runs of a workflow, newest first. Returns (items, next_cursor)."""
+    columns = RUN_SUMMARY_COLUMNS if summary else (models.WorkflowRun,)
+    query = db.query(*columns).filter(models.WorkflowRun.workflow_id == workflow_id)
+    if cursor is not None:
+        created_at, run_id = decode_run_cursor(cursor)
+        query = query.filter(or_(
+            models.WorkflowRun.created_at < created_at,
+            and_(models.WorkflowRun.created_at == created_at, models.WorkflowRun.id < run_id),
+        ))
+    rows = query.order_by(models.WorkflowRun.created_at.desc(), models.WorkflowRun.id.desc()).limit(limit + 1).all()
+    return _page(rows, limit, summary, lambda row: encode_run_cursor(row.created_at, row.id))
+
+
+def create_workflow(db: Session, workflow: schemas.WorkflowCreate, user_id: int):
+    db_workflow = models.Workflow(**workflow.dict(), user_id=user_id)
+    db.add(db_workflow)
+    db.commit()
+    db.refresh(db_workflow)
+    return db_workflow
+
+
+def create_run(db: Session, workflow_id: int, input_data: dict):
+    db_run = models.WorkflowRun(
+        workflow_id=workflow_id,
+        input_json=input_data,
+        output_json={}
+    )
+    db.add(db_run)
+    db.commit()
+    db.refresh(db_run)
+    return db_run
+
+
+def get_user_run(db: Session, run_id: int, user_id: int):
+    return db.query(models.WorkflowRun).join(models.Workflow).filter(
+        models.WorkflowRun.id == run_id,
+        models.Workflow.user_id == user_id
+    ).first()
+
+
+def save_run_output(db: Session, db_run: models.WorkflowRun, output: dict):
+    """
+    Stores a run's output. Outputs above the blob threshold are compressed into the
+    content-addressed blob store and the row keeps only the reference.
+    """
+    encoded = encode_json(output)
+    if len(encoded) > BLOB_THRESHOLD_BYTES:
+        db_run.output_ref = blob_store.put_bytes(encoded)
+        db_run.output_json = None
+    else:
+        db_run.output_ref = None
+        db_run.output_json = output
+    db_run.output_size = len(encoded)
+    db.add(db_run)
+    db.commit()
+    db.refresh(db_run)
+    return db_run
+
+
+def load_run_output(db_run: models.WorkflowRun):
+    """Returns the full output of a run, reading it from the blob store if it was externalized."""
+    if db_run.output_ref:
+        return blob_store.get_json(db_run.output_ref)
+    return db_run.output_json
+
+
+def load_run_output_bytes(db_run: models.WorkflowRun) -> bytes:
+    """The full output of a run as JSON; externalized outputs are passed through without parsing."""
+    if db_run.output_ref:
+        return blob_store.get_bytes(db_run.output_ref)
+    return serialization.dumps(db_run.output_json)
+
+
+def recent_run_outputs(db: Session, limit: int) -> list:
+    """Outputs of the latest `limit` runs across all workflows, oldest first."""
+    runs = db.query(models.WorkflowRun).order_by(models.WorkflowRun.id.desc()).limit(limit).all()
+    outputs = []
+    for db_run in reversed(runs):
+        try:
+            outputs.append(load_run_output(db_run))
+        except (OSError, RuntimeError, ValueError):
+            # A missing or unreadable blob only costs this run's samples.
+            continue
+    return outputs
@@ -1,19 +1,167 @@
-from sqlalchemy import create_engine
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# --- Configuration ---
+# Every setting can be overridden from the environment, so the same code runs
+# against the bundled SQLite file in development and a server database in production.
+SQLALCHEMY_DATABASE_URL = os.getenv("NEUROGRID_DATABASE_URL", "sqlite:///./neogrid.db")
+
+DB_POOL_SIZE = int(os.getenv("NEUROGRID_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("NEUROGRID_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("NEUROGRID_DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("NEUROGRID_DB_POOL_RECYCLE", "-1"))
+# Threads dedicated to blocking DB calls from async endpoints; one per pooled connection by default.
+DB_EXECUTOR_WORKERS = int(os.getenv("NEUROGRID_DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+
+# SQLite only: WAL lets readers run alongside the single writer, NORMAL skips the
+# per-commit fsync (still durable across application crashes), busy_timeout makes
+# concurrent writers wait for the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("NEUROGRID_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("NEUROGRID_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("NEUROGRID_SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("NEUROGRID_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("NEUROGRID_SQLITE_CACHE_SIZE", "-16000")),  # negative = KiB
+    "temp_store": os.getenv("NEUROGRID_SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+
+def is_sqlite_url(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_memory_database(url: str) -> bool:
+    database = make_url(url).database
+    return database in (None, "", ":memory:") or database.startswith("file::memory:")
+
+
+def _sqlite_pragma_listener(pragmas: dict):
+    """Returns a connect-event listener that applies the given PRAGMAs to each new connection."""
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                if value is None:
+                    continue
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return apply_pragmas
+
+
+def build_engine(
+    url: str = SQLALCHEMY_DATABASE_URL,
+    *,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+    pool_timeout: float = DB_POOL_TIMEOUT,
+    pool_recycle: int = DB_POOL_RECYCLE,
+    sqlite_pragmas: dict | None = None,
+) -> Engine:
+    """
+    Creates a SQLAlchemy engine for the given URL.
+    SQLite connections get the configured PRAGMAs applied on connect; any other
+    backend (PostgreSQL, MySQL, ...) only gets the pool settings.
+    """
+    if not is_sqlite_url(url):
+        return create_engine(
+            url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=True,
+        )
+
+    pragmas = dict(SQLITE_PRAGMAS if sqlite_pragmas is None else sqlite_pragmas)
+    connect_args = {"check_same_thread": False}
+    if pragmas.get("busy_timeout"):
+        # The driver-level timeout covers the implicit BEGIN as well as statements.
+        connect_args["timeout"] = pragmas["busy_timeout"] / 1000
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./neogrid.db"
+    if _is_memory_database(url):
+        # An in-memory database lives inside a single connection; pooling would lose it.
+        pragmas.pop("journal_mode", None)
+        pragmas.pop("mmap_size", None)
+        engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(
+            url,
+            connect_args=connect_args,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+        )
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+    event.listen(engine, "connect", _sqlite_pragma_listener(pragmas))
+    return engine
+
+
+engine = build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db():
+
+def upgrade_schema(metadata, bind: Engine | None = None):
+    """
+    Creates missing tables, then adds any columns and indexes that were introduced after
+    an existing database was created. Only additive changes are handled, so new columns
+    must be nullable.
+    """
+    bind = bind or engine
+    metadata.create_all(bind=bind)
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=conn)
+
+# --- Async access ---
+# Sessions are synchronous; async endpoints hand every blocking call to this executor so a
+# slow disk or a locked database never stalls the event loop. It is separate from the
+# threadpool FastAPI uses for sync endpoints, so model inference cannot starve DB access.
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="neurogrid-db")
+# Calls submitted through run_db that have not finished; only touched from the event loop.
+_db_pending = 0
+
+
+def db_queue_depth() -> int:
+    """DB calls waiting for an executor thread (not counting the ones running)."""
+    return max(0, _db_pending - DB_EXECUTOR_WORKERS)
+
+
+async def run_db(fn, *args, **kwargs):
+    """Runs a blocking database callable on the DB executor and awaits its result."""
+    global _db_pending
+    loop = asyncio.get_running_loop()
+    _db_pending += 1
+    try:
+        return await loop.run_in_executor(db_executor, functools.partial(fn, *args, **kwargs))
+    finally:
+        _db_pending -= 1
+
+
+async def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await run_db(db.close)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 import datetime
@@ -23,6 +23,11 @@ class Workflow(Base):
     owner = relationship("User", back_populates="workflows")
     runs = relationship("WorkflowRun", back_populates="workflow")
 
+    __table_args__ = (
+        # Keyset pagination of a user's workflows: WHERE user_id = ? AND id > ? ORDER BY id
+        Index("ix_workflows_user_id_id", "user_id", "id"),
+    )
+
 class WorkflowRun(Base):
     __tablename__ = "workflow_runs"
 
@@ -30,6 +35,14 @@ class WorkflowRun(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     input_json = Column(JSON, nullable=True)
     output_json = Column(JSON, nullable=True)
+    # Large outputs live in the blob store; output_json is then NULL and this holds the reference.
+    output_ref = Column(String, nullable=True)
+    output_size = Column(Integer, nullable=True)
     workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False)
 
-    workflow = relationship("Workflow", back_populates="runs")
\ No newline at end of file
+    workflow = relationship("Workflow", back_populates="runs")
+
+    __table_args__ = (
+        # Run history, newest first: WHERE workflow_id = ? ORDER BY created_at DESC, id DESC
+        Index("ix_workflow_runs_workflow_id_created_at", "workflow_id", "created_at", "id"),
+    )
@@ -38,6 +38,15 @@ class Workflow(WorkflowBase):
     class Config:
         orm_mode = True
 
+class WorkflowSummary(BaseModel):
+    """Workflow metadata without the config_json blob."""
+    id: int
+    name: str
+    user_id: int
+
+    class Config:
+        orm_mode = True
+
 # --- WorkflowRun Schemas ---
 class WorkflowRunBase(BaseModel):
     input_json: Optional[Dict[str, Any]] = None
@@ -50,6 +59,25 @@ class WorkflowRun(WorkflowRunBase):
     id: int
     workflow_id: int
     created_at: datetime.datetime
+    # Set when output_json was moved to the blob store; fetch it from /runs/{id}/output.
+    output_ref: Optional[str] = None
+    output_size: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+class WorkflowRunSummary(BaseModel):
+    """Run metadata without the input/output JSON blobs."""
+    id: int
+    workflow_id: int
+    created_at: datetime.datetime
+    output_ref: Optional[str] = None
+    output_size: Optional[int] = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+# --- Cluster Schemas ---
+class WorkerRegistration(BaseModel):
+    url: str
+    node_types: List[str]
@@ -0,0 +1,111 @@
+"""
+Password hashing on a dedicated, bounded worker pool.
+
+Argon2 is deliberately CPU- and memory-hard. Running it on the shared threadpool lets a burst
+of logins starve the node endpoints, so hashes run on their own small pool instead. Once the
+pool and its queue are full, new requests are rejected with `HashingOverloaded` (surfaced as
+429 + Retry-After) rather than piling up behind each other.
+"""
+
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+# --- Configuration ---
+# Argon2 cost parameters; the defaults match passlib's.
+ARGON2_TIME_COST = int(os.getenv("NEUROGRID_ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST_KIB = int(os.getenv("NEUROGRID_ARGON2_MEMORY_COST", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("NEUROGRID_ARGON2_PARALLELISM", "4"))
+
+HASH_WORKERS = int(os.getenv("NEUROGRID_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Requests allowed to wait for a worker before new ones are turned away.
+HASH_MAX_QUEUE = int(os.getenv("NEUROGRID_HASH_MAX_QUEUE", "32"))
+# "thread" works well because argon2-cffi releases the GIL; "process" isolates memory use.
+HASH_EXECUTOR = os.getenv("NEUROGRID_HASH_EXECUTOR", "thread")
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST_KIB,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def check_password(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing pool and its queue are full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Password hashing is overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Runs hash/verify calls on a bounded executor and rejects work beyond its queue limit."""
+
+    def __init__(self, workers: int = HASH_WORKERS, max_queue: int = HASH_MAX_QUEUE,
+                 executor: str = HASH_EXECUTOR):
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self._executor_kind = executor
+        self._executor: Executor | None = None
+        # Only touched from the event loop, so plain attributes are enough.
+        self._pending = 0
+        self._avg_seconds = 0.1
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self._executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="neurogrid-hash")
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a worker (not counting the ones being hashed)."""
+        return max(0, self._pending - self.workers)
+
+    def _retry_after(self) -> int:
+        waves = math.ceil((self._pending + 1) / self.workers)
+        return max(1, math.ceil(waves * self._avg_seconds))
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            raise HashingOverloaded(self._retry_after())
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            result = await loop.run_in_executor(self._get_executor(), fn, *args)
+            # Exponential moving average of the service time, for Retry-After estimates.
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.perf_counter() - started)
+            return result
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(check_password, password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
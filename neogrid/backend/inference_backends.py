@@ -0,0 +1,84 @@
+"""
+Inference backends for the model nodes.
+
+A backend turns (task, model) into a callable with the `transformers.pipeline` calling
+convention, so the nodes' `/infer` contract does not depend on how the model is executed:
+
+- `transformers` (default): `transformers.pipeline` on PyTorch, with the CPU options from
+  `model_runtime` (int8 quantization, thread counts);
+- `onnxruntime`: ONNX Runtime sessions built from model files exported ahead of time, wrapped in
+  the same pipeline classes through `optimum.onnxruntime`. Export a model with e.g.
+
+      optimum-cli export onnx --model distilbert-base-uncased-finetuned-sst-2-english models/onnx/sentiment
+
+The backend is chosen per node type with NEUROGRID_INFERENCE_BACKENDS.
+"""
+
+import os
+from pathlib import Path
+
+from . import model_runtime
+
+# e.g. "sentiment=onnxruntime,summarizer=onnxruntime"; unlisted node types use transformers.
+INFERENCE_BACKENDS = dict(
+    part.strip().split("=", 1)
+    for part in os.getenv("NEUROGRID_INFERENCE_BACKENDS", "").split(",")
+    if "=" in part
+)
+ONNX_MODEL_DIR = os.getenv("NEUROGRID_ONNX_MODEL_DIR", "./models/onnx")
+
+BACKENDS = ("transformers", "onnxruntime")
+# optimum model class per pipeline task
+ONNX_MODEL_CLASSES = {
+    "sentiment-analysis": "ORTModelForSequenceClassification",
+    "summarization": "ORTModelForSeq2SeqLM",
+}
+
+
+def backend_for(node_type: str) -> str:
+    backend = INFERENCE_BACKENDS.get(node_type, "transformers").strip()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' for {node_type}; expected one of {BACKENDS}")
+    return backend
+
+
+def load_pipeline(node_type: str, task: str, model: str, factory=None, backend: str | None = None):
+    """
+    Loads the model of a node with its configured backend. `factory` is the pipeline
+    constructor used by the transformers backend (defaults to `transformers.pipeline`).
+    """
+    backend = backend or backend_for(node_type)
+    if backend == "onnxruntime":
+        return load_onnx_pipeline(node_type, task, model)
+    if factory is None:
+        from transformers import pipeline as factory
+    return model_runtime.optimize_pipeline(factory(task, model=model), node_type)
+
+
+def onnx_model_path(node_type: str) -> Path:
+    return Path(ONNX_MODEL_DIR) / node_type
+
+
+def load_onnx_pipeline(node_type: str, task: str, model: str):
+    if task not in ONNX_MODEL_CLASSES:
+        raise ValueError(f"The onnxruntime backend does not support the '{task}' task")
+    path = onnx_model_path(node_type)
+    if not path.is_dir():
+        raise FileNotFoundError(
+            f"No exported ONNX model at {path}; create it with: optimum-cli export onnx --model {model} {path}")
+    try:
+        import onnxruntime
+        from optimum import onnxruntime as ort_models
+    except ImportError as e:
+        raise RuntimeError("The onnxruntime backend needs `pip install optimum[onnxruntime]`") from e
+    from transformers import AutoTokenizer, pipeline
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.intra_op_num_threads = model_runtime.thread_count(node_type) or 0
+    if model_runtime.TORCH_INTEROP_THREADS:
+        session_options.inter_op_num_threads = model_runtime.TORCH_INTEROP_THREADS
+
+    model_class = getattr(ort_models, ONNX_MODEL_CLASSES[task])
+    ort_model = model_class.from_pretrained(path, provider="CPUExecutionProvider", session_options=session_options)
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    return pipeline(task, model=ort_model, tokenizer=tokenizer)
@@ -1,16 +1,23 @@
-from fastapi import FastAPI, HTTPException, Body, Depends
+from fastapi import FastAPI, HTTPException, Body, Depends, Query, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+import anyio
 import httpx
 import json
+import time
+from typing import Literal, Optional, Union
 
 from .nodes import summarizer, image_caption, code_analyzer, sentiment, input_node, preprocessing_node, postprocessing_node, output_node
-from .database import database, models, schemas
-from .routers import auth
+from .database import crud, database, models, schemas
+from .routers import admin, auth, cluster
+from . import cost_model, metrics, profiling, serialization, tracing
+from .admission import AdmissionRejected, admission_controller
+from .hashing import password_hasher
 from .workflow_engine import workflow_engine
 
-# Create all database tables on startup
-models.Base.metadata.create_all(bind=database.engine)
+# Create all database tables (and any columns added since) on startup
+database.upgrade_schema(models.Base.metadata)
 
 app = FastAPI(
     title="NeuroGrid Backend",
@@ -25,10 +32,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(tracing.NodeTimingMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# --- Metrics ---
+metrics.instrument_engine(database.engine)
+metrics.executor_queue_depth.set_function(database.db_queue_depth, executor="db")
+metrics.executor_queue_depth.set_function(
+    lambda: password_hasher.queue_depth, executor="password_hashing")
+metrics.executor_queue_depth.set_function(
+    lambda: admission_controller.queue_depth, executor="workflow_admission")
+# Sync endpoints (all nodes) share anyio's default thread limiter; evaluated on the event loop at scrape time.
+metrics.executor_queue_depth.set_function(
+    lambda: anyio.to_thread.current_default_thread_limiter().statistics().tasks_waiting, executor="threadpool")
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health Check"])
+async def get_metrics():
+    """Prometheus text exposition of the backend's metrics."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 # --- Routers ---
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
+app.include_router(cluster.router, prefix="/cluster", tags=["Cluster"])
 app.include_router(summarizer.router,
                    prefix="/nodes/summarizer", tags=["AI Nodes"])
 app.include_router(image_caption.router,
@@ -74,26 +103,36 @@ def get_node_registry():
 
 
 @app.post("/workflows/", response_model=schemas.Workflow)
-def create_workflow(
+async def create_workflow(
     workflow: schemas.WorkflowCreate,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: schemas.User = Depends(auth.get_current_user)
 ):
     """Create a new workflow for the current user."""
-    db_workflow = models.Workflow(**workflow.dict(), user_id=current_user.id)
-    db.add(db_workflow)
-    db.commit()
-    db.refresh(db_workflow)
-    return db_workflow
+    return await database.run_db(crud.create_workflow, db, workflow, current_user.id)
 
 
-@app.get("/workflows/", response_model=list[schemas.Workflow])
-def get_user_workflows(
+@app.get("/workflows/", response_model=list[Union[schemas.WorkflowSummary, schemas.Workflow]])
+async def get_user_workflows(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size (100 when only `after` is given)."),
+    after: Optional[int] = Query(None, description="Return workflows with an id greater than this cursor."),
+    fields: Literal["full", "summary"] = "full",
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: schemas.User = Depends(auth.get_current_user)
 ):
-    """List all workflows for the current user."""
-    return db.query(models.Workflow).filter(models.Workflow.user_id == current_user.id).all()
+    """
+    List the current user's workflows. Without `limit` or `after` every workflow is returned, as
+    existing clients expect; with either, one page at a time, with the cursor for the next page
+    in the `X-Next-Cursor` header. `fields=summary` omits `config_json`.
+    """
+    if limit is None and after is not None:
+        limit = crud.WORKFLOW_PAGE_SIZE
+    workflows, next_cursor = await database.run_db(
+        crud.list_user_workflows, db, current_user.id, limit, after, fields == "summary")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return workflows
 
 
 # --- Workflow Orchestration ---
@@ -101,57 +140,266 @@ def get_user_workflows(
 async def execute_workflow(
     workflow_id: int,
     request_body: dict = Body(...),
+    priority: Literal["high", "normal", "low"] = Query(
+        "normal", description="Queue priority when the server is at capacity; `high` is honoured for admins only."),
+    profile: bool = Query(False, description="Run under the profiler (admins only); see `_profile` in the output."),
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: schemas.User = Depends(auth.get_current_user)
 ):
     """
-    Executes a workflow with enhanced sequential processing and data passing.
+    Executes a workflow with data passing, running ready nodes concurrently (critical path first).
+    Runs go through admission control: over the rate limit or with the queue full the request
+    gets 429 with a Retry-After header; otherwise it waits for a free run slot.
     """
-    db_workflow = db.query(models.Workflow).filter(
-        models.Workflow.id == workflow_id,
-        models.Workflow.user_id == current_user.id
-    ).first()
+    is_admin = current_user.username in auth.ADMIN_USERNAMES
+    if profile and not is_admin:
+        raise HTTPException(status_code=403, detail="Profiling requires admin access.")
+    if priority == "high" and not is_admin:
+        priority = "normal"
 
+    # Unknown workflows get their 404 before admission so they do not spend the caller's rate budget.
+    db_workflow = await database.run_db(crud.get_user_workflow, db, workflow_id, current_user.id)
     if not db_workflow:
         raise HTTPException(
             status_code=404, detail="Workflow not found or access denied.")
 
+    try:
+        async with admission_controller.admit(current_user.id, priority):
+            return await _run_workflow(db_workflow, request_body, profile, db)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=e.reason, headers={"Retry-After": str(e.retry_after)})
+
+
+async def _run_workflow(db_workflow: models.Workflow, request_body: dict, profile: bool, db: Session):
+    """
+    Runs an admitted workflow and records it as a WorkflowRun.
+    All database access runs on the DB executor so the event loop stays free while nodes execute.
+    """
+    workflow_id = db_workflow.id
     workflow_config = db_workflow.config_json
     nodes = workflow_config.get("nodes", [])
     edges = workflow_config.get("edges", [])
     input_data = request_body.get("inputs", {})
+    await _load_cost_history(db)
+
+    session = None
+    if profile:
+        try:
+            session = profiling.start_session(f"workflow {workflow_id}")
+        except profiling.ProfilerBusy as e:
+            raise HTTPException(status_code=409, detail=str(e))
 
     # Create workflow run record
-    db_run = models.WorkflowRun(
-        workflow_id=workflow_id,
-        input_json=input_data,
-        output_json={}
-    )
-    db.add(db_run)
-    db.commit()
-    db.refresh(db_run)
+    try:
+        db_run = await database.run_db(crud.create_run, db, workflow_id, input_data)
+    except Exception:
+        if session is not None:
+            profiling.stop_session(session)
+        raise
+    # Hand the pooled connection back while the nodes run; save_run_output re-attaches the run.
+    await database.run_db(db.close)
 
+    metrics.workflows_in_flight.inc()
+    started = time.perf_counter()
     try:
         # Use enhanced workflow engine for execution
-        results = await workflow_engine.execute_workflow(nodes, edges, input_data)
+        try:
+            results = await workflow_engine.execute_workflow(
+                nodes, edges, input_data,
+                extra_headers={profiling.PROFILE_HEADER: session.id} if session else None,
+                run_id=db_run.id)
+        finally:
+            metrics.workflows_in_flight.dec()
+            metrics.workflow_latency.observe(time.perf_counter() - started)
+            if session is not None:
+                profile_report = profiling.stop_session(session)
+        if session is not None:
+            results["_profile"] = profile_report
+        metrics.workflow_runs.inc(status=results["_run_metadata"]["status"])
+        metrics.workflow_peak_result_bytes.observe(results["_run_metadata"]["peak_result_bytes"])
         
         # Update run record with results
-        db_run.output_json = results
-        db.commit()
-        db.refresh(db_run)
+        db_run = await database.run_db(crud.save_run_output, db, db_run, results)
 
-        return db_run
+        # The caller gets the results inline even when the stored copy went to the blob store.
+        return _run_response(db_run, results)
         
     except Exception as e:
         # Update run record with error
+        metrics.workflow_runs.inc(status="error")
         error_results = {"execution_error": str(e)}
-        db_run.output_json = error_results
-        db.commit()
-        db.refresh(db_run)
+        await database.run_db(crud.save_run_output, db, db_run, error_results)
         
         raise HTTPException(status_code=500, detail=f"Workflow execution failed: {str(e)}")
 
 
+async def _load_cost_history(db: Session):
+    """Seeds the engine's cost model from stored runs before this process plans its first run."""
+    costs = workflow_engine.costs
+    if costs.history_loaded:
+        return
+    costs.history_loaded = True
+    try:
+        outputs = await database.run_db(crud.recent_run_outputs, db, cost_model.COST_MODEL_HISTORY_RUNS)
+    except Exception as e:
+        print(f"Could not read run history for the cost model: {e}")
+        return
+    print(f"Cost model seeded with {costs.load_history(outputs)} node calls from {len(outputs)} runs.")
+
+
+@app.post("/workflow/{workflow_id}/estimate")
+async def estimate_workflow(
+    workflow_id: int,
+    request_body: dict = Body(default={}),
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Estimates how long a run with the given `inputs` takes, without running it: the predicted
+    completion time, the critical path and each node's predicted latency and start time.
+    """
+    db_workflow = await database.run_db(crud.get_user_workflow, db, workflow_id, current_user.id)
+    if not db_workflow:
+        raise HTTPException(
+            status_code=404, detail="Workflow not found or access denied.")
+    await _load_cost_history(db)
+
+    workflow_config = db_workflow.config_json
+    try:
+        return workflow_engine.estimate(workflow_config.get("nodes", []), workflow_config.get("edges", []),
+                                        request_body.get("inputs", {}))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# --- Workflow Runs ---
+def _run_record(db_run: models.WorkflowRun, output_json) -> dict:
+    """The fields of `schemas.WorkflowRun` for a run, with `output_json` as given."""
+    return {
+        "input_json": db_run.input_json,
+        "output_json": output_json,
+        "id": db_run.id,
+        "workflow_id": db_run.workflow_id,
+        "created_at": db_run.created_at,
+        "output_ref": db_run.output_ref,
+        "output_size": db_run.output_size,
+    }
+
+
+def _run_response(db_run: models.WorkflowRun, output_json) -> serialization.RawJSONResponse:
+    """
+    Encodes a run record straight to JSON. The output is passed through as it is instead of
+    being validated against `schemas.WorkflowRun`, which would walk every value in it.
+    """
+    return serialization.RawJSONResponse(serialization.dumps(_run_record(db_run, output_json)))
+
+
+@app.get("/workflow/{workflow_id}/runs",
+         response_model=list[Union[schemas.WorkflowRunSummary, schemas.WorkflowRun]])
+async def get_workflow_runs(
+    workflow_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Literal["full", "summary"] = "summary",
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Run history of a workflow, newest first, one page at a time.
+    Pass the `X-Next-Cursor` header of a response as `cursor` to get the next page.
+    `fields=full` includes the input and inline output JSON.
+    """
+    db_workflow = await database.run_db(crud.get_user_workflow, db, workflow_id, current_user.id)
+    if not db_workflow:
+        raise HTTPException(
+            status_code=404, detail="Workflow not found or access denied.")
+    try:
+        runs, next_cursor = await database.run_db(
+            crud.list_workflow_runs, db, workflow_id, limit, cursor, fields == "summary")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if fields == "full":
+        # Full records carry the inline outputs; encode them without re-validation.
+        return serialization.RawJSONResponse(
+            serialization.dumps([_run_record(run, run.output_json) for run in runs]), headers=headers)
+    response.headers.update(headers)
+    return runs
+
+
+@app.get("/runs/{run_id}", response_model=schemas.WorkflowRun)
+async def get_run(
+    run_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """Returns a run record. Large outputs are not inlined; see `output_ref`."""
+    db_run = await database.run_db(crud.get_user_run, db, run_id, current_user.id)
+    if not db_run:
+        raise HTTPException(status_code=404, detail="Run not found or access denied.")
+    return _run_response(db_run, db_run.output_json)
+
+
+@app.get("/runs/{run_id}/output")
+async def get_run_output(
+    run_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Returns the full output of a run. Outputs in the blob store are sent as stored, without
+    being parsed and re-encoded.
+    """
+    db_run = await database.run_db(crud.get_user_run, db, run_id, current_user.id)
+    if not db_run:
+        raise HTTPException(status_code=404, detail="Run not found or access denied.")
+    try:
+        return serialization.RawJSONResponse(await database.run_db(crud.load_run_output_bytes, db_run))
+    except FileNotFoundError:
+        raise HTTPException(status_code=410, detail="Run output is no longer available.")
+
+
+@app.post("/runs/{run_id}/cancel")
+async def cancel_run(
+    run_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Cancels a running workflow: the engine stops waiting for in-flight node requests and starts
+    no further nodes. Node handlers that already started run to completion on the server's
+    threadpool; their results are discarded. The run is saved with the results so far and
+    `_run_metadata.status` set to "cancelled".
+    """
+    db_run = await database.run_db(crud.get_user_run, db, run_id, current_user.id)
+    if not db_run:
+        raise HTTPException(status_code=404, detail="Run not found or access denied.")
+    if not workflow_engine.cancel(run_id):
+        raise HTTPException(status_code=409, detail="Run is not executing on this server.")
+    return {"run_id": run_id, "status": "cancelling"}
+
+
+@app.get("/runs/{run_id}/trace")
+async def get_run_trace(
+    run_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Returns the run's per-node timings as Chrome trace-event JSON.
+    Save the response to a file and open it in chrome://tracing or https://ui.perfetto.dev.
+    """
+    db_run = await database.run_db(crud.get_user_run, db, run_id, current_user.id)
+    if not db_run:
+        raise HTTPException(status_code=404, detail="Run not found or access denied.")
+    try:
+        output = await database.run_db(crud.load_run_output, db_run)
+    except FileNotFoundError:
+        raise HTTPException(status_code=410, detail="Run output is no longer available.")
+    return tracing.to_chrome_trace(output or {})
+
+
 @app.get("/", tags=["Health Check"])
 async def read_root():
     """A simple health check endpoint."""
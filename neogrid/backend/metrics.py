@@ -0,0 +1,311 @@
+"""
+Prometheus-style metrics.
+
+A small in-process implementation of counters, gauges and histograms rendered in the
+Prometheus text exposition format by `GET /metrics`. Recording a sample is a dict lookup and
+an addition under a lock, so instrumenting the hot path costs well under a microsecond.
+Gauges for queue depths are computed from callbacks at scrape time instead of being updated
+on every submit.
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "_total" if not self.name.endswith("_total") else "", _format_labels(self.labelnames, key), value
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float], **labels):
+        """Evaluate `fn` at scrape time for this label set."""
+        with self._lock:
+            self._functions[self._key(labels)] = fn
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        if key in self._functions:
+            return float(self._functions[key]())
+        return self._values.get(key, 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+            functions = list(self._functions.items())
+        for key, value in items:
+            yield "", _format_labels(self.labelnames, key), value
+        for key, fn in functions:
+            try:
+                value = float(fn())
+            except Exception:
+                continue
+            yield "", _format_labels(self.labelnames, key), value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield "_bucket", _format_labels(self.labelnames, key, le), cumulative
+            yield "_sum", _format_labels(self.labelnames, key), total
+            yield "_count", _format_labels(self.labelnames, key), count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- HTTP ---
+http_requests = Counter("neurogrid_http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+http_errors = Counter("neurogrid_http_errors_total", "HTTP requests that ended in a 5xx or an exception.",
+                      ("method", "route"))
+http_latency = Histogram("neurogrid_http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+http_in_flight = Gauge("neurogrid_http_requests_in_flight", "HTTP requests currently being handled.")
+
+# --- Nodes ---
+node_latency = Histogram("neurogrid_node_latency_seconds", "Node /infer handler latency.", ("node_type",))
+node_phase_latency = Histogram("neurogrid_node_phase_seconds",
+                               "Time spent in a phase of a node request (inference, fetch, ...).",
+                               ("node_type", "phase"))
+node_batch_size = Histogram("neurogrid_node_batch_size", "Items per /infer call.", ("node_type",),
+                            buckets=SIZE_BUCKETS)
+model_load = Histogram("neurogrid_model_load_seconds", "Model load time.", ("node_type",),
+                       buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+node_retries = Counter("neurogrid_node_retries_total", "Node calls retried after a transient failure.",
+                       ("node_type",))
+circuit_state = Gauge("neurogrid_node_circuit_state", "Circuit breaker per node type: 0 closed, 0.5 half-open, 1 open.",
+                      ("node_type",))
+cache_requests = Counter("neurogrid_cache_requests_total", "Cache lookups by cache and result.",
+                         ("cache", "result"))
+batch_tokens = Counter("neurogrid_batch_tokens_total",
+                       "Tokens sent to text models in batched calls, by kind (real, padding).", ("node_type", "kind"))
+deduplicated_items = Counter("neurogrid_deduplicated_items_total",
+                             "Node work saved by deduplication: coalesced in-flight calls and repeated batch items.",
+                             ("node_type", "kind"))
+long_inputs = Counter("neurogrid_long_inputs_total", "Inputs over a text model's token limit, by policy applied.",
+                      ("node_type", "policy"))
+
+# --- Engine and executors ---
+workflows_in_flight = Gauge("neurogrid_workflows_in_flight", "Workflow runs currently executing.")
+workflow_runs = Counter("neurogrid_workflow_runs_total", "Finished workflow runs by status.", ("status",))
+workflow_latency = Histogram("neurogrid_workflow_duration_seconds", "Workflow run wall time.")
+workflow_peak_result_bytes = Histogram("neurogrid_workflow_peak_result_bytes",
+                                       "Peak size of node outputs held by a workflow run.", buckets=BYTES_BUCKETS)
+admission_decisions = Counter("neurogrid_admission_decisions_total",
+                              "Workflow run admission decisions (admitted, queued, rejected_*).", ("result",))
+executor_queue_depth = Gauge("neurogrid_executor_queue_depth", "Tasks waiting for a worker, per executor.",
+                             ("executor",))
+cluster_workers = Gauge("neurogrid_cluster_workers_healthy", "Registered node workers currently in rotation.")
+worker_failovers = Counter("neurogrid_worker_failovers_total",
+                           "Node calls moved to another worker after a worker failed.", ("node_type",))
+
+# --- Database ---
+db_query_latency = Histogram("neurogrid_db_query_seconds", "Database statement latency.", ("operation",),
+                             buckets=DB_BUCKETS)
+
+
+def record_cache(cache: str, hit: bool):
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_node_stats(node_type: str, stats: Dict, seconds: float):
+    """Turns the per-request node stats collected by tracing into metrics."""
+    node_latency.observe(seconds, node_type=node_type)
+    for phase, milliseconds in stats["timings"].items():
+        if phase == "model_load":
+            model_load.observe(milliseconds / 1000, node_type=node_type)
+        elif phase not in ("handler", "cpu"):
+            node_phase_latency.observe(milliseconds / 1000, node_type=node_type, phase=phase)
+    for cache, status in stats["cache"].items():
+        record_cache(f"{node_type}.{cache}", status == "hit")
+
+
+def instrument_engine(engine):
+    """Observes the latency of every statement executed through a SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._neurogrid_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_neurogrid_started", None)
+        if started is not None:
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+            db_query_latency.observe(time.perf_counter() - started, operation=operation)
+
+
+def route_template(scope) -> str | None:
+    """
+    Full path template of the route a request matched, or None when it matched none. Routes of
+    included routers carry only their own part of the path; FastAPI records the prefixed
+    template in the request's effective route context.
+    """
+    route = scope.get("route")
+    if route is None:
+        return None
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    return getattr(context, "path_format", None) or getattr(route, "path_format", None) or route.path
+
+
+def _route_label(scope) -> str:
+    """
+    The path template of the matched route (/runs/{run_id}), which keeps label cardinality
+    bounded; requests that matched no route share one label.
+    """
+    return route_template(scope) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests, errors and latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            route_path = _route_label(scope)
+            method = scope.get("method", "")
+            http_requests.inc(method=method, route=route_path, status=str(status["code"]))
+            http_latency.observe(elapsed, method=method, route=route_path)
+            if status["code"] >= 500:
+                http_errors.inc(method=method, route=route_path)
@@ -0,0 +1,132 @@
+"""
+CPU inference settings for the model nodes.
+
+The model nodes run on CPU-only hosts. This module holds the optional optimized CPU mode:
+
+- dynamic int8 quantization of the `nn.Linear` layers of selected models (weights stored as
+  int8, activations quantized on the fly), which cuts memory and usually speeds up BART and
+  DistilBERT several times per core;
+- intra-op / inter-op thread counts for the process (torch's thread pools are process-wide;
+  per-model counts only apply to ONNX Runtime sessions);
+- `torch.inference_mode()` around every call, which skips autograd bookkeeping.
+
+Everything is a no-op when torch is not installed, so the nodes keep working with any
+transformers backend (and with test doubles).
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+# --- Configuration ---
+# Node types whose model gets dynamic int8 quantization, e.g. "summarizer,sentiment" (or "all").
+QUANTIZE_NODES = {name.strip() for name in os.getenv("NEUROGRID_QUANTIZE_NODES", "").split(",") if name.strip()}
+
+
+def _parse_threads(value: str) -> dict:
+    """
+    Parses "4" (every model) or "summarizer=4,sentiment=1" into {node_type or "*": threads}.
+    Malformed entries are reported and skipped rather than failing the app at import.
+    """
+    threads = {}
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, count = part.rpartition("=")
+        try:
+            threads[name.strip() or "*"] = int(count)
+        except ValueError:
+            print(f"Ignoring malformed NEUROGRID_TORCH_THREADS entry '{part}'; expected 'N' or 'node_type=N'.")
+    return threads
+
+
+# Intra-op threads; unset leaves torch's default (one per core). torch applies one count to the
+# whole process (see `process_threads`); per-model counts are used as is by ONNX Runtime.
+TORCH_THREADS = _parse_threads(os.getenv("NEUROGRID_TORCH_THREADS", ""))
+# Inter-op threads are process-wide and can only be set before torch starts parallel work.
+TORCH_INTEROP_THREADS = int(os.getenv("NEUROGRID_TORCH_INTEROP_THREADS", "0"))
+
+_configure_lock = threading.Lock()
+_configured = False
+
+
+def _torch():
+    try:
+        import torch
+    except ImportError:
+        return None
+    return torch
+
+
+def configure_torch():
+    """Applies the process-wide torch settings once, before the first model is loaded."""
+    global _configured
+    torch = _torch()
+    if torch is None or _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+        threads = process_threads()
+        if threads:
+            torch.set_num_threads(threads)
+        if TORCH_INTEROP_THREADS:
+            try:
+                torch.set_num_interop_threads(TORCH_INTEROP_THREADS)
+            except RuntimeError as e:
+                print(f"Could not set inter-op threads: {e}")
+        _configured = True
+
+
+def should_quantize(node_type: str) -> bool:
+    return "all" in QUANTIZE_NODES or node_type in QUANTIZE_NODES
+
+
+def thread_count(node_type: str) -> int | None:
+    return TORCH_THREADS.get(node_type, TORCH_THREADS.get("*"))
+
+
+def process_threads() -> int | None:
+    """
+    The intra-op thread count for torch. torch.set_num_threads is process-wide, so concurrent
+    requests to models with different counts cannot each have their own: the global count
+    applies, or else the largest per-model one.
+    """
+    return TORCH_THREADS.get("*") or max(TORCH_THREADS.values(), default=None)
+
+
+def mode(node_type: str) -> str:
+    """Label of the CPU mode a node's model runs in, for reports and logs."""
+    return "int8" if should_quantize(node_type) and _torch() is not None else "fp32"
+
+
+def optimize_pipeline(pipe, node_type: str, quantize: bool | None = None):
+    """
+    Prepares a freshly loaded pipeline for CPU inference: eval mode and, if enabled for this
+    node type (or forced with `quantize`), dynamic int8 quantization of its linear layers.
+    """
+    torch = _torch()
+    model = getattr(pipe, "model", None)
+    if torch is None or model is None:
+        return pipe
+    configure_torch()
+    model.eval()
+    if should_quantize(node_type) if quantize is None else quantize:
+        pipe.model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        print(f"Applied dynamic int8 quantization to the {node_type} model.")
+    return pipe
+
+
+@contextmanager
+def inference_mode(node_type: str):
+    """
+    Wraps a model call and disables autograd. The thread count is not changed here: it is
+    process-wide and set once by `configure_torch`.
+    """
+    torch = _torch()
+    if torch is None:
+        yield
+        return
+    with torch.inference_mode():
+        yield
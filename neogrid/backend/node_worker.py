@@ -0,0 +1,110 @@
+"""
+Standalone process hosting a subset of the node types for the API (see `cluster`).
+
+A node worker serves the same `/nodes/<type>/infer` routes as the API, plus `/health` and
+`/metrics`. Given `--api-url` it registers its node types with the API and repeats the
+registration as a heartbeat; the API then balances calls to those node types over its workers.
+
+    python -m neogrid.backend.node_worker --nodes summarizer,sentiment --port 9001 \\
+        --api-url http://127.0.0.1:8000
+
+The API and its workers must share NEUROGRID_CLUSTER_TOKEN; the API refuses registrations
+without it. Workers on other hosts must also pass `--advertise-url` with an address the API can
+reach.
+"""
+
+import argparse
+import asyncio
+import importlib
+from contextlib import asynccontextmanager
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from . import cluster, metrics, tracing
+
+NODE_TYPES = ("summarizer", "image_caption", "code_analyzer", "sentiment", "input_node",
+              "preprocessing_node", "postprocessing_node", "output_node")
+
+
+async def heartbeat(api_url: str, advertise_url: str, node_types: List[str]):
+    """Registers with the API and keeps re-registering, riding out API restarts."""
+    headers = {cluster.CLUSTER_TOKEN_HEADER: cluster.CLUSTER_TOKEN} if cluster.CLUSTER_TOKEN else {}
+    registration = {"url": advertise_url, "node_types": node_types}
+    interval = cluster.WORKER_TTL / 3
+    async with httpx.AsyncClient(base_url=api_url, headers=headers, timeout=10) as client:
+        while True:
+            try:
+                response = await client.post("/cluster/workers", json=registration)
+                response.raise_for_status()
+                interval = response.json().get("heartbeat_seconds", interval)
+            except Exception as e:
+                print(f"Could not register with {api_url}: {e}")
+            await asyncio.sleep(interval)
+
+
+def create_app(node_types: List[str], api_url: str | None = None, advertise_url: str | None = None) -> FastAPI:
+    """App serving the routes of `node_types`; registers at `api_url` when given."""
+
+    @asynccontextmanager
+    async def lifespan(app):
+        task = asyncio.create_task(heartbeat(api_url, advertise_url, node_types)) if api_url else None
+        yield
+        if task is not None:
+            task.cancel()
+            headers = {cluster.CLUSTER_TOKEN_HEADER: cluster.CLUSTER_TOKEN} if cluster.CLUSTER_TOKEN else {}
+            try:
+                async with httpx.AsyncClient(base_url=api_url, headers=headers, timeout=5) as client:
+                    await client.delete("/cluster/workers", params={"url": advertise_url})
+            except httpx.HTTPError:
+                pass
+
+    app = FastAPI(title=f"NeuroGrid node worker ({', '.join(node_types)})", lifespan=lifespan)
+    app.add_middleware(tracing.NodeTimingMiddleware)
+    app.add_middleware(metrics.MetricsMiddleware)
+    for node_type in node_types:
+        module = importlib.import_module(f".nodes.{node_type}", __package__)
+        app.include_router(module.router, prefix=f"/nodes/{node_type}", tags=["AI Nodes"])
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok", "node_types": node_types}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def get_metrics():
+        return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a subset of the NeuroGrid node types for the API.")
+    parser.add_argument("--nodes", required=True, help="Comma-separated node types to host.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--api-url", help="Register with this API, e.g. http://127.0.0.1:8000.")
+    parser.add_argument("--advertise-url", help="URL the API calls this worker at (default http://<host>:<port>).")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    node_types = [name.strip() for name in args.nodes.split(",") if name.strip()]
+    unknown = set(node_types) - set(NODE_TYPES)
+    if unknown or not node_types:
+        parser.error(f"unknown node types: {', '.join(sorted(unknown)) or '(none given)'}")
+
+    if args.api_url and not cluster.CLUSTER_TOKEN:
+        parser.error("registering with --api-url needs NEUROGRID_CLUSTER_TOKEN, shared with the API")
+
+    import uvicorn
+
+    advertise_url = args.advertise_url or f"http://{args.host}:{args.port}"
+    app = create_app(node_types, args.api_url, advertise_url)
+    print(f"Node worker for {', '.join(node_types)} on {advertise_url}.")
+    uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
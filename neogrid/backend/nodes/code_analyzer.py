@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
 import ast
 
+from .. import tracing
+
 router = APIRouter()
 
 def analyze_python_code(code: str) -> dict:
@@ -44,6 +46,7 @@ def analyze_python_code(code: str) -> dict:
 
 
 @router.post("/infer")
+@tracing.traced_node
 def analyze_code(payload: dict):
     """
     Accepts a JSON payload with an "input" key containing Python code as a string.
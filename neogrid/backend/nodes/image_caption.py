@@ -4,26 +4,38 @@ import requests
 from PIL import Image
 from io import BytesIO
 
+from .. import coalescing, model_runtime, tracing
+
 router = APIRouter()
 
 # Initialize the model as None. It will be loaded on the first request.
 captioner_pipeline = None
 
+def load_model():
+    """Loads the model unless it is loaded already. Also used to preload it before forking workers."""
+    global captioner_pipeline
+    if captioner_pipeline is None:
+        print("Loading image captioning model for the first time...")
+        captioner_pipeline = model_runtime.optimize_pipeline(
+            pipeline("image-to-text", model="nlpconnect/vit-gpt2-image-captioning"), "image_caption")
+        print("Image captioning model loaded successfully.")
+    return captioner_pipeline
+
 @router.post("/infer")
+@tracing.traced_node
+@coalescing.single_flight
 def generate_caption(payload: dict):
     """
     Accepts a JSON payload with an "input" key containing a URL to an image.
     Returns a JSON object with an "output" key containing the generated caption.
     Loads the model on the first request (lazy loading).
     """
-    global captioner_pipeline
-
     # Lazy loading: If the model is not loaded, load it.
+    tracing.record_cache("model", hit=captioner_pipeline is not None)
     if captioner_pipeline is None:
         try:
-            print("Loading image captioning model for the first time...")
-            captioner_pipeline = pipeline("image-to-text", model="nlpconnect/vit-gpt2-image-captioning")
-            print("Image captioning model loaded successfully.")
+            with tracing.timed("model_load"):
+                load_model()
         except Exception as e:
             raise HTTPException(status_code=503, detail=f"Image captioning model could not be loaded: {e}")
 
@@ -34,14 +46,16 @@ def generate_caption(payload: dict):
 
     try:
         # Fetch the image from the URL
-        response = requests.get(image_url, stream=True)
-        response.raise_for_status()
+        with tracing.timed("fetch"):
+            response = requests.get(image_url, stream=True)
+            response.raise_for_status()
 
-        # Open the image using Pillow
-        image = Image.open(BytesIO(response.content))
+            # Open the image using Pillow
+            image = Image.open(BytesIO(response.content))
 
         # Generate the caption
-        caption_result = captioner_pipeline(image)
+        with tracing.timed("inference"), model_runtime.inference_mode("image_caption"):
+            caption_result = captioner_pipeline(image)
 
         # The output from this pipeline is a list of dictionaries
         return {"output": caption_result[0]["generated_text"]}
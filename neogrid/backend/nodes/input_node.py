@@ -3,9 +3,12 @@ import json
 import pandas as pd
 from io import StringIO
 
+from .. import tracing
+
 router = APIRouter()
 
 @router.post("/infer")
+@tracing.traced_node
 def process_input(payload: dict):
     """
     Input Node: Handles various input types (text, JSON, CSV data)
@@ -4,6 +4,8 @@ import pandas as pd
 from io import StringIO
 from typing import Any, Dict, List
 
+from .. import tracing
+
 router = APIRouter()
 
 def format_as_text(data: Any) -> str:
@@ -81,6 +83,7 @@ def format_as_summary(data: Any) -> Dict:
     return summary
 
 @router.post("/infer")
+@tracing.traced_node
 def format_output(payload: dict):
     """
     Output Node: Formats and presents final workflow results
@@ -3,6 +3,8 @@ import json
 import re
 from typing import Any, Dict, List, Union
 
+from .. import tracing
+
 router = APIRouter()
 
 def aggregate_results(data: List[Dict], aggregation_type: str = "concat") -> Any:
@@ -112,6 +114,7 @@ def format_ai_results(data: Any, format_type: str = "standard") -> Dict:
     return {"formatted_result": data}
 
 @router.post("/infer")
+@tracing.traced_node
 def postprocess_results(payload: dict):
     """
     Postprocessing Node: Processes and refines AI model outputs
@@ -4,6 +4,8 @@ import re
 import json
 from typing import Any, Dict, List
 
+from .. import tracing
+
 router = APIRouter()
 
 def clean_text(text: str) -> str:
@@ -54,6 +56,7 @@ def filter_data(data: List[Dict], filters: Dict) -> List[Dict]:
     return filtered_data
 
 @router.post("/infer")
+@tracing.traced_node
 def preprocess_data(payload: dict):
     """
     Preprocessing Node: Cleans, normalizes, and transforms data
@@ -1,38 +1,142 @@
+import os
+
 from fastapi import APIRouter, HTTPException
 from transformers import pipeline
 
+from .. import coalescing, inference_backends, metrics, model_runtime, sentence_cache, text_batching, tracing
+
 router = APIRouter()
 
+# --- Configuration ---
+# Exponent of a window's token count in its weight when the windows of a long input are combined:
+# 1 weighs windows by length, 0 averages them equally.
+LENGTH_WEIGHT = float(os.getenv("NEUROGRID_SENTIMENT_LENGTH_WEIGHT", "1"))
+
+# The model's labels are complementary, so a window's score for one is 1 - score for the other.
+OPPOSITE_LABELS = {"POSITIVE": "NEGATIVE", "NEGATIVE": "POSITIVE"}
+
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+
 # Initialize the model as None. It will be loaded on the first request.
 sentiment_analyzer_pipeline = None
 
+def combine_chunk_sentiments(pieces, length_weight: float = None, detail: str = "windows"):
+    """
+    Combines the windows of a long input: each label's probability is averaged over the windows,
+    weighted by tokens ** `length_weight`, and the most probable label wins. The result lists
+    every window's label, score and tokens under `detail`, in text order.
+    """
+    length_weight = LENGTH_WEIGHT if length_weight is None else length_weight
+    probabilities = {}
+    total = 0.0
+    for result, tokens in pieces:
+        weight = max(tokens, 1) ** length_weight
+        total += weight
+        probabilities[result["label"]] = probabilities.get(result["label"], 0.0) + weight * result["score"]
+        opposite = OPPOSITE_LABELS.get(result["label"])
+        if opposite is not None:
+            probabilities[opposite] = probabilities.get(opposite, 0.0) + weight * (1 - result["score"])
+    label = max(probabilities, key=probabilities.get)
+    return {
+        "label": label,
+        "score": probabilities[label] / total,
+        detail: [{"label": result["label"], "score": result["score"], "tokens": tokens} for result, tokens in pieces],
+    }
+
+def load_model():
+    """Loads the model unless it is loaded already. Also used to preload it before forking workers."""
+    global sentiment_analyzer_pipeline
+    if sentiment_analyzer_pipeline is None:
+        print("Loading sentiment analysis model for the first time...")
+        sentiment_analyzer_pipeline = inference_backends.load_pipeline(
+            "sentiment", "sentiment-analysis", MODEL_NAME, factory=pipeline)
+        print("Sentiment analysis model loaded successfully.")
+    return sentiment_analyzer_pipeline
+
+def sentence_cache_namespace() -> str:
+    """
+    Namespace of this node's sentence cache entries. The inference backend and the int8 mode
+    change the scores, so entries are only reused for the same model, backend and mode.
+    """
+    return f"sentiment:{MODEL_NAME}:{inference_backends.backend_for('sentiment')}:{model_runtime.mode('sentiment')}"
+
+def analyze_by_sentence(texts, policy: str = None, cache: sentence_cache.SentenceCache = None) -> list:
+    """
+    Scores each text sentence by sentence, running the model only on sentences missing from the
+    sentence cache, and combines the sentence scores of each text by length.
+    """
+    cache = sentence_cache.sentence_cache if cache is None else cache
+    # The model is uncased, so lowercased sentences share an entry.
+    sentences = [[sentence_cache.normalize(s) for s in sentence_cache.split_sentences(text)] or [text]
+                 for text in texts]
+    unique = list(dict.fromkeys(s for text_sentences in sentences for s in text_sentences))
+    namespace = sentence_cache_namespace()
+    keys = {s: sentence_cache.sentence_key(namespace, s) for s in unique}
+
+    cached = cache.get_many(list(keys.values()))
+    missing = [s for s in unique if keys[s] not in cached]
+    tracing.record_cache("sentence", hit=not missing)
+    if missing:
+        scored = text_batching.run_batched(
+            sentiment_analyzer_pipeline, missing, "sentiment", combine=combine_chunk_sentiments, policy=policy)
+        tokens = text_batching.count_tokens(sentiment_analyzer_pipeline, missing)
+        new = {keys[s]: {"label": result["label"], "score": result["score"], "tokens": count}
+               for s, result, count in zip(missing, scored, tokens)}
+        cache.put_many(new)
+        cached.update(new)
+    metrics.deduplicated_items.inc(sum(map(len, sentences)) - len(missing), node_type="sentiment", kind="sentence_cache")
+
+    results = []
+    for text_sentences in sentences:
+        pieces = [(cached[keys[s]], cached[keys[s]]["tokens"]) for s in text_sentences]
+        results.append(combine_chunk_sentiments(pieces, detail="sentences"))
+    return results
+
 @router.post("/infer")
+@tracing.traced_node
+@coalescing.single_flight
 def analyze_sentiment_endpoint(payload: dict):
     """
     Accepts a JSON payload with an "input" key containing the text to be analyzed.
     Returns a JSON object with an "output" key containing the sentiment analysis result.
     Loads the model on the first request (lazy loading).
     """
-    global sentiment_analyzer_pipeline
-
     # Lazy loading: If the model is not loaded, load it.
+    tracing.record_cache("model", hit=sentiment_analyzer_pipeline is not None)
     if sentiment_analyzer_pipeline is None:
         try:
-            print("Loading sentiment analysis model for the first time...")
-            sentiment_analyzer_pipeline = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-            print("Sentiment analysis model loaded successfully.")
+            with tracing.timed("model_load"):
+                load_model()
         except Exception as e:
             raise HTTPException(status_code=503, detail=f"Sentiment analysis model could not be loaded: {e}")
 
     if "input" not in payload:
         raise HTTPException(status_code=400, detail="Payload must contain an 'input' field.")
 
-    text = payload["input"]
+    # "long_input" overrides the configured policy for texts over the model's limit.
+    policy = payload.get("long_input")
+    if policy is not None and policy not in text_batching.POLICIES:
+        raise HTTPException(status_code=400, detail=f"'long_input' must be one of {text_batching.POLICIES}.")
+
+    # "sentence_cache" overrides NEUROGRID_SENTENCE_CACHE for this request.
+    by_sentence = payload.get("sentence_cache", sentence_cache.SENTENCE_CACHE_ENABLED)
+    if not isinstance(by_sentence, bool):
+        raise HTTPException(status_code=400, detail="'sentence_cache' must be true or false.")
+
+    texts, batched = text_batching.texts_from_input(payload["input"], payload.get("text_field", "text"))
+    metrics.node_batch_size.observe(len(texts), node_type="sentiment")
 
     try:
-        # Perform sentiment analysis
-        result = sentiment_analyzer_pipeline(text)
-        # The output from the pipeline is a list of dictionaries
-        return {"output": result[0]}
+        # Perform sentiment analysis in length-bucketed batches
+        with tracing.timed("inference"), model_runtime.inference_mode("sentiment"):
+            if by_sentence:
+                results = analyze_by_sentence(texts, policy)
+            else:
+                results = text_batching.run_batched(
+                    sentiment_analyzer_pipeline, texts, "sentiment", combine=combine_chunk_sentiments, policy=policy)
+        # A list input gets one result per item
+        return {"output": results if batched else results[0]}
+    except text_batching.InputTooLong as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred during sentiment analysis: {e}")
\ No newline at end of file
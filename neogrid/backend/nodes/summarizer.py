@@ -1,37 +1,61 @@
 from fastapi import APIRouter, HTTPException
 from transformers import pipeline
 
+from .. import coalescing, inference_backends, metrics, model_runtime, text_batching, tracing
+
 router = APIRouter()
 
 # Initialize the model as None. It will be loaded on the first request.
 summarizer_pipeline = None
 
+def combine_chunk_summaries(pieces):
+    """Joins the summaries of the chunks of a long input in order."""
+    return {"summary_text": " ".join(summary["summary_text"] for summary, _ in pieces)}
+
+def load_model():
+    """Loads the model unless it is loaded already. Also used to preload it before forking workers."""
+    global summarizer_pipeline
+    if summarizer_pipeline is None:
+        print("Loading summarizer model for the first time...")
+        summarizer_pipeline = inference_backends.load_pipeline(
+            "summarizer", "summarization", "facebook/bart-large-cnn", factory=pipeline)
+        print("Summarizer model loaded successfully.")
+    return summarizer_pipeline
+
 @router.post("/infer")
+@tracing.traced_node
+@coalescing.single_flight
 def summarize(payload: dict):
     """
     Accepts a JSON payload with an "input" key containing the text to be summarized.
     Returns a JSON object with an "output" key containing the summary.
     Loads the model on the first request (lazy loading).
     """
-    global summarizer_pipeline
-
     # Lazy loading: If the model is not loaded, load it.
+    tracing.record_cache("model", hit=summarizer_pipeline is not None)
     if summarizer_pipeline is None:
         try:
-            print("Loading summarizer model for the first time...")
-            summarizer_pipeline = pipeline("summarization", model="facebook/bart-large-cnn")
-            print("Summarizer model loaded successfully.")
+            with tracing.timed("model_load"):
+                load_model()
         except Exception as e:
             raise HTTPException(status_code=503, detail=f"Summarizer model could not be loaded: {e}")
 
     if "input" not in payload:
         raise HTTPException(status_code=400, detail="Payload must contain an 'input' field.")
 
-    text = payload["input"]
+    texts, batched = text_batching.texts_from_input(payload["input"], payload.get("text_field", "text"))
+    metrics.node_batch_size.observe(len(texts), node_type="summarizer")
 
     try:
-        # Perform summarization
-        summary = summarizer_pipeline(text, max_length=130, min_length=30, do_sample=False)
-        return {"output": summary[0]["summary_text"]}
+        # Perform summarization in length-bucketed batches; chunks of a long input are summarized separately
+        with tracing.timed("inference"), model_runtime.inference_mode("summarizer"):
+            summaries = text_batching.run_batched(
+                summarizer_pipeline, texts, "summarizer", combine=combine_chunk_summaries,
+                max_length=130, min_length=30, do_sample=False)
+        outputs = [summary["summary_text"] for summary in summaries]
+        # A list input gets one summary per item
+        return {"output": outputs if batched else outputs[0]}
+    except text_batching.InputTooLong as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred during summarization: {e}")
\ No newline at end of file
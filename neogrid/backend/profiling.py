@@ -0,0 +1,248 @@
+"""
+On-demand profiling of live workflow runs.
+
+A `ProfileSession` combines three views of the same time window:
+
+- cProfile of the event loop thread (engine, routing, serialization) merged with cProfile of
+  every node handler that runs for the session, saved as a `.pstats` file
+  (`python -m pstats`, snakeviz);
+- a wall-clock sampling profiler over all threads, saved as folded stacks
+  (`flamegraph.pl`, speedscope, https://www.speedscope.app);
+- a tracemalloc snapshot diff, reported as the top allocation sites overall and per node.
+
+Only one session runs at a time. Node requests belong to a session either because they carry
+its id in the `X-NeuroGrid-Profile` header (a profiled run) or because the session captures the
+whole process (`POST /admin/profile`).
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List
+
+PROFILE_DIR = os.getenv("NEUROGRID_PROFILE_DIR", "./profiles")
+PROFILE_HEADER = "X-NeuroGrid-Profile"
+SAMPLE_INTERVAL_MS = float(os.getenv("NEUROGRID_PROFILE_SAMPLE_INTERVAL_MS", "5"))
+MAX_SAMPLE_SECONDS = float(os.getenv("NEUROGRID_PROFILE_MAX_SECONDS", "60"))
+TRACEMALLOC_FRAMES = 25
+TOP_N = 25
+
+# Leaf frames of threads that are parked, not working; dropped from the sampled profile.
+_IDLE_LEAVES = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get"),
+                ("threading.py", "_wait_for_tstate_lock")}
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile session is requested while another one is running."""
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads every `interval_ms` and counts folded stacks."""
+
+    def __init__(self, interval_ms: float = SAMPLE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="neurogrid-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((os.path.basename(code.co_filename), code.co_name))
+                    frame = frame.f_back
+                if not stack or stack[0] in _IDLE_LEAVES:
+                    continue
+                frames = [names.get(ident, str(ident))] + [f"{name}:{func}" for name, func in reversed(stack)]
+                self.stacks[";".join(frames)] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Brendan Gregg's folded stack format: `frame;frame;frame count` per line."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+
+class ProfileSession:
+    def __init__(self, label: str, capture_all: bool = False, sample_interval_ms: float = SAMPLE_INTERVAL_MS):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.capture_all = capture_all
+        self.sample_interval_ms = sample_interval_ms
+        self._loop_profiler = cProfile.Profile()
+        self._node_profilers: List[cProfile.Profile] = []
+        self._node_types: Counter = Counter()
+        self._lock = threading.Lock()
+        self._sampler = SamplingProfiler(sample_interval_ms)
+        self._started_tracemalloc = False
+        self._baseline = None
+        self._started = 0.0
+
+    def start(self):
+        """Starts profiling; must be called on the thread that will later call `stop` (the event loop)."""
+        self._started = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        self._baseline = tracemalloc.take_snapshot()
+        self._sampler.start()
+        self._loop_profiler.enable()
+
+    def run_node(self, node_type: str, fn: Callable, *args, **kwargs):
+        """Runs a node handler under its own cProfile and records it for this session."""
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ profiles all threads from one profiler, so the loop profiler covers this.
+            profiler = None
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            with self._lock:
+                if profiler is not None:
+                    self._node_profilers.append(profiler)
+                self._node_types[node_type] += 1
+
+    def stop(self) -> Dict[str, Any]:
+        self._loop_profiler.disable()
+        self._sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+
+        stats = pstats.Stats(self._loop_profiler)
+        with self._lock:
+            node_profilers = list(self._node_profilers)
+            node_types = dict(self._node_types)
+        for profiler in node_profilers:
+            stats.add(profiler)
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stats.dump_stats(profile_path(self.id, "pstats"))
+        with open(profile_path(self.id, "folded"), "w") as f:
+            f.write(self._sampler.folded())
+
+        return {
+            "id": self.id,
+            "label": self.label,
+            "duration_ms": duration_ms,
+            "samples": self._sampler.samples,
+            "node_calls": node_types,
+            "files": {kind: f"/admin/profiles/{self.id}/{kind}" for kind in ("pstats", "folded")},
+            "top_functions": top_functions(stats),
+            "memory": memory_report(snapshot, self._baseline, node_types),
+        }
+
+
+def top_functions(stats: pstats.Stats, limit: int = TOP_N) -> List[Dict[str, Any]]:
+    rows = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({func})",
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda row: row["cumtime_ms"], reverse=True)
+    return rows[:limit]
+
+
+def _allocation_sites(statistics, limit: int) -> List[Dict[str, Any]]:
+    return [
+        {"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+         "size_diff_kib": round(stat.size_diff / 1024, 2), "count_diff": stat.count_diff}
+        for stat in statistics[:limit] if stat.size_diff > 0
+    ]
+
+
+def memory_report(snapshot, baseline, node_types, limit: int = 15) -> Dict[str, Any]:
+    """Allocation sites that grew during the session, overall and per node module."""
+    report = {
+        "top_sites": _allocation_sites(snapshot.compare_to(baseline, "lineno"), limit),
+        "by_node": {},
+    }
+    for node_type in node_types:
+        node_filter = [tracemalloc.Filter(True, f"*{os.sep}nodes{os.sep}{node_type}.py", all_frames=True)]
+        report["by_node"][node_type] = _allocation_sites(
+            snapshot.filter_traces(node_filter).compare_to(baseline.filter_traces(node_filter), "lineno"), 5)
+    return report
+
+
+def profile_path(profile_id: str, kind: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{kind}")
+
+
+# --- Active session ---
+
+_active: ProfileSession | None = None
+_active_lock = threading.Lock()
+_reports: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+MAX_REPORTS = 20
+
+
+def start_session(label: str, capture_all: bool = False,
+                  sample_interval_ms: float = SAMPLE_INTERVAL_MS) -> ProfileSession:
+    global _active
+    with _active_lock:
+        if _active is not None:
+            raise ProfilerBusy(f"Profile session {_active.id} is already running.")
+        session = ProfileSession(label, capture_all, sample_interval_ms)
+        _active = session
+    try:
+        session.start()
+    except Exception:
+        with _active_lock:
+            _active = None
+        raise
+    return session
+
+
+def stop_session(session: ProfileSession) -> Dict[str, Any]:
+    global _active
+    try:
+        report = session.stop()
+    finally:
+        with _active_lock:
+            if _active is session:
+                _active = None
+    _reports[session.id] = report
+    while len(_reports) > MAX_REPORTS:
+        _reports.popitem(last=False)
+    return report
+
+
+def session_for(profile_id: str | None) -> ProfileSession | None:
+    """The running session a node request belongs to, if any."""
+    session = _active
+    if session is None:
+        return None
+    if session.capture_all or (profile_id is not None and profile_id == session.id):
+        return session
+    return None
+
+
+def get_report(profile_id: str) -> Dict[str, Any] | None:
+    return _reports.get(profile_id)
@@ -0,0 +1,63 @@
+# backend/routers/admin.py
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+import os
+
+from ..database import schemas
+from .. import profiling
+from .auth import get_admin_user
+
+router = APIRouter()
+
+PROFILE_MEDIA_TYPES = {"pstats": "application/octet-stream", "folded": "text/plain"}
+
+# ---------------------------
+# PROFILING
+# ---------------------------
+
+
+@router.post("/profile")
+async def profile_process(
+    seconds: float = Query(5.0, gt=0, le=profiling.MAX_SAMPLE_SECONDS),
+    interval_ms: float = Query(profiling.SAMPLE_INTERVAL_MS, ge=1, le=1000),
+    admin: schemas.User = Depends(get_admin_user)
+):
+    """
+    Profiles the whole process for `seconds`: every node request handled in that window is
+    run under cProfile, all threads are sampled for a flamegraph, and allocations are traced.
+    """
+    try:
+        session = profiling.start_session(f"process sample ({seconds:g}s)", capture_all=True,
+                                          sample_interval_ms=interval_ms)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        report = profiling.stop_session(session)
+    return report
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile_report(profile_id: str, admin: schemas.User = Depends(get_admin_user)):
+    """The summary report of a recent profile session."""
+    report = profiling.get_report(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return report
+
+
+@router.get("/profiles/{profile_id}/{kind}")
+async def download_profile(profile_id: str, kind: str, admin: schemas.User = Depends(get_admin_user)):
+    """
+    Downloads a profile: `pstats` (load with `python -m pstats` or snakeviz) or `folded`
+    stacks (flamegraph.pl, speedscope).
+    """
+    if kind not in PROFILE_MEDIA_TYPES or not profile_id.isalnum():
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    path = profiling.profile_path(profile_id, kind)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return FileResponse(path, media_type=PROFILE_MEDIA_TYPES[kind], filename=f"{profile_id}.{kind}")
@@ -1,13 +1,20 @@
 # backend/routers/auth.py
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import event
 from sqlalchemy.orm import Session
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import hashlib
+import os
+import threading
+import time
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from pydantic import BaseModel
 
 from ..database import models, database, schemas
+from .. import metrics
+from ..hashing import HashingOverloaded, password_hasher
 
 # ---------------------------
 # CONFIG
@@ -15,9 +22,13 @@ from ..database import models, database, schemas
 SECRET_KEY = "neurogrid_secret_key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+# Verified tokens are cached for at most this long (and never past their own expiry).
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("NEUROGRID_AUTH_CACHE_TTL", "300"))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("NEUROGRID_AUTH_CACHE_SIZE", "10000"))
+# Users allowed to call the /admin endpoints (comma-separated usernames).
+ADMIN_USERNAMES = {name.strip() for name in os.getenv("NEUROGRID_ADMIN_USERS", "").split(",") if name.strip()}
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["Argon2"], deprecated="auto")
 
 # ---------------------------
 # SCHEMAS
@@ -34,88 +45,219 @@ class LoginRequest(BaseModel):
     password: str
 
 # ---------------------------
-# HELPER FUNCTIONS
+# TOKEN CACHE
 # ---------------------------
 
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+class TokenCache:
+    """
+    Bounded LRU cache of verified access tokens -> user identity, with per-entry expiry.
+    Entries are dropped when their user changes in this process (see the SQLAlchemy listeners
+    below); other processes re-check the user when the token is not in their own cache.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX_SIZE, ttl: float = TOKEN_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, schemas.User]] = OrderedDict()
+        # Listeners fire on DB executor threads while lookups happen on the event loop.
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> schemas.User | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= now:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def put(self, token: str, user: schemas.User, token_exp: float):
+        expires_at = min(time.time() + self.ttl, token_exp)
+        with self._lock:
+            self._entries[token] = (expires_at, user)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            stale = [token for token, (_, user) in self._entries.items() if user.id == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_tokens(mapper, connection, target):
+    token_cache.invalidate_user(target.id)
+
+# ---------------------------
+# HELPER FUNCTIONS
+# ---------------------------
 
 
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
+def _overloaded(e: HashingOverloaded):
+    return HTTPException(
+        status_code=429,
+        detail="Too many concurrent sign-ins, please retry shortly.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire, "iat": now})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def credentials_version(user) -> str:
+    """
+    Short fingerprint of the user's password hash, carried in tokens as `pwv`. Changing the
+    password changes it, which revokes tokens issued before.
+    """
+    return hashlib.sha256(user.hashed_password.encode("utf-8")).hexdigest()[:16]
+
+
 def get_user(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
+
+def get_user_by_id(db: Session, user_id: int):
+    return db.query(models.User).filter(models.User.id == user_id).first()
+
+
+def get_user_and_release(db: Session, username: str):
+    """
+    Looks up a user, then closes the session so its pooled connection is not held while
+    the (slow) password hash runs. The returned object stays usable, just detached.
+    """
+    user = get_user(db, username)
+    db.close()
+    return user
+
+
+def create_user(db: Session, username: str, hashed_password: str):
+    new_user = models.User(username=username, hashed_password=hashed_password)
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
+    return new_user
+
 # ---------------------------
 # ROUTES
 # ---------------------------
 
 
 @router.post("/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+async def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
     # Ensure username is provided
     if not user.username or not user.username.strip():
         raise HTTPException(
             status_code=400, detail="Username is required")
     
     # Check if username already exists
-    db_user = get_user(db, user.username)
+    db_user = await database.run_db(get_user_and_release, db, user.username)
     if db_user:
         raise HTTPException(
             status_code=400, detail="Username already registered")
     
     # Truncate password to 72 characters to prevent bcrypt errors
     truncated_password = user.password[:72]
-    hashed_pw = get_password_hash(truncated_password)
-    new_user = models.User(username=user.username, hashed_password=hashed_pw)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    try:
+        hashed_pw = await password_hasher.hash(truncated_password)
+    except HashingOverloaded as e:
+        raise _overloaded(e)
+    return await database.run_db(create_user, db, user.username, hashed_pw)
 
 
 @router.post("/login", response_model=Token)
-def login_user(request: LoginRequest, db: Session = Depends(database.get_db)):
+async def login_user(request: LoginRequest, db: Session = Depends(database.get_db)):
     # Ensure username and password are provided
     if not request.username or not request.username.strip():
         raise HTTPException(status_code=400, detail="Username is required")
     if not request.password:
         raise HTTPException(status_code=400, detail="Password is required")
     
-    user = get_user(db, request.username)
+    user = await database.run_db(get_user_and_release, db, request.username)
     # Truncate password to 72 characters for consistency with registration
     truncated_password = request.password[:72]
-    if not user or not verify_password(truncated_password, user.hashed_password):
+    try:
+        valid = user is not None and await password_hasher.verify(truncated_password, user.hashed_password)
+    except HashingOverloaded as e:
+        raise _overloaded(e)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    access_token = create_access_token(data={"sub": user.username})
+    # The user id travels in the token so cache misses look the user up by primary key.
+    access_token = create_access_token(
+        data={"sub": user.username, "uid": user.id, "pwv": credentials_version(user)})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    """
+    Resolves the bearer token to the current user's identity.
+    Verified tokens are served from `token_cache` without database access. On a cache miss
+    the user is looked up, so tokens of deleted users, and tokens issued before a password
+    change, are rejected in every process, including after a restart.
+    """
+    cached_user = token_cache.get(token)
+    metrics.record_cache("auth.token", hit=cached_user is not None)
+    if cached_user is not None:
+        return cached_user
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(
-                status_code=401, detail="Invalid authentication token")
-        user = get_user(db, username=username)
-        if user is None:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
     except JWTError:
         raise HTTPException(
             status_code=401, detail="Invalid authentication token")
+
+    username: str = payload.get("sub")
+    if username is None:
+        raise HTTPException(
+            status_code=401, detail="Invalid authentication token")
+
+    expires_at = payload.get("exp")
+    if expires_at is None:
+        raise HTTPException(
+            status_code=401, detail="Invalid authentication token")
+
+    user_id = payload.get("uid")
+    if user_id is not None:
+        db_user = await database.run_db(get_user_by_id, db, user_id)
+    else:
+        # Legacy token without a uid
+        db_user = await database.run_db(get_user, db, username=username)
+    if db_user is None or db_user.username != username:
+        raise HTTPException(status_code=401, detail="User not found")
+    # Tokens issued before the `pwv` claim existed are only checked for the user's existence.
+    if "pwv" in payload and payload["pwv"] != credentials_version(db_user):
+        raise HTTPException(status_code=401, detail="Token revoked, please sign in again")
+    user = schemas.User(id=db_user.id, username=db_user.username)
+
+    token_cache.put(token, user, expires_at)
+    return user
+
+
+async def get_admin_user(current_user: schemas.User = Depends(get_current_user)):
+    """Like `get_current_user`, but only for users listed in NEUROGRID_ADMIN_USERS."""
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
@@ -0,0 +1,54 @@
+# backend/routers/cluster.py
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from ..database import schemas
+from .. import cluster
+from .auth import get_admin_user
+
+router = APIRouter()
+
+def verify_cluster_token(token: str | None = Header(None, alias=cluster.CLUSTER_TOKEN_HEADER)):
+    """
+    Workers authenticate with the shared cluster token. Without one configured, registration
+    is refused: the peer address cannot be trusted behind a reverse proxy, and a registered
+    worker receives every user's payloads for its node types.
+    """
+    if not cluster.CLUSTER_TOKEN:
+        raise HTTPException(status_code=403, detail="Worker registration is disabled; set NEUROGRID_CLUSTER_TOKEN")
+    if not hmac.compare_digest(token or "", cluster.CLUSTER_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid cluster token")
+
+
+# ---------------------------
+# WORKERS
+# ---------------------------
+
+
+@router.post("/workers", dependencies=[Depends(verify_cluster_token)])
+async def register_worker(registration: schemas.WorkerRegistration):
+    """
+    Registers a node worker, or refreshes it when it is registered already. Workers repeat
+    this as their heartbeat.
+    """
+    if not registration.url.startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="Worker url must be an http(s) URL")
+    if not registration.node_types:
+        raise HTTPException(status_code=400, detail="A worker must host at least one node type")
+    worker = cluster.worker_registry.register(registration.url, registration.node_types)
+    return {**worker.snapshot(), "heartbeat_seconds": cluster.worker_registry.ttl / 3}
+
+
+@router.delete("/workers", dependencies=[Depends(verify_cluster_token)])
+async def deregister_worker(url: str = Query(...)):
+    """Removes a worker, e.g. when it shuts down."""
+    if not cluster.worker_registry.deregister(url):
+        raise HTTPException(status_code=404, detail="Worker not registered")
+    return {"detail": "Worker deregistered"}
+
+
+@router.get("/workers")
+async def list_workers(admin: schemas.User = Depends(get_admin_user)):
+    """Registered workers with their health and load as seen by this API process."""
+    return [worker.snapshot() for worker in cluster.worker_registry.workers.values()]
@@ -0,0 +1,186 @@
+"""
+Persistent cache of per-sentence model results for repetitive text.
+
+Social posts and support tickets repeat the same sentences across thousands of documents
+(greetings, signatures, templates). With the sentence cache, a text node splits each input into
+sentences, looks every normalized sentence up here and runs the model only on the sentences it
+has not seen before; the per-sentence results are then combined per input.
+
+The cache has two tiers:
+
+- an in-memory LRU of at most NEUROGRID_SENTENCE_CACHE_SIZE entries per process;
+- a SQLite file shared by all workers on the host and kept across restarts, trimmed to the
+  NEUROGRID_SENTENCE_CACHE_MAX_ROWS least recently used entries.
+
+Entries are keyed by a namespace (the node type, model, inference backend and CPU mode) and a
+hash of the normalized sentence, so results of a different model or backend are never reused. Errors of the SQLite tier are
+logged and treated as misses; they never fail a request.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from . import metrics
+
+# --- Configuration ---
+SENTENCE_CACHE_ENABLED = os.getenv("NEUROGRID_SENTENCE_CACHE", "0") == "1"
+SENTENCE_CACHE_SIZE = int(os.getenv("NEUROGRID_SENTENCE_CACHE_SIZE", "10000"))
+# Empty keeps the cache in memory only.
+SENTENCE_CACHE_PATH = os.getenv("NEUROGRID_SENTENCE_CACHE_PATH", "./sentence_cache.db")
+SENTENCE_CACHE_MAX_ROWS = int(os.getenv("NEUROGRID_SENTENCE_CACHE_MAX_ROWS", "1000000"))
+
+# Sentence ends: terminal punctuation followed by whitespace, or a line break.
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\s*\n+\s*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def split_sentences(text: str) -> list:
+    """The non-empty sentences of `text`, in order."""
+    return [sentence for sentence in _SENTENCE_END.split(str(text)) if sentence.strip()]
+
+
+def normalize(sentence: str, lowercase: bool = True) -> str:
+    """Collapses whitespace and, for uncased models, lowercases, so trivially different copies share an entry."""
+    sentence = _WHITESPACE.sub(" ", sentence).strip()
+    return sentence.lower() if lowercase else sentence
+
+
+def sentence_key(namespace: str, sentence: str) -> str:
+    return hashlib.sha256(f"{namespace}\0{sentence}".encode("utf-8")).hexdigest()
+
+
+class SentenceCache:
+    """Two-tier (memory LRU + SQLite) cache of JSON-serializable results by sentence key."""
+
+    def __init__(self, path: str = SENTENCE_CACHE_PATH, max_size: int = SENTENCE_CACHE_SIZE,
+                 max_rows: int = SENTENCE_CACHE_MAX_ROWS):
+        self.path = path
+        self.max_size = max_size
+        self.max_rows = max_rows
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        # Rows on disk as of the last count plus those inserted since; trimmed when over max_rows.
+        self._rows = 0
+
+    # --- SQLite tier ---
+
+    def _connect(self):
+        """Opens the SQLite file on first use. Returns None when the cache is memory-only."""
+        if self._conn is None and self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS sentences (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                         "used_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sentences_used_at ON sentences (used_at)")
+            self._rows = conn.execute("SELECT COUNT(*) FROM sentences").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def _disk_get(self, keys) -> dict:
+        conn = self._connect()
+        if conn is None or not keys:
+            return {}
+        found = {}
+        # Stay under SQLite's limit on bound parameters.
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            rows = conn.execute(f"SELECT key, value FROM sentences WHERE key IN ({','.join('?' * len(part))})",
+                                part).fetchall()
+            found.update((key, json.loads(value)) for key, value in rows)
+        if found:
+            now = time.time()
+            conn.executemany("UPDATE sentences SET used_at = ? WHERE key = ?", [(now, key) for key in found])
+        return found
+
+    def _disk_put(self, items: dict):
+        conn = self._connect()
+        if conn is None or not items:
+            return
+        now = time.time()
+        before = conn.total_changes
+        conn.executemany("INSERT OR IGNORE INTO sentences (key, value, used_at) VALUES (?, ?, ?)",
+                         [(key, json.dumps(value), now) for key, value in items.items()])
+        self._rows += conn.total_changes - before
+        if self._rows > self.max_rows:
+            self._trim(conn)
+
+    def _trim(self, conn):
+        # Other processes write to the same file, so recount before deleting.
+        self._rows = conn.execute("SELECT COUNT(*) FROM sentences").fetchone()[0]
+        # Trim 10% below the limit so the next few inserts do not trim again.
+        excess = self._rows - int(self.max_rows * 0.9)
+        if excess > 0:
+            conn.execute("DELETE FROM sentences WHERE key IN "
+                         "(SELECT key FROM sentences ORDER BY used_at LIMIT ?)", (excess,))
+            self._rows -= excess
+
+    # --- Public API ---
+
+    def get_many(self, keys) -> dict:
+        """Cached results of the given keys; keys that are not cached are left out."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+        metrics.cache_requests.inc(len(found), cache="sentence", result="memory_hit")
+
+        missing = [key for key in keys if key not in found]
+        try:
+            with self._lock:
+                on_disk = self._disk_get(missing)
+        except sqlite3.Error as e:
+            print(f"Sentence cache: SQLite lookup failed, treating as misses: {e}")
+            on_disk = {}
+        if on_disk:
+            self._remember(on_disk)
+            found.update(on_disk)
+        metrics.cache_requests.inc(len(on_disk), cache="sentence", result="disk_hit")
+        metrics.cache_requests.inc(len(missing) - len(on_disk), cache="sentence", result="miss")
+        return found
+
+    def put_many(self, items: dict):
+        self._remember(items)
+        try:
+            with self._lock:
+                self._disk_put(items)
+        except sqlite3.Error as e:
+            print(f"Sentence cache: SQLite write failed: {e}")
+
+    def _remember(self, items: dict):
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Empties both tiers."""
+        with self._lock:
+            self._entries.clear()
+            if self._connect() is not None:
+                self._conn.execute("DELETE FROM sentences")
+                self._rows = 0
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+sentence_cache = SentenceCache()
@@ -0,0 +1,65 @@
+"""
+Fast JSON encoding and decoding for large payloads: node outputs, node responses parsed by the
+engine, and WorkflowRun records.
+
+Uses `orjson` when it is installed and the standard library otherwise. Both produce the same
+JSON for the values nodes return. orjson writes NaN as null and does not escape non-ASCII
+characters.
+
+- `FastJSONResponse` renders its content with `dumps`. Returned from an endpoint, it also skips
+  FastAPI's `jsonable_encoder` pass and response-model validation, which walk every value of
+  a multi-megabyte output in Python;
+- `RawJSONResponse` sends JSON that is already encoded, such as a run output read from the blob
+  store, without parsing it.
+"""
+
+import datetime
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Values neither encoder handles natively: numpy/pandas scalars and arrays, sets, dates."""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def dumps(data: Any) -> bytes:
+    """Compact JSON encoding of `data`."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bits, which the standard library encodes
+    return json.dumps(data, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN written by the standard library, which orjson rejects
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """A response whose content is already JSON-encoded bytes."""
+    media_type = "application/json"
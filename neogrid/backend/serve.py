@@ -0,0 +1,145 @@
+"""
+Multi-process serving with the models shared copy-on-write.
+
+`uvicorn --workers N` starts every worker as a fresh interpreter, and each one lazily loads its
+own copy of BART, DistilBERT and ViT-GPT2. This entry point loads the models once in a parent
+process and then forks the workers, which accept on one shared listening socket. Forked
+workers share the parent's memory pages until a page is written, and inference only reads
+the weights, so one copy of them serves every worker:
+
+- the tensor storage is one large allocation per tensor that is never written after loading;
+- `gc.freeze()` right before forking moves everything loaded so far out of the collector's
+  reach, so garbage collection in the workers does not touch (and thereby copy) those pages;
+- the parent loads with a single torch thread, so no OpenMP thread pool exists at fork time
+  (a pool inherited across `fork()` can hang the child's first parallel op).
+
+    python -m neogrid.backend.serve --workers 4 --preload sentiment,summarizer
+
+The parent only supervises: it restarts workers that die and forwards SIGINT/SIGTERM.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import sys
+import traceback
+
+# --- Configuration ---
+PRELOAD_NODES = os.getenv("NEUROGRID_PRELOAD_NODES", "sentiment,summarizer,image_caption")
+SERVE_WORKERS = int(os.getenv("NEUROGRID_SERVE_WORKERS", str(os.cpu_count() or 1)))
+
+
+def _model_nodes():
+    from .nodes import image_caption, sentiment, summarizer
+
+    return {"sentiment": sentiment, "summarizer": summarizer, "image_caption": image_caption}
+
+
+def preload(node_types) -> dict:
+    """
+    Loads the models of the given node types in this process. Returns node type -> error message
+    for the models that could not be loaded; those are loaded lazily by each worker instead.
+    """
+    from . import model_runtime
+
+    torch = model_runtime._torch()
+    if torch is not None:
+        torch.set_num_threads(1)
+    nodes = _model_nodes()
+    failures = {}
+    for node_type in node_types:
+        try:
+            nodes[node_type].load_model()
+        except Exception as e:
+            failures[node_type] = str(e)
+            print(f"Could not preload the {node_type} model, workers will load it lazily: {e}")
+    return failures
+
+
+def _run_worker(app, sock, log_level: str, threads: int):
+    import uvicorn
+
+    from . import model_runtime
+    from .database import database
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # Connections opened by the parent (schema upgrade at import) belong to the parent.
+    database.engine.dispose(close=False)
+    torch = model_runtime._torch()
+    if torch is not None:
+        torch.set_num_threads(model_runtime.process_threads() or threads)
+    uvicorn.Server(uvicorn.Config(app, log_level=log_level)).run(sockets=[sock])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve NeuroGrid from pre-forked workers sharing preloaded models.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--preload", default=PRELOAD_NODES,
+                        help="Comma-separated model node types to load before forking, or 'none'.")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    sock = uvicorn.Config("neogrid.backend.main:app", host=args.host, port=args.port).bind_socket()
+    from .main import app
+
+    node_types = [name.strip() for name in args.preload.split(",") if name.strip() and name.strip() != "none"]
+    unknown = set(node_types) - set(_model_nodes())
+    if unknown:
+        parser.error(f"unknown model node types: {', '.join(sorted(unknown))}")
+    preload(node_types)
+    # Split the cores between the workers unless thread counts are configured per model.
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    gc.collect()
+    gc.freeze()
+
+    workers = set()
+    shutting_down = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(app, sock, args.log_level, threads)
+            except BaseException:
+                traceback.print_exc()
+                os._exit(1)
+            os._exit(0)
+        workers.add(pid)
+
+    def stop(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(args.workers):
+        spawn()
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers "
+          f"(preloaded: {', '.join(node_types) or 'none'}; parent pid {os.getpid()}).")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if not shutting_down:
+            print(f"Worker {pid} exited with status {status}; starting a new one.")
+            spawn()
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
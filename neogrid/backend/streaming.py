@@ -0,0 +1,82 @@
+"""
+Record-batch streaming between workflow nodes.
+
+Node types declare in `nodes/node_registry.json` that they work record by record
+(`"streaming": {"records_key": ...}`): the output for a list of records is the concatenation
+of the outputs for its sub-batches. `records_key` names the field of the output holding the
+records (`null` when the output is the list itself).
+
+Workflow nodes of those types opt in with `"streaming": true` in their `data`. When opted-in
+nodes form a chain and the chain's input is a non-empty record list, the engine splits that
+input into record batches and runs each node as a stage, one call per batch, instead of waiting
+for each node's full output. The stages are connected by bounded queues, so a stage that falls
+behind blocks the ones before it (backpressure), and the stages overlap.
+
+Streaming overlaps the stages of a chain; it does not bound the chain's memory to one batch per
+edge. The chain's input is already a full list in memory (node data or the upstream node's
+output) and is sliced here, and the outputs kept for the last node and for members with
+`"persist": true` are merged back into full outputs. Only the inner edges are bounded, to
+STREAM_QUEUE_SIZE batches plus the batch each stage is working on. A member whose output is not
+kept returns `{"streamed_to": <next node id>}` instead of an `output`.
+
+The helpers here split inputs into batches and merge the kept batch outputs.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+# --- Configuration ---
+STREAM_BATCH_SIZE = int(os.getenv("NEUROGRID_STREAM_BATCH_SIZE", "32"))
+# Batches buffered per edge before the upstream stage has to wait.
+STREAM_QUEUE_SIZE = int(os.getenv("NEUROGRID_STREAM_QUEUE_SIZE", "2"))
+
+REGISTRY_PATH = Path(__file__).parent / "nodes" / "node_registry.json"
+
+
+def _load_declarations() -> Dict[str, Dict]:
+    with open(REGISTRY_PATH) as f:
+        nodes = json.load(f)["nodes"]
+    return {node["id"]: node["streaming"] for node in nodes if "streaming" in node}
+
+
+# node type -> streaming declaration from the registry
+STREAMING_NODES = _load_declarations()
+
+
+def is_streaming(node: Dict) -> bool:
+    """Whether a workflow node runs as a stream stage: its type streams and it opted in with `"streaming": true`."""
+    return node["data"].get("nodeType") in STREAMING_NODES and node["data"].get("streaming") is True
+
+
+def split_records(value: Any, batch_size: int) -> Iterator[Any] | None:
+    """
+    Splits a node input into batch inputs of at most `batch_size` records: a list, or an envelope
+    `{"data": [...], ...}` whose other fields are repeated in every batch. Returns None for
+    inputs that are not record lists and for empty ones, which yield no batches.
+    """
+    if isinstance(value, list) and value:
+        return (value[i:i + batch_size] for i in range(0, len(value), batch_size))
+    if isinstance(value, dict) and isinstance(value.get("data"), list) and value["data"]:
+        records = value["data"]
+        return ({**value, "data": records[i:i + batch_size]} for i in range(0, len(records), batch_size))
+    return None
+
+
+def records_of(node_type: str, output: Any) -> List:
+    key = STREAMING_NODES.get(node_type, {}).get("records_key")
+    records = output.get(key) if key and isinstance(output, dict) else output
+    return records if isinstance(records, list) else [records]
+
+
+def merge_outputs(node_type: str, outputs: List[Any]) -> Any:
+    """Merges the batch outputs of a node into the output it would have produced for the whole input."""
+    key = STREAMING_NODES.get(node_type, {}).get("records_key")
+    records = [record for output in outputs for record in records_of(node_type, output)]
+    if not key:
+        return records
+    merged = {**(outputs[0] if outputs else {}), key: records}
+    if "record_count" in merged:
+        merged["record_count"] = len(records)
+    return merged
@@ -1,7 +1,10 @@
+import httpx
 import pytest
+import uuid
 from fastapi.testclient import TestClient
 import sys
 import os
+import tempfile
 
 # Add the project's root directory to the Python path.
 # This allows us to import the 'neogrid' module from within the tests
@@ -9,9 +12,47 @@ import os
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 sys.path.insert(0, PROJECT_ROOT)
 
+# Point the app at a throwaway SQLite file so tests never touch the checked-in database.
+TEST_DB_DIR = tempfile.mkdtemp(prefix="neurogrid-tests-")
+os.environ.setdefault("NEUROGRID_DATABASE_URL", f"sqlite:///{os.path.join(TEST_DB_DIR, 'test.db')}")
+os.environ.setdefault("NEUROGRID_BLOB_DIR", os.path.join(TEST_DB_DIR, "blobs"))
+os.environ.setdefault("NEUROGRID_PROFILE_DIR", os.path.join(TEST_DB_DIR, "profiles"))
+os.environ.setdefault("NEUROGRID_SENTENCE_CACHE_PATH", os.path.join(TEST_DB_DIR, "sentence_cache.db"))
+
 from neogrid.backend.main import app
 
 @pytest.fixture(scope="module")
 def client():
     with TestClient(app) as c:
-        yield c
\ No newline at end of file
+        yield c
+
+
+def _register_and_login(client, username):
+    response = client.post("/auth/register", json={"username": username, "password": "s3cret-pass"})
+    assert response.status_code == 200
+    response = client.post("/auth/login", json={"username": username, "password": "s3cret-pass"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def auth_headers(client):
+    return _register_and_login(client, f"user-{uuid.uuid4().hex[:8]}")
+
+
+@pytest.fixture
+def admin_headers(client, monkeypatch):
+    from neogrid.backend.routers import auth
+
+    username = f"admin-{uuid.uuid4().hex[:8]}"
+    monkeypatch.setattr(auth, "ADMIN_USERNAMES", {username})
+    return _register_and_login(client, username)
+
+
+@pytest.fixture
+def in_process_engine(monkeypatch):
+    """Routes the engine's node calls to the app in-process instead of a live server."""
+    from neogrid.backend.workflow_engine import workflow_engine
+
+    monkeypatch.setattr(workflow_engine, "transport", httpx.ASGITransport(app=app))
+    monkeypatch.setattr(workflow_engine, "base_url", "http://testserver")
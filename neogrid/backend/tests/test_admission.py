@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from neogrid.backend import admission
+from neogrid.backend.admission import AdmissionController, AdmissionRejected
+
+CODE_WORKFLOW = {
+    "nodes": [
+        {"id": "n1", "data": {"nodeType": "code_analyzer", "input": "x = 1\n"}},
+    ],
+    "edges": [],
+}
+
+
+def test_token_bucket_limits_bursts():
+    """
+    Tests that a user gets `burst` runs at once and is then told when to retry.
+    """
+    controller = AdmissionController(rate=0.5, burst=2, per_user=10, global_limit=10)
+
+    async def scenario():
+        for _ in range(2):
+            await controller.acquire(1)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire(1)
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+    assert error.retry_after == 2
+    assert controller.running == 2
+
+
+def test_per_user_cap_queues_without_blocking_other_users():
+    """
+    Tests that a user over their cap waits while other users are still admitted.
+    """
+    controller = AdmissionController(rate=0, per_user=1, global_limit=10)
+
+    async def scenario():
+        await controller.acquire(1)
+        queued = asyncio.ensure_future(controller.acquire(1))
+        await asyncio.sleep(0)
+        assert controller.queue_depth == 1
+        await controller.acquire(2)
+        assert not queued.done()
+        controller.release(1)
+        await queued
+
+    asyncio.run(scenario())
+    assert controller.running == 2
+    assert controller.queue_depth == 0
+
+
+def test_queued_runs_are_admitted_by_priority():
+    """
+    Tests that when a slot frees up the highest-priority waiter goes first.
+    """
+    controller = AdmissionController(rate=0, per_user=5, global_limit=1)
+    order = []
+
+    async def waiter(user_id, priority):
+        await controller.acquire(user_id, priority)
+        order.append(priority)
+        controller.release(user_id)
+
+    async def scenario():
+        await controller.acquire(1)
+        tasks = [asyncio.ensure_future(waiter(2, "low")), asyncio.ensure_future(waiter(3, "high")),
+                 asyncio.ensure_future(waiter(4, "normal"))]
+        await asyncio.sleep(0)
+        controller.release(1)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["high", "normal", "low"]
+
+
+def test_rejects_fast_when_queue_is_full_or_wait_times_out():
+    """
+    Tests immediate rejection without a queue and rejection after the queue timeout.
+    """
+    no_queue = AdmissionController(rate=0, per_user=1, global_limit=1, max_queue=0)
+    short_wait = AdmissionController(rate=0, per_user=1, global_limit=1, queue_timeout=0.05)
+
+    async def scenario(controller):
+        await controller.acquire(1)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire(2)
+        return excinfo.value
+
+    assert asyncio.run(scenario(no_queue)).retry_after >= 1
+    assert "Timed out" in asyncio.run(scenario(short_wait)).reason
+    assert short_wait.queue_depth == 0
+    assert short_wait.running == 1
+
+
+def test_execute_returns_429_with_retry_after(client, auth_headers, in_process_engine, monkeypatch):
+    """
+    Tests that the execute endpoint sheds runs over the rate limit with 429 + Retry-After.
+    """
+    monkeypatch.setattr(admission.admission_controller, "burst", 1)
+    monkeypatch.setattr(admission.admission_controller, "rate", 0.01)
+    workflow = client.post("/workflows/", json={"name": "limited", "config_json": CODE_WORKFLOW},
+                           headers=auth_headers).json()
+
+    first = client.post(f"/workflow/{workflow['id']}/execute", json={"inputs": {}}, headers=auth_headers)
+    second = client.post(f"/workflow/{workflow['id']}/execute", json={"inputs": {}}, headers=auth_headers)
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) >= 1
+    assert admission.admission_controller.running == 0
+
+
+def test_unknown_workflows_do_not_spend_rate_tokens(client, auth_headers, in_process_engine, monkeypatch):
+    """
+    Tests that executing a workflow that does not exist returns 404 without taking a rate-limit token.
+    """
+    monkeypatch.setattr(admission.admission_controller, "burst", 1)
+    monkeypatch.setattr(admission.admission_controller, "rate", 0.01)
+    workflow = client.post("/workflows/", json={"name": "limited", "config_json": CODE_WORKFLOW},
+                           headers=auth_headers).json()
+
+    missing = client.post(f"/workflow/{workflow['id'] + 1000}/execute", json={"inputs": {}}, headers=auth_headers)
+    existing = client.post(f"/workflow/{workflow['id']}/execute", json={"inputs": {}}, headers=auth_headers)
+
+    assert missing.status_code == 404
+    assert existing.status_code == 200
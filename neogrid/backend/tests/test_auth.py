@@ -0,0 +1,138 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from jose import jwt
+
+from neogrid.backend import hashing
+from neogrid.backend.database import database, models
+from neogrid.backend.routers import auth
+
+
+def _register_and_login(client):
+    username = f"auth-{uuid.uuid4().hex[:8]}"
+    client.post("/auth/register", json={"username": username, "password": "pw-123456"})
+    response = client.post("/auth/login", json={"username": username, "password": "pw-123456"})
+    assert response.status_code == 200
+    return username, response.json()["access_token"]
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    auth.token_cache.clear()
+    yield
+    auth.token_cache.clear()
+
+
+def test_token_carries_user_id(client):
+    """
+    Tests that issued tokens embed the user id and a credentials version next to the username.
+    """
+    username, token = _register_and_login(client)
+    claims = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+    assert claims["sub"] == username
+    assert isinstance(claims["uid"], int)
+    assert "iat" in claims and "pwv" in claims
+
+
+def test_cached_tokens_skip_user_lookup(client, monkeypatch):
+    """
+    Tests that a verified token is cached and later requests are served without querying the
+    users table.
+    """
+    _, token = _register_and_login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/workflows/", headers=headers).status_code == 200
+    assert auth.token_cache.get(token) is not None
+
+    def fail(*args, **kwargs):
+        raise AssertionError("user lookup should be skipped")
+
+    monkeypatch.setattr(auth, "get_user", fail)
+    monkeypatch.setattr(auth, "get_user_by_id", fail)
+    assert client.get("/workflows/", headers=headers).status_code == 200
+
+
+def test_user_change_invalidates_cached_token(client):
+    """
+    Tests that changing a user's password evicts its cached tokens and revokes them, and that
+    a token of a deleted user is rejected.
+    """
+    username, token = _register_and_login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/workflows/", headers=headers).status_code == 200
+    assert auth.token_cache.get(token) is not None
+
+    with database.SessionLocal() as db:
+        user = db.query(models.User).filter(models.User.username == username).first()
+        user.hashed_password = hashing.hash_password("new-password")
+        db.commit()
+
+    assert auth.token_cache.get(token) is None
+    assert client.get("/workflows/", headers=headers).status_code == 401
+
+    username, token = _register_and_login(client)
+    with database.SessionLocal() as db:
+        db.delete(db.query(models.User).filter(models.User.username == username).first())
+        db.commit()
+
+    assert client.get("/workflows/", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_revocation_holds_without_in_process_state(client):
+    """
+    Tests that a token issued before a password change is rejected by a process that never saw
+    the change (another worker, or after a restart), where only the database knows about it.
+    """
+    username, token = _register_and_login(client)
+    with database.engine.begin() as connection:
+        # A raw UPDATE fires no ORM events, like a change made by another process.
+        connection.execute(models.User.__table__.update().where(models.User.username == username)
+                           .values(hashed_password=hashing.hash_password("changed-elsewhere")))
+
+    assert client.get("/workflows/", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_token_without_expiry_is_rejected(client):
+    """
+    Tests that a validly signed token without an `exp` claim is rejected with 401, not 500.
+    """
+    username, _ = _register_and_login(client)
+    token = jwt.encode({"sub": username}, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+    assert client.get("/workflows/", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_legacy_token_without_uid_is_accepted(client):
+    """
+    Tests that tokens issued before the uid claim existed still authenticate via the username.
+    """
+    username, _ = _register_and_login(client)
+    legacy_token = auth.create_access_token(data={"sub": username})
+    response = client.get("/workflows/", headers={"Authorization": f"Bearer {legacy_token}"})
+    assert response.status_code == 200
+
+
+def test_expired_token_is_rejected(client):
+    """
+    Tests that an expired token is rejected and never cached.
+    """
+    expired = auth.create_access_token(data={"sub": "someone", "uid": 1}, expires_delta=timedelta(seconds=-1))
+    response = client.get("/workflows/", headers={"Authorization": f"Bearer {expired}"})
+    assert response.status_code == 401
+    assert auth.token_cache.get(expired) is None
+
+
+def test_token_cache_is_bounded():
+    """
+    Tests that the cache evicts its least recently used entries beyond max_size.
+    """
+    cache = auth.TokenCache(max_size=2, ttl=60)
+    user = auth.schemas.User(id=1, username="u")
+    far_future = 2 ** 40
+    cache.put("a", user, far_future)
+    cache.put("b", user, far_future)
+    cache.get("a")
+    cache.put("c", user, far_future)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
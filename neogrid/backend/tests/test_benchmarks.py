@@ -0,0 +1,70 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from neogrid.backend.benchmarks import suite
+from neogrid.backend.nodes import sentiment
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+
+def _result(name, p50, p95, throughput):
+    return {"scenarios": [{"name": name, "throughput_per_sec": throughput,
+                           "latency_ms": {"p50": p50, "p95": p95, "p99": p95, "mean": p50}}]}
+
+
+def test_suite_runs_offline_with_stub_pipelines(client):
+    """
+    Tests that node and DAG scenarios run against stub models and report percentiles.
+    """
+    original = sentiment.sentiment_analyzer_pipeline
+    result = asyncio.run(suite.run_suite(iterations=3, warmup=1, stub_latency_ms=0,
+                                         only=["node/sentiment", "dag/text_pipeline"]))
+
+    names = [scenario["name"] for scenario in result["scenarios"]]
+    assert names == ["node/sentiment", "dag/text_pipeline"]
+    for scenario in result["scenarios"]:
+        assert scenario["errors"] == 0
+        assert scenario["iterations"] == 3
+        assert set(scenario["latency_ms"]) == {"p50", "p95", "p99", "mean"}
+    assert sentiment.sentiment_analyzer_pipeline is original
+
+
+def test_suite_uses_an_isolated_database(tmp_path):
+    """
+    Tests that the suite started from the command line writes to a temp database, not the
+    checked-in ./neogrid.db, even when NEUROGRID_DATABASE_URL is not set.
+    """
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("NEUROGRID_DATABASE_URL", "NEUROGRID_BLOB_DIR")}
+    output = tmp_path / "bench.json"
+    subprocess.run([sys.executable, "-m", "neogrid.backend.benchmarks", "--iterations", "1", "--warmup", "0",
+                    "--only", "node/code_analyzer", "--output", str(output)],
+                   cwd=tmp_path, env={**env, "PYTHONPATH": PROJECT_ROOT},
+                   check=True, capture_output=True, timeout=300)
+
+    database_url = json.loads(output.read_text())["environment"]["database"]
+    assert "neurogrid-bench-" in database_url and "neogrid.db" not in database_url
+
+
+def test_compare_flags_latency_and_throughput_regressions():
+    """
+    Tests that slower latency or lower throughput beyond the threshold counts as a regression.
+    """
+    baseline = _result("node/x", p50=10.0, p95=12.0, throughput=100.0)
+
+    assert suite.compare(_result("node/x", 10.5, 12.5, 97.0), baseline)["regressions"] == []
+    slower = suite.compare(_result("node/x", 15.0, 12.0, 100.0), baseline)
+    assert slower["regressions"] == ["node/x"]
+    assert slower["scenarios"][0]["regressed"] == ["p50"]
+    assert suite.compare(_result("node/x", 10.0, 12.0, 60.0), baseline)["scenarios"][0]["regressed"] == ["throughput"]
+
+
+def test_compare_ignores_sub_millisecond_jitter():
+    """
+    Tests that large relative but tiny absolute latency changes are not regressions.
+    """
+    baseline = _result("node/x", p50=0.2, p95=0.3, throughput=1000.0)
+    assert suite.compare(_result("node/x", 0.4, 0.5, 1000.0), baseline)["regressions"] == []
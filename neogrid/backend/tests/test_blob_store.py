@@ -0,0 +1,51 @@
+import pytest
+
+from neogrid.backend.database import blob_store as blob_store_module
+from neogrid.backend.database.blob_store import BlobStore
+
+
+def test_put_and_get_roundtrip(tmp_path):
+    """
+    Tests that a stored document is compressed on disk and reads back unchanged.
+    """
+    store = BlobStore(str(tmp_path), compression="gzip")
+    document = {"rows": [{"text": "hello world"} for _ in range(1000)]}
+    ref = store.put_json(document)
+
+    assert ref.startswith("sha256:")
+    assert store.get_json(ref) == document
+    files = list(tmp_path.rglob("*.json.gz"))
+    assert len(files) == 1
+    assert files[0].stat().st_size < len(blob_store_module.encode_json(document))
+
+
+def test_identical_documents_are_deduplicated(tmp_path):
+    """
+    Tests that equal documents, even with different key order, share one blob.
+    """
+    store = BlobStore(str(tmp_path), compression="gzip")
+    first = store.put_json({"a": 1, "b": [1, 2, 3]})
+    second = store.put_json({"b": [1, 2, 3], "a": 1})
+
+    assert first == second
+    assert len(list(tmp_path.rglob("*.json.*"))) == 1
+
+
+def test_zstd_compression(tmp_path):
+    """
+    Tests the zstd codec when the optional dependency is installed.
+    """
+    pytest.importorskip("zstandard")
+    store = BlobStore(str(tmp_path), compression="zstd")
+    ref = store.put_json({"value": "x" * 10000})
+    assert store.get_json(ref) == {"value": "x" * 10000}
+    assert list(tmp_path.rglob("*.json.zst"))
+
+
+def test_missing_blob_raises(tmp_path):
+    """
+    Tests that reading an unknown reference raises FileNotFoundError.
+    """
+    store = BlobStore(str(tmp_path), compression="gzip")
+    with pytest.raises(FileNotFoundError):
+        store.get_json("sha256:" + "0" * 64)
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from neogrid.backend import cluster
+from neogrid.backend.benchmarks.prefork import _free_port
+from neogrid.backend.cluster import WorkerRegistry
+from neogrid.backend.workflow_engine import WorkflowEngine, workflow_engine
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+FAST_RETRY = {"timeout": 1.0, "retries": 2, "backoff_base": 0.001, "backoff_max": 0.01}
+CODE_NODE = {"id": "n1", "data": {"nodeType": "code_analyzer", "input": "x = 1\n", "policy": FAST_RETRY}}
+
+
+def test_pick_prefers_least_outstanding_healthy_worker():
+    """
+    Tests that calls go to the healthy worker with the fewest requests in flight.
+    """
+    registry = WorkerRegistry(health_interval=0)
+    a = registry.register("http://a/", ["sentiment"])
+    b = registry.register("http://b", ["sentiment", "summarizer"])
+
+    assert registry.pick("summarizer") is b
+    assert registry.pick("image_caption") is None
+    with registry.track(a):
+        assert registry.pick("sentiment") is b
+        with registry.track(b), registry.track(b):
+            assert registry.pick("sentiment") is a
+    assert (a.outstanding, a.served, b.served) == (0, 1, 2)
+
+    registry.mark_failed(b)
+    assert {registry.pick("sentiment") for _ in range(10)} == {a}
+    assert registry.pick("sentiment", exclude={"http://a"}) is None
+
+
+def test_health_checks_eject_restore_and_expire_workers():
+    """
+    Tests that failing health checks take a worker out of rotation, a passing one restores it,
+    and workers silent for longer than the TTL are dropped.
+    """
+    down = {"http://a"}
+
+    def handler(request):
+        if f"{request.url.scheme}://{request.url.host}" in down:
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200, json={"status": "ok"})
+
+    registry = WorkerRegistry(health_interval=0, unhealthy_after=2, ttl=60,
+                              transport=httpx.MockTransport(handler))
+    a = registry.register("http://a", ["sentiment"])
+    registry.register("http://b", ["sentiment"])
+
+    asyncio.run(registry.check_health())
+    assert a.healthy and a.failures == 1
+    asyncio.run(registry.check_health())
+    assert not a.healthy
+
+    down.clear()
+    asyncio.run(registry.check_health())
+    assert a.healthy and a.failures == 0
+
+    down.add("http://a")
+    a.last_seen -= 61
+    asyncio.run(registry.check_health())
+    assert list(registry.workers) == ["http://b"]
+
+
+def test_engine_fails_over_to_another_worker():
+    """
+    Tests that a call to a dead worker moves to a live one without backoff or tripping the
+    node type's circuit breaker, and that node types without workers are called locally.
+    """
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        if request.url.host == "dead":
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200, json={"output": request.url.host})
+
+    registry = WorkerRegistry(health_interval=0)
+    registry.register("http://dead", ["code_analyzer"])
+    registry.register("http://live", ["code_analyzer"])
+    engine = WorkflowEngine(base_url="http://api", transport=httpx.MockTransport(handler), workers=registry)
+    nodes = [{"id": f"n{i}", "data": {"nodeType": "code_analyzer", "policy": FAST_RETRY}} for i in range(6)]
+    nodes.append({"id": "local", "data": {"nodeType": "output_node", "policy": FAST_RETRY}})
+
+    results = asyncio.run(engine.execute_workflow(nodes, [], {}))
+
+    assert results["_run_metadata"]["status"] == "success"
+    assert all(results[f"n{i}"]["_execution_metadata"]["worker"] == "http://live" for i in range(6))
+    assert results["local"]["output"] == "api"
+    assert "worker" not in results["local"]["_execution_metadata"]
+    assert calls.count("live") == 6
+    assert not registry.workers["http://dead"].healthy
+    assert engine.breaker_for("code_analyzer").state == "closed"
+
+
+def test_no_healthy_worker_without_local_fallback(monkeypatch):
+    """
+    Tests that a node type whose workers are all down fails instead of running in the API
+    process when local fallback is turned off.
+    """
+    monkeypatch.setattr(cluster, "WORKER_LOCAL_FALLBACK", False)
+    registry = WorkerRegistry(health_interval=0)
+    registry.mark_failed(registry.register("http://dead", ["code_analyzer"]))
+    engine = WorkflowEngine(base_url="http://api", transport=httpx.MockTransport(lambda r: httpx.Response(200, json={})),
+                            workers=registry)
+
+    results = asyncio.run(engine.execute_workflow([CODE_NODE], [], {}))
+
+    assert "no healthy worker hosts 'code_analyzer'" in results["n1"]["error"]
+
+
+def test_worker_registration_requires_cluster_token(client, admin_headers, monkeypatch):
+    """
+    Tests that workers register and deregister only with the cluster token, and admins can list them.
+    """
+    registry = WorkerRegistry(health_interval=0)
+    monkeypatch.setattr(cluster, "worker_registry", registry)
+    monkeypatch.setattr(cluster, "CLUSTER_TOKEN", "s3cret")
+    registration = {"url": "http://10.0.0.7:9001", "node_types": ["sentiment"]}
+    token = {cluster.CLUSTER_TOKEN_HEADER: "s3cret"}
+
+    # Without a configured token nobody may register, not even the API's own host.
+    monkeypatch.setattr(cluster, "CLUSTER_TOKEN", "")
+    assert client.post("/cluster/workers", json=registration).status_code == 403
+    monkeypatch.setattr(cluster, "CLUSTER_TOKEN", "s3cret")
+
+    assert client.post("/cluster/workers", json=registration).status_code == 403
+    assert client.post("/cluster/workers", json=registration,
+                       headers={cluster.CLUSTER_TOKEN_HEADER: "wrong"}).status_code == 403
+    response = client.post("/cluster/workers", json=registration, headers=token)
+    assert response.status_code == 200
+    assert response.json()["node_types"] == ["sentiment"]
+
+    response = client.get("/cluster/workers", headers=admin_headers)
+    assert [worker["url"] for worker in response.json()] == ["http://10.0.0.7:9001"]
+
+    response = client.delete("/cluster/workers", params={"url": "http://10.0.0.7:9001"}, headers=token)
+    assert response.status_code == 200
+    assert registry.workers == {}
+
+
+def _start_worker(port, tmp_path):
+    env = {**os.environ, "NEUROGRID_DATABASE_URL": f"sqlite:///{tmp_path}/worker.db"}
+    process = subprocess.Popen([sys.executable, "-m", "neogrid.backend.node_worker", "--nodes", "code_analyzer",
+                                "--port", str(port), "--log-level", "warning"], env=env, cwd=REPO_ROOT)
+    deadline = time.monotonic() + 60
+    while True:
+        assert process.poll() is None, "worker exited"
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.TransportError:
+            pass
+        assert time.monotonic() < deadline, "worker did not come up"
+        time.sleep(0.2)
+
+
+def test_local_worker_processes_balance_and_fail_over(client, auth_headers, monkeypatch, tmp_path):
+    """
+    Tests a cluster of two local worker processes: workflow runs are spread over both, and
+    after one is killed the runs keep succeeding on the other.
+    """
+    registry = WorkerRegistry(health_interval=0)
+    monkeypatch.setattr(cluster, "worker_registry", registry)
+    monkeypatch.setattr(cluster, "CLUSTER_TOKEN", "s3cret")
+    monkeypatch.setattr(workflow_engine, "workers", registry)
+    monkeypatch.setattr(workflow_engine, "transport", None)
+    monkeypatch.setattr(workflow_engine, "base_url", "http://127.0.0.1:1")  # nothing is served locally
+
+    ports = [_free_port(), _free_port()]
+    processes = [_start_worker(port, tmp_path) for port in ports]
+    try:
+        for port in ports:
+            response = client.post("/cluster/workers", headers={cluster.CLUSTER_TOKEN_HEADER: "s3cret"},
+                                   json={"url": f"http://127.0.0.1:{port}", "node_types": ["code_analyzer"]})
+            assert response.status_code == 200
+        nodes = [{"id": f"n{i}", "data": {**CODE_NODE["data"]}} for i in range(8)]
+        response = client.post("/workflows/", json={"name": "cluster", "config_json": {"nodes": nodes, "edges": []}},
+                               headers=auth_headers)
+        workflow_id = response.json()["id"]
+
+        def run_workers():
+            response = client.post(f"/workflow/{workflow_id}/execute", json={"inputs": {}}, headers=auth_headers)
+            assert response.status_code == 200
+            output = response.json()["output_json"]
+            assert all(output[node["id"]]["output"]["status"] == "success" for node in nodes)
+            return {output[node["id"]]["_execution_metadata"]["worker"] for node in nodes}
+
+        # Ties between idle workers are broken at random.
+        assert run_workers() | run_workers() == {f"http://127.0.0.1:{port}" for port in ports}
+
+        processes[0].send_signal(signal.SIGKILL)
+        processes[0].wait(timeout=10)
+        for _ in range(3):
+            assert run_workers() == {f"http://127.0.0.1:{ports[1]}"}
+        assert not registry.workers[f"http://127.0.0.1:{ports[0]}"].healthy
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+                process.wait(timeout=30)
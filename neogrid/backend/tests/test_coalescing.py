@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from neogrid.backend import coalescing, metrics
+from neogrid.backend.benchmarks.stubs import StubPipeline
+from neogrid.backend.main import app
+from neogrid.backend.nodes import summarizer
+
+
+def _run_concurrently(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    """
+    Tests that overlapping calls with the same key run once and all get the result.
+    """
+    flight = coalescing.SingleFlight()
+    calls, outcomes = [], []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"output": "done"}
+
+    _run_concurrently(5, lambda: outcomes.append(flight.do("k", slow)))
+
+    assert len(calls) == 1
+    assert [result for result, _ in outcomes] == [{"output": "done"}] * 5
+    assert sorted(shared for _, shared in outcomes) == [False, True, True, True, True]
+    assert flight.in_flight() == 0
+
+
+def test_followers_get_the_leaders_error():
+    """
+    Tests that an error of the shared execution is raised to every waiting caller.
+    """
+    flight = coalescing.SingleFlight()
+    errors = []
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    def call():
+        with pytest.raises(ValueError):
+            flight.do("k", failing)
+        errors.append(1)
+
+    _run_concurrently(3, call)
+    assert len(errors) == 3
+
+
+def test_payload_key_is_canonical():
+    """
+    Tests that key order does not change the coalescing key but node type and values do.
+    """
+    assert coalescing.payload_key("summarizer", {"a": 1, "b": 2}) == coalescing.payload_key("summarizer", {"b": 2, "a": 1})
+    assert coalescing.payload_key("summarizer", {"a": 1}) != coalescing.payload_key("sentiment", {"a": 1})
+    assert coalescing.payload_key("summarizer", {"a": 1}) != coalescing.payload_key("summarizer", {"a": 2})
+
+
+def test_identical_node_requests_are_coalesced(monkeypatch):
+    """
+    Tests that concurrent identical summarizer requests run the model once.
+    """
+    stub = StubPipeline(lambda text: {"summary_text": text[:10]}, latency_ms=200)
+    monkeypatch.setattr(summarizer, "summarizer_pipeline", stub)
+    before = metrics.deduplicated_items.value(node_type="summarizer", kind="in_flight")
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+            return await asyncio.gather(*[client.post("/nodes/summarizer/infer", json={"input": "the same text"})
+                                          for _ in range(4)])
+
+    responses = asyncio.run(scenario())
+    assert [r.json()["output"] for r in responses] == ["the same t"] * 4
+    assert stub.calls == 1
+    assert metrics.deduplicated_items.value(node_type="summarizer", kind="in_flight") - before == 3
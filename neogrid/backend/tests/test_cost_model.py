@@ -0,0 +1,132 @@
+import asyncio
+
+import httpx
+import pytest
+
+from neogrid.backend import cost_model
+from neogrid.backend.cost_model import CostModel
+from neogrid.backend.workflow_engine import WorkflowEngine, workflow_engine
+
+LATENCY_S = {"summarizer": 0.2, "output_node": 0.05, "code_analyzer": 0.05}
+
+
+def test_latency_is_fitted_against_request_size():
+    """
+    Tests that the predicted latency grows with the request size and unknown types use the prior.
+    """
+    costs = CostModel()
+    for size in (1000, 2000, 4000, 8000, 16000):
+        costs.observe("summarizer", size, 10 + 0.01 * size, size // 10)
+
+    assert costs.predict_ms("summarizer", 5000) == pytest.approx(60)
+    assert costs.predict_ms("summarizer", 50000) == pytest.approx(510)
+    assert costs.predict_output_bytes("summarizer", 5000) == pytest.approx(500, abs=1)
+    assert costs.predict_ms("image_caption", 100) == cost_model.PRIOR_COSTS_MS["image_caption"]
+
+    # Too few samples to fit a slope: the mean latency.
+    costs.observe("sentiment", 100, 30, 50)
+    costs.observe("sentiment", 10000, 50, 50)
+    assert costs.predict_ms("sentiment", 10 ** 6) == pytest.approx(40)
+
+
+def test_history_is_read_from_node_results():
+    """
+    Tests that stored runs seed the model with their successful single node calls only.
+    """
+    def result(status, **extra):
+        return {"_execution_metadata": {"node_type": "sentiment", "status": status, "timing": {"wall_ms": 40.0},
+                                        "payload": {"request_bytes": 100, "response_bytes": 20}, **extra}}
+
+    costs = CostModel()
+    added = costs.load_history([
+        {"a": result("success"), "b": result("error"), "_run_metadata": {"status": "partial"}},
+        {"c": result("success", stream={"batches": 3, "records": 90})},
+        {"execution_error": "boom"},
+    ])
+
+    assert added == 1
+    assert costs.history_loaded
+    assert costs.predict_ms("sentiment", 100) == 40.0
+
+
+def test_ranks_critical_path_and_simulated_schedule():
+    """
+    Tests that ranks add up the costliest chain and the simulation respects slots and dependencies.
+    """
+    graph = {"a": ["b", "c"], "b": ["d"], "c": ["d"], "d": []}
+    costs = {"a": 10, "b": 100, "c": 20, "d": 5}
+    order = ["a", "b", "c", "d"]
+
+    rank = cost_model.ranks(graph, order, costs)
+    assert rank == {"a": 115, "b": 105, "c": 25, "d": 5}
+    assert cost_model.critical_path(graph, rank) == ["a", "b", "d"]
+
+    priority = {node_id: (-rank[node_id],) for node_id in graph}
+    assert cost_model.simulate(graph, costs, priority, slots=2)["d"] == (110, 115)
+    assert cost_model.simulate(graph, costs, priority, slots=1)["d"] == (130, 135)
+
+
+def _wide_workflow():
+    # Six cheap independent nodes listed before one expensive chain.
+    nodes = [{"id": f"cheap{i}", "data": {"nodeType": "code_analyzer"}} for i in range(6)]
+    nodes += [{"id": "model", "data": {"nodeType": "summarizer"}}, {"id": "out", "data": {"nodeType": "output_node"}}]
+    return nodes, [{"source": "model", "target": "out"}]
+
+
+def _timed_engine(cost_aware, calls):
+    async def handler(request):
+        node_type = request.url.path.split("/")[2]
+        calls.append(node_type)
+        await asyncio.sleep(LATENCY_S[node_type])
+        return httpx.Response(200, json={"output": node_type})
+
+    costs = CostModel()
+    for node_type, seconds in LATENCY_S.items():
+        costs.observe(node_type, 50, seconds * 1000, 50)
+    return WorkflowEngine(base_url="http://nodes", transport=httpx.MockTransport(handler), costs=costs,
+                          concurrency=2, cost_aware=cost_aware)
+
+
+def test_critical_path_starts_first_and_cuts_makespan():
+    """
+    Tests that under a concurrency limit the expensive chain starts first and cheap nodes fill the
+    other slot, finishing sooner than topological order, and that the estimate predicts it.
+    """
+    nodes, edges = _wide_workflow()
+    fifo_calls, aware_calls = [], []
+    fifo = asyncio.run(_timed_engine(False, fifo_calls).execute_workflow(nodes, edges, {}))
+    aware = asyncio.run(_timed_engine(True, aware_calls).execute_workflow(nodes, edges, {}))
+
+    assert fifo_calls[:2] == ["code_analyzer", "code_analyzer"]
+    assert aware_calls[0] == "summarizer"
+    assert fifo["_run_metadata"]["estimated_ms"] == pytest.approx(400)
+    assert aware["_run_metadata"]["estimated_ms"] == pytest.approx(300)
+    assert aware["_run_metadata"]["wall_ms"] < fifo["_run_metadata"]["wall_ms"]
+    assert aware["model"]["_execution_metadata"]["estimated_ms"] == pytest.approx(200)
+    assert aware["_run_metadata"]["status"] == "success"
+
+
+def test_estimate_endpoint_uses_run_history(client, auth_headers, in_process_engine, monkeypatch):
+    """
+    Tests that estimates come from the calls recorded by past runs, including runs stored
+    before the process started.
+    """
+    monkeypatch.setattr(workflow_engine, "costs", CostModel())
+    workflow = {"nodes": [{"id": "n1", "data": {"nodeType": "code_analyzer", "input": "x = 1\n"}}], "edges": []}
+    workflow_id = client.post("/workflows/", json={"name": "estimate", "config_json": workflow},
+                              headers=auth_headers).json()["id"]
+    assert client.post(f"/workflow/{workflow_id}/execute", json={"inputs": {}}, headers=auth_headers).status_code == 200
+
+    response = client.post(f"/workflow/{workflow_id}/estimate", json={"inputs": {}}, headers=auth_headers)
+    assert response.status_code == 200
+    estimate = response.json()
+    assert estimate["critical_path"] == ["n1"]
+    assert estimate["nodes"]["n1"]["samples"] >= 1
+    assert estimate["estimated_ms"] == estimate["nodes"]["n1"]["finish_ms"] > 0
+
+    # A fresh process reads the stored runs first.
+    monkeypatch.setattr(workflow_engine, "costs", CostModel())
+    response = client.post(f"/workflow/{workflow_id}/estimate", headers=auth_headers)
+    assert response.json()["nodes"]["n1"]["samples"] >= 1
+
+    assert client.post("/workflow/999999/estimate", headers=auth_headers).status_code == 404
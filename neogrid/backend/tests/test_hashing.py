@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+import pytest
+
+from neogrid.backend import hashing
+from neogrid.backend.hashing import HashingOverloaded, PasswordHasher
+
+
+def test_hash_and_verify_roundtrip():
+    """
+    Tests that the pool hashes with the configured Argon2 parameters and verifies correctly.
+    """
+    hasher = PasswordHasher(workers=1, max_queue=1)
+
+    async def scenario():
+        hashed = await hasher.hash("correct horse")
+        return hashed, await hasher.verify("correct horse", hashed), await hasher.verify("wrong", hashed)
+
+    hashed, good, bad = asyncio.run(scenario())
+    hasher.shutdown()
+    assert hashed.startswith("$argon2")
+    assert f"m={hashing.ARGON2_MEMORY_COST_KIB},t={hashing.ARGON2_TIME_COST},p={hashing.ARGON2_PARALLELISM}" in hashed
+    assert good is True
+    assert bad is False
+
+
+def test_rejects_when_queue_is_full():
+    """
+    Tests that work beyond workers + max_queue is rejected immediately with a Retry-After hint.
+    """
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = [asyncio.ensure_future(hasher._run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert hasher.queue_depth == 1
+        with pytest.raises(HashingOverloaded) as excinfo:
+            await hasher._run(release.wait)
+        release.set()
+        await asyncio.gather(*blocked)
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+    hasher.shutdown()
+    assert error.retry_after >= 1
+    assert hasher.queue_depth == 0
+
+
+def test_register_returns_429_when_overloaded(client, monkeypatch):
+    """
+    Tests that the register route sheds load with 429 and a Retry-After header.
+    """
+    monkeypatch.setattr(hashing.password_hasher, "max_pending", 0)
+    response = client.post("/auth/register", json={"username": "overloaded", "password": "pw"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_login_returns_429_when_overloaded(client, monkeypatch):
+    """
+    Tests that the login route sheds load with 429 and a Retry-After header.
+    """
+    credentials = {"username": "overloaded-login", "password": "pw"}
+    assert client.post("/auth/register", json=credentials).status_code == 200
+    monkeypatch.setattr(hashing.password_hasher, "max_pending", 0)
+    response = client.post("/auth/login", json=credentials)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
@@ -0,0 +1,47 @@
+import pytest
+
+from neogrid.backend import inference_backends
+from neogrid.backend.nodes import sentiment
+
+
+def test_backend_is_selected_per_node_type(monkeypatch):
+    """
+    Tests that node types default to the transformers backend unless configured otherwise.
+    """
+    monkeypatch.setattr(inference_backends, "INFERENCE_BACKENDS", {"sentiment": "onnxruntime"})
+    assert inference_backends.backend_for("sentiment") == "onnxruntime"
+    assert inference_backends.backend_for("summarizer") == "transformers"
+
+    monkeypatch.setattr(inference_backends, "INFERENCE_BACKENDS", {"sentiment": "tensorrt"})
+    with pytest.raises(ValueError):
+        inference_backends.backend_for("sentiment")
+
+
+def test_transformers_backend_uses_the_given_factory():
+    """
+    Tests that the transformers backend builds the pipeline with the node's factory.
+    """
+    calls = []
+
+    def factory(task, model=None):
+        calls.append((task, model))
+        return lambda text: [{"label": "POSITIVE", "score": 1.0}]
+
+    pipe = inference_backends.load_pipeline("sentiment", "sentiment-analysis", "some-model", factory=factory,
+                                            backend="transformers")
+    assert calls == [("sentiment-analysis", "some-model")]
+    assert pipe("x")[0]["label"] == "POSITIVE"
+
+
+def test_onnx_backend_without_exported_model_returns_503(client, monkeypatch, tmp_path):
+    """
+    Tests that selecting the onnxruntime backend without exported model files keeps the /infer
+    contract and reports the model as unavailable with the export command.
+    """
+    monkeypatch.setattr(inference_backends, "INFERENCE_BACKENDS", {"sentiment": "onnxruntime"})
+    monkeypatch.setattr(inference_backends, "ONNX_MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(sentiment, "sentiment_analyzer_pipeline", None)
+
+    response = client.post("/nodes/sentiment/infer", json={"input": "great"})
+    assert response.status_code == 503
+    assert "optimum-cli export onnx" in response.json()["detail"]
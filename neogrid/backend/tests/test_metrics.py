@@ -0,0 +1,79 @@
+import time
+
+from neogrid.backend import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    """
+    Tests the Prometheus text format of a histogram: cumulative buckets, sum and count.
+    """
+    registry = metrics.Registry()
+    original = metrics.REGISTRY
+    metrics.REGISTRY = registry
+    try:
+        histogram = metrics.Histogram("test_latency_seconds", "Test latency.", ("node_type",), buckets=(0.1, 1.0))
+    finally:
+        metrics.REGISTRY = original
+    histogram.observe(0.05, node_type="a")
+    histogram.observe(0.5, node_type="a")
+    histogram.observe(5, node_type="a")
+
+    text = registry.render()
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{node_type="a",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{node_type="a",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{node_type="a",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{node_type="a"} 3' in text
+
+
+def test_metrics_endpoint_reports_node_and_http_series(client):
+    """
+    Tests that /metrics exposes node latency, request counters, DB latency and queue depths.
+    """
+    client.post("/nodes/code_analyzer/infer", json={"input": "x = 1"})
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'neurogrid_node_latency_seconds_count{node_type="code_analyzer"}' in text
+    assert 'neurogrid_http_requests_total{method="POST",route="/nodes/code_analyzer/infer",status="200"}' in text
+    assert 'neurogrid_executor_queue_depth{executor="db"}' in text
+    assert 'neurogrid_executor_queue_depth{executor="threadpool"}' in text
+    assert "neurogrid_workflows_in_flight" in text
+
+
+def test_unmatched_paths_add_no_label_values(client):
+    """
+    Tests that requests to unknown node paths are labelled "unmatched" and record no node series,
+    and that matched routes are labelled by their template.
+    """
+    client.post("/nodes/made-up-1234/infer", json={"input": "x"})
+    client.get("/runs/987654")
+    text = client.get("/metrics").text
+
+    assert "made-up-1234" not in text
+    assert metrics.node_latency.count(node_type="made-up-1234") == 0
+    assert 'route="unmatched"' in text
+    assert 'route="/runs/{run_id}"' in text
+
+
+def test_db_queries_are_timed(client):
+    """
+    Tests that statements run through the app's engine are observed.
+    """
+    before = metrics.db_query_latency.count(operation="SELECT")
+    client.post("/auth/login", json={"username": "metrics-nobody", "password": "x"})
+    assert metrics.db_query_latency.count(operation="SELECT") > before
+
+
+def test_recording_overhead_is_small():
+    """
+    Tests that recording a sample stays cheap enough for the hot path.
+    """
+    iterations = 100_000
+    started = time.perf_counter()
+    for _ in range(iterations):
+        metrics.node_latency.observe(0.01, node_type="overhead-test")
+    per_call = (time.perf_counter() - started) / iterations
+    assert per_call < 20e-6
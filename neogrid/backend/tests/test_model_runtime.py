@@ -0,0 +1,70 @@
+import pytest
+
+from neogrid.backend import model_runtime
+from neogrid.backend.benchmarks.quantization import rouge_l
+
+
+def test_thread_settings_per_model():
+    """
+    Tests parsing of a global thread count and of per-model overrides.
+    """
+    assert model_runtime._parse_threads("4") == {"*": 4}
+    assert model_runtime._parse_threads("summarizer=4, sentiment=1") == {"summarizer": 4, "sentiment": 1}
+    assert model_runtime._parse_threads("") == {}
+
+
+def test_malformed_thread_settings_are_skipped(monkeypatch):
+    """
+    Tests that malformed entries are skipped instead of failing at import, and that torch gets
+    one process-wide count.
+    """
+    assert model_runtime._parse_threads("summarizer, sentiment=x, code_analyzer=2") == {"code_analyzer": 2}
+    monkeypatch.setattr(model_runtime, "TORCH_THREADS", {"summarizer": 4, "sentiment": 1})
+    assert model_runtime.process_threads() == 4
+    monkeypatch.setattr(model_runtime, "TORCH_THREADS", {"*": 2, "summarizer": 4})
+    assert model_runtime.process_threads() == 2
+
+
+def test_quantization_is_opt_in_per_node(monkeypatch):
+    """
+    Tests that only the configured node types are quantized.
+    """
+    monkeypatch.setattr(model_runtime, "QUANTIZE_NODES", {"summarizer"})
+    assert model_runtime.should_quantize("summarizer")
+    assert not model_runtime.should_quantize("sentiment")
+    monkeypatch.setattr(model_runtime, "QUANTIZE_NODES", {"all"})
+    assert model_runtime.should_quantize("sentiment")
+
+
+def test_pipelines_without_a_torch_model_pass_through():
+    """
+    Tests that test doubles and non-torch pipelines are returned unchanged and still callable.
+    """
+    fake = lambda text: [{"label": "POSITIVE", "score": 1.0}]
+    assert model_runtime.optimize_pipeline(fake, "sentiment", quantize=True) is fake
+    with model_runtime.inference_mode("sentiment"):
+        assert fake("x")[0]["label"] == "POSITIVE"
+
+
+def test_dynamic_int8_quantizes_linear_layers():
+    """
+    Tests that int8 mode swaps the model's linear layers for dynamically quantized ones.
+    """
+    torch = pytest.importorskip("torch")
+
+    class FakePipeline:
+        model = torch.nn.Sequential(torch.nn.Linear(8, 8), torch.nn.ReLU(), torch.nn.Linear(8, 2))
+
+    pipe = model_runtime.optimize_pipeline(FakePipeline(), "sentiment", quantize=True)
+    assert isinstance(pipe.model[0], torch.ao.nn.quantized.dynamic.Linear)
+    with model_runtime.inference_mode("sentiment"):
+        assert pipe.model(torch.ones(1, 8)).shape == (1, 2)
+
+
+def test_rouge_l():
+    """
+    Tests the ROUGE-L F1 used by the accuracy report.
+    """
+    assert rouge_l("the cat sat", "the cat sat") == 1.0
+    assert rouge_l("the cat sat", "the cat sat on the mat") == pytest.approx(2 / 3)
+    assert rouge_l("", "anything") == 0.0
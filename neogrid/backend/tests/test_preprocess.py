@@ -0,0 +1,72 @@
+import json
+
+import pandas as pd
+import pytest
+
+from neogrid.data import preprocess
+
+TEXTS = ["Hello, World!", None, "It's GREAT!!", "naïve café — ok?", "  Tabs\tand  spaces.  "]
+
+
+def _write_corpus(path, rows: int):
+    pd.DataFrame({"id": range(rows), "text": [TEXTS[i % len(TEXTS)] for i in range(rows)]}).to_csv(path, index=False)
+
+
+def test_clean_text_column_matches_clean_text():
+    """
+    Tests that the vectorized cleaning gives the same result as `clean_text` row by row, including
+    for missing and non-string values.
+    """
+    texts = pd.Series(TEXTS + [3, float("nan")], dtype=object)
+
+    assert preprocess.clean_text_column(texts).tolist() == [preprocess.clean_text(t) for t in texts]
+    assert preprocess.clean_text_column(pd.Series([1, 2])).tolist() == ["", ""]
+
+
+def test_preprocess_file_writes_chunks_in_input_order(tmp_path):
+    """
+    Tests that chunks cleaned on several processes are written in input order and counted in the
+    returned stats.
+    """
+    _write_corpus(tmp_path / "corpus.csv", 53)
+
+    stats = preprocess.preprocess_file(tmp_path / "corpus.csv", tmp_path / "corpus.jsonl", chunksize=10,
+                                       workers=2, progress=False)
+
+    rows = [json.loads(line) for line in (tmp_path / "corpus.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [row["id"] for row in rows] == list(range(53))
+    assert [row["cleaned_text"] for row in rows] == [preprocess.clean_text(TEXTS[i % len(TEXTS)]) for i in range(53)]
+    assert stats["rows"] == 53 and stats["chunks"] == 6 and stats["rows_per_sec"] > 0
+
+
+def test_preprocess_file_writes_parquet(tmp_path):
+    """
+    Tests that Parquet output holds every chunk, even when a chunk's text column is all empty,
+    and that a column changing type partway through the file is written as strings while the
+    other columns keep their types.
+    """
+    pytest.importorskip("pyarrow")
+    pd.DataFrame({"text": ["A!", "B?", None, None, "C."], "ref": [1, 2, 3, 4, "x-5"],
+                  "id": range(5)}).to_csv(
+        tmp_path / "corpus.csv", index=False)
+
+    preprocess.preprocess_file(tmp_path / "corpus.csv", tmp_path / "corpus.parquet", chunksize=2, workers=1,
+                               progress=False)
+
+    table = pd.read_parquet(tmp_path / "corpus.parquet")
+    assert table["cleaned_text"].tolist() == ["a", "b", "", "", "c"]
+    assert table["ref"].tolist() == ["1", "2", "3", "4", "x-5"]
+    assert table["id"].tolist() == list(range(5))
+
+
+def test_preprocess_file_rejects_missing_column_and_unknown_format(tmp_path):
+    """
+    Tests that a missing text column and an unsupported output format are reported as errors.
+    """
+    _write_corpus(tmp_path / "corpus.csv", 5)
+
+    with pytest.raises(ValueError, match="body"):
+        preprocess.preprocess_file(tmp_path / "corpus.csv", tmp_path / "out.jsonl", text_column="body",
+                                   workers=1, progress=False)
+    with pytest.raises(ValueError, match="Unsupported"):
+        preprocess.preprocess_file(tmp_path / "corpus.csv", tmp_path / "out.csv", workers=1, progress=False)
@@ -0,0 +1,85 @@
+import pstats
+import threading
+import time
+
+from neogrid.backend import profiling
+
+CODE_WORKFLOW = {
+    "nodes": [
+        {"id": "n1", "data": {"nodeType": "code_analyzer", "input": "def f():\n    return 1\n"}},
+    ],
+    "edges": [],
+}
+
+
+def _busy(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_sampling_profiler_records_folded_stacks():
+    """
+    Tests that the sampler captures the stacks of a busy thread in folded format.
+    """
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,), name="busy-worker")
+    worker.start()
+    sampler = profiling.SamplingProfiler(interval_ms=1)
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    stop.set()
+    worker.join()
+
+    folded = sampler.folded()
+    assert sampler.samples > 0
+    assert any(line.startswith("busy-worker;") and "test_profiling.py:_busy" in line
+               for line in folded.splitlines())
+
+
+def test_profiled_run_returns_pstats_and_memory_report(client, admin_headers, in_process_engine):
+    """
+    Tests that ?profile=true profiles the run's node handlers and links downloadable output.
+    """
+    workflow = client.post("/workflows/", json={"name": "profiled", "config_json": CODE_WORKFLOW},
+                           headers=admin_headers).json()
+    response = client.post(f"/workflow/{workflow['id']}/execute?profile=true", json={"inputs": {}},
+                           headers=admin_headers)
+
+    assert response.status_code == 200
+    report = response.json()["output_json"]["_profile"]
+    assert report["node_calls"] == {"code_analyzer": 1}
+    assert report["top_functions"]
+    assert set(report["memory"]) == {"top_sites", "by_node"}
+
+    download = client.get(report["files"]["pstats"], headers=admin_headers)
+    assert download.status_code == 200
+    path = profiling.profile_path(report["id"], "pstats")
+    assert any(func == "analyze_python_code" for _, _, func in pstats.Stats(path).stats)
+
+
+def test_profiling_requires_admin(client, auth_headers):
+    """
+    Tests that non-admin users can neither profile runs nor use the admin endpoints.
+    """
+    workflow = client.post("/workflows/", json={"name": "p", "config_json": CODE_WORKFLOW},
+                           headers=auth_headers).json()
+    response = client.post(f"/workflow/{workflow['id']}/execute?profile=true", json={"inputs": {}},
+                           headers=auth_headers)
+    assert response.status_code == 403
+    assert client.post("/admin/profile?seconds=0.1", headers=auth_headers).status_code == 403
+
+
+def test_admin_process_sample(client, admin_headers):
+    """
+    Tests that the admin endpoint samples the process for the requested time.
+    """
+    response = client.post("/admin/profile?seconds=0.2&interval_ms=2", headers=admin_headers)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["duration_ms"] >= 200
+    assert report["samples"] > 0
+    assert client.get(f"/admin/profiles/{report['id']}", headers=admin_headers).json()["id"] == report["id"]
+    folded = client.get(report["files"]["folded"], headers=admin_headers)
+    assert folded.status_code == 200
@@ -0,0 +1,130 @@
+from neogrid.backend import inference_backends, metrics, model_runtime, sentence_cache
+from neogrid.backend.benchmarks.stubs import StubPipeline
+from neogrid.backend.nodes import sentiment
+
+SIGNATURE = "Thanks for contacting support!\nBest regards, The Team."
+
+
+class CountingPipeline(StubPipeline):
+    """Stub pipeline recording every text it scores."""
+
+    def __init__(self):
+        super().__init__(lambda text: {"label": "NEGATIVE" if "broken" in text else "POSITIVE", "score": 0.9})
+        self.seen = []
+
+    def __call__(self, inputs, **kwargs):
+        self.seen.extend(inputs)
+        return super().__call__(inputs, **kwargs)
+
+
+def test_sentences_are_split_and_normalized():
+    """
+    Tests that texts are split at sentence ends and line breaks, and that copies differing in
+    case or spacing normalize to the same sentence.
+    """
+    assert sentence_cache.split_sentences("Hi there.  It works!\n\nDoes it? yes") == [
+        "Hi there.", "It works!", "Does it?", "yes"]
+    assert sentence_cache.normalize("  Best   regards,\tThe TEAM. ") == "best regards, the team."
+    assert sentence_cache.split_sentences("   ") == []
+
+
+def test_cache_tiers_persist_and_stay_bounded(tmp_path):
+    """
+    Tests that the memory tier evicts least recently used entries, that entries survive in the
+    SQLite tier across instances, and that the SQLite tier is trimmed to its row limit.
+    """
+    path = str(tmp_path / "sentences.db")
+    cache = sentence_cache.SentenceCache(path, max_size=2, max_rows=10)
+    cache.put_many({"a": {"score": 1}, "b": {"score": 2}})
+    cache.get_many(["a"])
+    cache.put_many({"c": {"score": 3}})
+    assert list(cache._entries) == ["a", "c"]
+    before = metrics.cache_requests.value(cache="sentence", result="disk_hit")
+    assert cache.get_many(["b", "x"]) == {"b": {"score": 2}}
+    assert metrics.cache_requests.value(cache="sentence", result="disk_hit") - before == 1
+    cache.close()
+
+    reopened = sentence_cache.SentenceCache(path, max_size=100, max_rows=10)
+    assert reopened.get_many(["a", "b", "c"]) == {"a": {"score": 1}, "b": {"score": 2}, "c": {"score": 3}}
+    reopened.put_many({f"k{i}": {"score": i} for i in range(10)})
+    rows = reopened._connect().execute("SELECT key FROM sentences").fetchall()
+    assert len(rows) <= 10 and ("k9",) in rows
+    reopened.close()
+
+    memory_only = sentence_cache.SentenceCache("", max_size=10)
+    memory_only.put_many({"a": {"score": 1}})
+    assert memory_only.get_many(["a", "b"]) == {"a": {"score": 1}}
+
+
+def test_sentiment_runs_only_unseen_sentences(client, monkeypatch, tmp_path):
+    """
+    Tests that with the sentence cache, boilerplate shared by documents is scored once, later
+    requests only run new sentences, and each document's result combines its sentences.
+    """
+    pipe = CountingPipeline()
+    monkeypatch.setattr(sentiment, "sentiment_analyzer_pipeline", pipe)
+    monkeypatch.setattr(sentence_cache, "sentence_cache", sentence_cache.SentenceCache(str(tmp_path / "s.db")))
+    tickets = [f"My order is broken. {SIGNATURE}", f"The app is great. {SIGNATURE}", f"The app is great. {SIGNATURE}"]
+
+    response = client.post("/nodes/sentiment/infer", json={"input": tickets, "sentence_cache": True})
+
+    assert response.status_code == 200
+    first = response.json()["output"]
+    assert sorted(pipe.seen) == sorted(["my order is broken.", "the app is great.", "thanks for contacting support!",
+                                        "best regards, the team."])
+    assert first[1]["label"] == "POSITIVE" and first[0]["score"] < first[1]["score"]
+    assert [s["label"] for s in first[0]["sentences"]] == ["NEGATIVE", "POSITIVE", "POSITIVE"]
+
+    pipe.seen.clear()
+    response = client.post("/nodes/sentiment/infer", json={"input": f"THE APP  is great. Still broken. {SIGNATURE}",
+                                                           "sentence_cache": True})
+    assert response.status_code == 200
+    assert pipe.seen == ["still broken."]
+    assert len(response.json()["output"]["sentences"]) == 4
+
+
+def test_sentence_cache_flag_must_be_a_bool(client, monkeypatch):
+    """
+    Tests that a "sentence_cache" value other than true or false is rejected instead of being read as truthy.
+    """
+    monkeypatch.setattr(sentiment, "sentiment_analyzer_pipeline", CountingPipeline())
+
+    response = client.post("/nodes/sentiment/infer", json={"input": "Fine.", "sentence_cache": "false"})
+
+    assert response.status_code == 400
+    assert "sentence_cache" in response.json()["detail"]
+
+
+def test_benchmark_scores_each_repeated_sentence_once(monkeypatch, tmp_path):
+    """
+    Tests that the sentence cache benchmark uses its own empty cache, so templated sentences are
+    scored once and the shared cache is left untouched.
+    """
+    from neogrid.backend.benchmarks import sentence_cache as benchmark
+
+    shared = sentence_cache.SentenceCache(str(tmp_path / "s.db"))
+    monkeypatch.setattr(sentence_cache, "sentence_cache", shared)
+
+    report = benchmark.run(docs=200, batch=50, orders=20, seed=1)
+
+    # Greeting and signature once, plus one sentence per distinct order number.
+    assert report["sentences"] == 600
+    assert report["model_inputs_sentence_cache"] <= 2 + 21
+    assert report["model_inputs_per_document"] > report["model_inputs_sentence_cache"]
+    assert len(shared) == 0
+
+
+def test_cache_entries_are_not_shared_across_backends_or_modes(monkeypatch):
+    """
+    Tests that the sentiment node's cache namespace changes with the inference backend and the CPU
+    mode, so fp32, int8 and ONNX scores are never served for one another.
+    """
+    monkeypatch.setattr(inference_backends, "INFERENCE_BACKENDS", {})
+    monkeypatch.setattr(model_runtime, "mode", lambda node_type: "fp32")
+    fp32 = sentiment.sentence_cache_namespace()
+    monkeypatch.setattr(model_runtime, "mode", lambda node_type: "int8")
+    int8 = sentiment.sentence_cache_namespace()
+    monkeypatch.setattr(inference_backends, "INFERENCE_BACKENDS", {"sentiment": "onnxruntime"})
+    onnx = sentiment.sentence_cache_namespace()
+
+    assert len({fp32, int8, onnx}) == 3
@@ -0,0 +1,78 @@
+import datetime
+import json
+import math
+
+import numpy as np
+import pytest
+
+from neogrid.backend import serialization, tracing
+from neogrid.backend.database import crud, schemas
+from neogrid.backend.database.blob_store import blob_store
+
+CODE_WORKFLOW = {
+    "nodes": [{"id": "n1", "data": {"nodeType": "code_analyzer", "input": "def f():\n    return 1\n"}}],
+    "edges": [],
+}
+VALUES = {
+    "count": np.int64(3),
+    "scores": np.array([0.5, 0.25]),
+    "at": datetime.datetime(2024, 5, 1, 12, 30),
+    "tags": {"a"},
+    "big": 2 ** 70,
+    "text": "naïve café",
+    7: "non-string key",
+}
+EXPECTED = {"count": 3, "scores": [0.5, 0.25], "at": "2024-05-01T12:30:00", "tags": ["a"], "big": 2 ** 70,
+            "text": "naïve café", "7": "non-string key"}
+
+
+@pytest.mark.parametrize("encoder", ["orjson", "json"])
+def test_dumps_and_loads_handle_values_nodes_return(encoder, monkeypatch):
+    """
+    Tests that both encoders turn numpy values, datetimes, sets, big integers and non-string keys
+    into the same JSON.
+    """
+    if encoder == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+
+    encoded = serialization.dumps(VALUES)
+
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == EXPECTED
+    assert serialization.loads(encoded) == EXPECTED
+    assert math.isnan(serialization.loads(b'{"score": NaN}')["score"])
+
+
+def test_node_responses_are_encoded_in_the_handler(client):
+    """
+    Tests that node handlers return pre-encoded JSON and report the encoding time.
+    """
+    response = client.post("/nodes/code_analyzer/infer", json={"input": "x = 1\n"})
+
+    assert response.status_code == 200
+    assert response.json()["output"]["status"] == "success"
+    assert "encode" in tracing.parse_server_timing(response.headers["server-timing"])["timings"]
+
+
+def test_run_records_match_the_schema_and_blobs_pass_through(client, auth_headers, in_process_engine, monkeypatch):
+    """
+    Tests that run records encoded without validation still match `schemas.WorkflowRun`, and that
+    an externalized output is sent exactly as stored.
+    """
+    monkeypatch.setattr(crud, "BLOB_THRESHOLD_BYTES", 10)
+    workflow_id = client.post("/workflows/", json={"name": "encode", "config_json": CODE_WORKFLOW},
+                              headers=auth_headers).json()["id"]
+    run = client.post(f"/workflow/{workflow_id}/execute", json={"inputs": {}}, headers=auth_headers).json()
+
+    for response in (client.get(f"/runs/{run['id']}", headers=auth_headers),
+                     client.get(f"/workflow/{workflow_id}/runs", params={"fields": "full"}, headers=auth_headers)):
+        assert response.headers["content-type"] == "application/json"
+        records = response.json() if isinstance(response.json(), list) else [response.json()]
+        for record in records:
+            assert schemas.WorkflowRun(**record).dict() == {**record, "created_at": datetime.datetime.fromisoformat(
+                record["created_at"])}
+
+    response = client.get(f"/runs/{run['id']}/output", headers=auth_headers)
+    assert response.content == blob_store.get_bytes(run["output_ref"])
@@ -0,0 +1,61 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from neogrid.backend import serve
+from neogrid.backend.benchmarks.prefork import _descendants, _free_port, process_memory
+from neogrid.backend.nodes import sentiment, summarizer
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+
+def test_preload_loads_models_and_reports_failures(monkeypatch):
+    """
+    Tests that preloading calls each node's loader and leaves failed models to lazy loading.
+    """
+    loaded = []
+    monkeypatch.setattr(summarizer, "load_model", lambda: loaded.append("summarizer"))
+
+    def unavailable():
+        raise RuntimeError("no weights")
+
+    monkeypatch.setattr(sentiment, "load_model", unavailable)
+
+    assert serve.preload(["summarizer", "sentiment"]) == {"sentiment": "no weights"}
+    assert loaded == ["summarizer"]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="uses fork and /proc")
+def test_prefork_server_serves_from_several_workers(tmp_path):
+    """
+    Tests that the pre-fork server starts the workers on one socket and shuts down cleanly.
+    """
+    port = _free_port()
+    env = {**os.environ, "NEUROGRID_DATABASE_URL": f"sqlite:///{tmp_path}/serve.db",
+           "NEUROGRID_BLOB_DIR": str(tmp_path / "blobs")}
+    server = subprocess.Popen([sys.executable, "-m", "neogrid.backend.serve", "--workers", "2", "--port", str(port),
+                               "--preload", "none", "--log-level", "warning"], env=env, cwd=REPO_ROOT)
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            assert server.poll() is None, "server exited"
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            assert time.monotonic() < deadline, "server did not come up"
+            time.sleep(0.2)
+
+        workers = _descendants(server.pid)
+        assert len(workers) == 2
+        assert all(process_memory(pid)["rss_mib"] >= process_memory(pid)["uss_mib"] > 0 for pid in workers)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=30) == 0
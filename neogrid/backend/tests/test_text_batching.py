@@ -0,0 +1,121 @@
+import pytest
+
+from neogrid.backend import metrics, text_batching
+from neogrid.backend.benchmarks.stubs import StubPipeline
+from neogrid.backend.nodes import sentiment
+
+
+class RecordingPipeline(StubPipeline):
+    """Stub pipeline counting words as tokens and recording the batches it is called with."""
+
+    def __init__(self, make_output):
+        super().__init__(make_output)
+        self.batches = []
+
+    def __call__(self, inputs, **kwargs):
+        self.batches.append(list(inputs))
+        return super().__call__(inputs, **kwargs)
+
+
+def test_batches_group_similar_lengths():
+    """
+    Tests that items are batched within their length bucket, shortest first.
+    """
+    lengths = [500, 10, 20, 300, 12, 30]
+    batches = text_batching.plan_batches(lengths, batch_size=2, buckets=(32, 512))
+    assert batches == [[1, 4], [2, 5], [3, 0]]
+    assert text_batching.padding_stats([10, 12]) == (22, 2)
+
+
+def test_outputs_keep_input_order_and_padding_is_counted(monkeypatch):
+    """
+    Tests that bucketed outputs come back in input order and padding tokens are recorded.
+    """
+    monkeypatch.setattr(text_batching, "TEXT_BATCH_SIZE", 8)
+    pipe = RecordingPipeline(lambda text: {"label": text})
+    texts = ["a " * 200, "b", "c c", "d " * 150]
+    before = metrics.batch_tokens.value(node_type="sentiment", kind="padding")
+
+    outputs = text_batching.run_batched(pipe, texts, "sentiment")
+
+    assert [o["label"] for o in outputs] == texts
+    # short and long inputs are never padded to each other
+    assert sorted(len(batch) for batch in pipe.batches) == [2, 2]
+    assert metrics.batch_tokens.value(node_type="sentiment", kind="padding") - before == 1 + 50
+
+
+def test_long_input_policies(monkeypatch):
+    """
+    Tests truncation, chunking with combined outputs, and rejection of inputs over the limit.
+    """
+    monkeypatch.setattr(text_batching, "DEFAULT_MAX_TOKENS", {"sentiment": 12})
+    long_text = " ".join(["good"] * 25)
+    pipe = RecordingPipeline(lambda text: {"label": "POSITIVE", "score": 0.5})
+
+    monkeypatch.setitem(text_batching.LONG_INPUT_POLICIES, "sentiment", "truncate")
+    text_batching.run_batched(pipe, [long_text], "sentiment")
+    assert pipe.batches[-1] == [long_text]
+
+    monkeypatch.setitem(text_batching.LONG_INPUT_POLICIES, "sentiment", "chunk")
+    monkeypatch.setitem(text_batching.CHUNK_OVERLAP, "sentiment", 0)
+    [result] = text_batching.run_batched(pipe, [long_text], "sentiment", combine=sentiment.combine_chunk_sentiments)
+    assert sorted(len(piece.split()) for piece in pipe.batches[-1]) == [5, 10, 10]
+    assert (result["label"], result["score"]) == ("POSITIVE", 0.5)
+
+    monkeypatch.setitem(text_batching.LONG_INPUT_POLICIES, "sentiment", "error")
+    with pytest.raises(text_batching.InputTooLong):
+        text_batching.run_batched(pipe, [long_text], "sentiment")
+
+
+def test_long_inputs_are_scored_in_overlapping_windows(monkeypatch):
+    """
+    Tests that a long input is split into overlapping windows that are scored in one batch with
+    the other inputs, and that the window scores are combined by length.
+    """
+    monkeypatch.setattr(text_batching, "DEFAULT_MAX_TOKENS", {"sentiment": 12})
+    monkeypatch.setitem(text_batching.CHUNK_OVERLAP, "sentiment", 4)
+    words = [f"w{i}" for i in range(14)] + ["bad"] * 4
+    pipe = RecordingPipeline(
+        lambda text: {"label": "NEGATIVE", "score": 1.0} if "bad" in text else {"label": "POSITIVE", "score": 0.8})
+
+    long_result, short_result = text_batching.run_batched(
+        pipe, [" ".join(words), "fine"], "sentiment", combine=sentiment.combine_chunk_sentiments, policy="chunk")
+
+    [batch] = pipe.batches
+    assert sorted(batch) == sorted(["fine", " ".join(words[:10]), " ".join(words[6:16]), " ".join(words[12:])])
+    assert [window["tokens"] for window in long_result["windows"]] == [10, 10, 6]
+    assert [window["label"] for window in long_result["windows"]] == ["POSITIVE", "NEGATIVE", "NEGATIVE"]
+    # P(POSITIVE) = (10 * 0.8 + 10 * 0 + 6 * 0) / 26
+    assert long_result["label"] == "NEGATIVE"
+    assert long_result["score"] == pytest.approx(1 - 8 / 26)
+    assert short_result == {"label": "POSITIVE", "score": 0.8}
+
+    uniform = sentiment.combine_chunk_sentiments([({"label": "POSITIVE", "score": 0.9}, 100),
+                                                  ({"label": "NEGATIVE", "score": 0.9}, 10),
+                                                  ({"label": "NEGATIVE", "score": 0.9}, 10)], length_weight=0)
+    assert uniform["label"] == "NEGATIVE" and uniform["score"] == pytest.approx((0.1 + 0.9 + 0.9) / 3)
+
+
+def test_sentiment_node_returns_one_result_per_list_item(client, monkeypatch):
+    """
+    Tests that a batched sentiment request gets a result for every item, in order.
+    """
+    monkeypatch.setattr(sentiment, "sentiment_analyzer_pipeline",
+                        StubPipeline(lambda text: {"label": "NEGATIVE" if "bad" in text else "POSITIVE", "score": 0.9}))
+    response = client.post("/nodes/sentiment/infer", json={"input": ["good day", "bad day", "fine"]})
+    assert response.status_code == 200
+    assert [r["label"] for r in response.json()["output"]] == ["POSITIVE", "NEGATIVE", "POSITIVE"]
+
+
+def test_repeated_texts_in_a_batch_run_once():
+    """
+    Tests that duplicate items are collapsed before inference and fanned back out.
+    """
+    pipe = RecordingPipeline(lambda text: {"label": text.upper()})
+    before = metrics.deduplicated_items.value(node_type="sentiment", kind="in_batch")
+
+    outputs = text_batching.run_batched(pipe, ["a", "b", "a", "a"], "sentiment")
+
+    assert [o["label"] for o in outputs] == ["A", "B", "A", "A"]
+    assert sum(len(batch) for batch in pipe.batches) == 2
+    assert metrics.deduplicated_items.value(node_type="sentiment", kind="in_batch") - before == 2
@@ -0,0 +1,53 @@
+from neogrid.backend import tracing
+
+
+def test_server_timing_roundtrip():
+    """
+    Tests that node stats survive formatting to and parsing from a Server-Timing header.
+    """
+    stats = {"timings": {"handler": 12.5, "model_load": 3.0}, "cache": {"model": "miss"}}
+    parsed = tracing.parse_server_timing(tracing.format_server_timing(stats))
+    assert parsed == stats
+
+
+def test_node_response_reports_model_load_and_inference(client, monkeypatch):
+    """
+    Tests that a model node reports model load, inference and cache status separately.
+    """
+    from neogrid.backend.nodes import sentiment
+
+    def fake_pipeline(task, model=None):
+        return lambda text, **kwargs: [{"label": "POSITIVE", "score": 0.99}]
+
+    monkeypatch.setattr(sentiment, "pipeline", fake_pipeline)
+    monkeypatch.setattr(sentiment, "sentiment_analyzer_pipeline", None)
+
+    first = client.post("/nodes/sentiment/infer", json={"input": "great"})
+    second = client.post("/nodes/sentiment/infer", json={"input": "great"})
+
+    first_timing = tracing.parse_server_timing(first.headers["server-timing"])
+    second_timing = tracing.parse_server_timing(second.headers["server-timing"])
+    assert "model_load" in first_timing["timings"]
+    assert first_timing["cache"]["model"] == "miss"
+    assert "model_load" not in second_timing["timings"]
+    assert "inference" in second_timing["timings"]
+    assert second_timing["cache"]["model"] == "hit"
+    assert second_timing["timings"]["cpu"] >= 0
+
+
+def test_chrome_trace_places_the_answering_request_after_retries():
+    """
+    Tests that failed attempts and backoff are drawn before the request that answered, and that
+    the handler is centred in that request.
+    """
+    timing = {"serialize_ms": 1.0, "failed_attempts_ms": 4.0, "retry_wait_ms": 5.0, "wall_ms": 10.0,
+              "server_ms": 6.0, "deserialize_ms": 1.0}
+    results = {"a": {"_execution_metadata": {"node_type": "sentiment", "started_at_ms": 100.0, "attempts": 2,
+                                             "status": "success", "timing": timing}}}
+
+    spans = {event["name"]: event for event in tracing.to_chrome_trace(results)["traceEvents"] if event["ph"] == "X"}
+
+    assert spans["retries"]["ts"] == 101_000 and spans["retries"]["dur"] == 9_000
+    assert spans["request"]["ts"] == 110_000
+    assert spans["handler"]["ts"] == 112_000
+    assert spans["a"]["dur"] == 21_000
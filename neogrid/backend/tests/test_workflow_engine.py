@@ -0,0 +1,337 @@
+import asyncio
+import json
+
+import httpx
+
+from neogrid.backend import metrics, streaming, workflow_engine
+from neogrid.backend.workflow_engine import CircuitBreaker, WorkflowEngine
+
+FAST_RETRY = {"timeout": 1.0, "retries": 2, "backoff_base": 0.001, "backoff_max": 0.01}
+
+
+def _node(node_id, node_type="code_analyzer", **policy):
+    return {"id": node_id, "data": {"nodeType": node_type, "policy": {**FAST_RETRY, **policy}}}
+
+
+def _engine(handler):
+    return WorkflowEngine(base_url="http://nodes", transport=httpx.MockTransport(handler))
+
+
+def test_transient_failures_are_retried():
+    """
+    Tests that a 503 is retried with backoff and the attempt count is recorded.
+    """
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            return httpx.Response(503, json={"detail": "loading"})
+        return httpx.Response(200, json={"output": "ok"})
+
+    results = asyncio.run(_engine(handler).execute_workflow([_node("a")], [], {}))
+
+    assert results["a"]["output"] == "ok"
+    assert results["a"]["_execution_metadata"]["attempts"] == 2
+    assert "retry_wait_ms" in results["a"]["_execution_metadata"]["timing"]
+    assert results["a"]["_execution_metadata"]["timing"]["failed_attempts_ms"] >= 0
+    assert results["_run_metadata"]["status"] == "success"
+
+
+def test_node_timeout_is_enforced_per_attempt():
+    """
+    Tests that a node exceeding its timeout fails after its retries instead of hanging.
+    """
+    async def handler(request):
+        await asyncio.sleep(1)
+        return httpx.Response(200, json={"output": "late"})
+
+    results = asyncio.run(_engine(handler).execute_workflow([_node("a", timeout=0.05, retries=1)], [], {}))
+
+    assert "no response within 0.05s" in results["a"]["error"]
+    assert results["a"]["_execution_metadata"]["attempts"] == 2
+    assert results["_run_metadata"]["status"] == "partial"
+
+
+def test_client_errors_are_not_retried():
+    """
+    Tests that a 400 from a node is returned as an error after a single attempt.
+    """
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(400, json={"detail": "bad input"})
+
+    results = asyncio.run(_engine(handler).execute_workflow([_node("a")], [], {}))
+    assert len(calls) == 1
+    assert results["a"]["_execution_metadata"]["status"] == "error"
+
+
+def test_descendants_of_failed_nodes_are_skipped():
+    """
+    Tests that nodes downstream of a failure are skipped while independent branches still run.
+    """
+    called = []
+
+    def handler(request):
+        node_type = request.url.path.split("/")[2]
+        called.append(node_type)
+        if node_type == "sentiment":
+            return httpx.Response(500, json={"detail": "boom"})
+        return httpx.Response(200, json={"output": node_type})
+
+    nodes = [_node("a", "sentiment"), _node("b", "output_node"), _node("c", "output_node"), _node("d", "code_analyzer")]
+    edges = [{"source": "a", "target": "b"}, {"source": "b", "target": "c"}]
+    results = asyncio.run(_engine(handler).execute_workflow(nodes, edges, {}))
+
+    assert results["a"]["_execution_metadata"]["status"] == "error"
+    assert results["b"]["_execution_metadata"]["status"] == "skipped"
+    assert results["c"]["_execution_metadata"]["status"] == "skipped"
+    assert results["d"]["output"] == "code_analyzer"
+    assert called.count("output_node") == 0
+
+
+def test_circuit_breaker_fails_fast_once_open():
+    """
+    Tests that after repeated failures a node type is no longer called until the reset time.
+    """
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(502)
+
+    engine = _engine(handler)
+    engine.breakers["sentiment"] = CircuitBreaker(threshold=3, reset_seconds=60)
+    asyncio.run(engine.execute_workflow([_node("a", "sentiment")], [], {}))
+    assert len(calls) == 3
+    assert engine.breakers["sentiment"].state == "open"
+
+    results = asyncio.run(engine.execute_workflow([_node("a", "sentiment")], [], {}))
+    assert len(calls) == 3
+    assert "circuit breaker for 'sentiment' is open" in results["a"]["error"]
+
+
+def test_node_errors_from_bad_input_do_not_open_the_breaker():
+    """
+    Tests that 500s returned for a request's input do not count toward the circuit breaker,
+    while 503s do.
+    """
+    status = {"code": 500}
+    engine = _engine(lambda request: httpx.Response(status["code"], json={"detail": "bad input"}))
+    engine.breakers["sentiment"] = CircuitBreaker(threshold=2, reset_seconds=60)
+
+    for _ in range(3):
+        results = asyncio.run(engine.execute_workflow([_node("a", "sentiment")], [], {}))
+        assert "error" in results["a"]
+    assert engine.breakers["sentiment"].state == "closed"
+
+    status["code"] = 503
+    asyncio.run(engine.execute_workflow([_node("a", "sentiment")], [], {}))
+    assert engine.breakers["sentiment"].state == "open"
+
+
+def test_circuit_breaker_half_open_trial():
+    """
+    Tests that an open breaker lets one trial through after the reset time and closes on success.
+    """
+    breaker = CircuitBreaker(threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_only_the_global_engine_reports_circuit_state():
+    """
+    Tests that engines built for tests and benchmarks do not take over the circuit state gauge
+    of the global engine.
+    """
+    workflow_engine.workflow_engine.breaker_for("input_node")
+    other = _engine(lambda request: httpx.Response(200, json={}))
+    other.breakers["input_node"] = CircuitBreaker(threshold=1, reset_seconds=60)
+    other.breaker_for("input_node").record_failure()
+    other.breaker_for("output_node")
+
+    assert metrics.circuit_state.value(node_type="input_node") == 0
+    assert metrics.circuit_state.value(node_type="output_node") == 0
+
+
+def test_malformed_node_policies_are_skipped():
+    """
+    Tests that invalid NEUROGRID_NODE_POLICIES values are reported and skipped instead of failing
+    at import, and that valid entries next to them still apply.
+    """
+    assert workflow_engine._parse_policies("{not json") == {}
+    assert workflow_engine._parse_policies("[1, 2]") == {}
+    assert workflow_engine._parse_policies(
+        '{"sentiment": 5, "summarizer": {"timeout": 600, "retries": 0}, "code_analyzer": {"timout": 1},'
+        ' "output_node": {"timeout": "fast"}}') == {"summarizer": {"timeout": 600, "retries": 0}}
+
+
+def test_cancel_stops_a_running_workflow():
+    """
+    Tests that cancelling a run aborts the in-flight node and never starts the next one.
+    """
+    started = []
+
+    async def handler(request):
+        started.append(request.url.path)
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={"output": "slow"})
+
+    engine = _engine(handler)
+    nodes = [_node("a", timeout=10), _node("b", "output_node")]
+
+    async def scenario():
+        run = asyncio.ensure_future(engine.execute_workflow(nodes, [{"source": "a", "target": "b"}], {}, run_id=7))
+        await asyncio.sleep(0.05)
+        assert engine.cancel(7)
+        return await asyncio.wait_for(run, 1)
+
+    results = asyncio.run(scenario())
+    assert len(started) == 1
+    assert results["_run_metadata"]["status"] == "cancelled"
+    assert results["a"]["_execution_metadata"]["status"] == "cancelled"
+    assert results["b"]["_execution_metadata"]["status"] == "cancelled"
+    assert not engine.cancel(7)
+
+
+def test_cancel_endpoint_rejects_runs_not_executing(client, auth_headers, in_process_engine):
+    """
+    Tests that cancelling a finished run returns 409.
+    """
+    workflow = client.post("/workflows/", json={"name": "done", "config_json": {
+        "nodes": [{"id": "n1", "data": {"nodeType": "code_analyzer", "input": "x = 1"}}], "edges": []}},
+        headers=auth_headers).json()
+    run = client.post(f"/workflow/{workflow['id']}/execute", json={"inputs": {}}, headers=auth_headers).json()
+
+    assert client.post(f"/runs/{run['id']}/cancel", headers=auth_headers).status_code == 409
+    assert client.post("/runs/999999/cancel", headers=auth_headers).status_code == 404
+
+
+def _text_chain_nodes(records, batch_size=2):
+    nodes = [
+        {"id": "pre", "data": {"nodeType": "preprocessing_node", "input": records, "stream_batch_size": batch_size,
+                               "streaming": True, "policy": FAST_RETRY}},
+        {"id": "sent", "data": {"nodeType": "sentiment", "streaming": True, "policy": FAST_RETRY}},
+        {"id": "out", "data": {"nodeType": "output_node", "policy": FAST_RETRY}},
+    ]
+    edges = [{"source": "pre", "target": "sent"}, {"source": "sent", "target": "out"}]
+    return nodes, edges
+
+
+def _record_handler(log, delays=None):
+    """Node stub: preprocessing lowercases records, sentiment labels them, output echoes its input."""
+    async def handler(request):
+        node_type = request.url.path.split("/")[2]
+        payload = json.loads(request.content)
+        log.append(node_type)
+        await asyncio.sleep((delays or {}).get(node_type, 0))
+        if node_type == "preprocessing_node":
+            data = [text.lower() for text in payload["input"]]
+            return httpx.Response(200, json={"output": {"data": data, "type": "raw", "record_count": len(data)}})
+        if node_type == "sentiment":
+            texts = payload["input"]["data"]
+            return httpx.Response(200, json={"output": [{"label": "NEGATIVE" if "bad" in t else "POSITIVE"}
+                                                        for t in texts]})
+        return httpx.Response(200, json={"output": payload["input"]})
+    return handler
+
+
+def test_streaming_chain_matches_whole_input_results():
+    """
+    Tests that a chain of streaming nodes runs per record batch and gives the same final output.
+    """
+    records = ["Good", "BAD", "fine", "Bad day", "great"]
+    log = []
+    nodes, edges = _text_chain_nodes(records)
+    results = asyncio.run(_engine(_record_handler(log)).execute_workflow(nodes, edges, {}))
+
+    assert [r["label"] for r in results["out"]["output"]] == ["POSITIVE", "NEGATIVE", "POSITIVE", "NEGATIVE", "POSITIVE"]
+    assert log.count("preprocessing_node") == 3 and log.count("sentiment") == 3 and log.count("output_node") == 1
+    assert results["pre"]["streamed_to"] == "sent"
+    assert results["sent"]["_execution_metadata"]["stream"] == {"batches": 3, "records": 5}
+    assert results["_run_metadata"]["status"] == "success"
+
+
+def test_streaming_is_opt_in_and_skips_empty_record_lists():
+    """
+    Tests that chains stream only when their nodes opt in, and that an empty record list gets one
+    ordinary call per node rather than an empty stream.
+    """
+    log = []
+    nodes, edges = _text_chain_nodes(["Good", "BAD", "fine"])
+    for node in nodes:
+        node["data"].pop("streaming", None)
+    results = asyncio.run(_engine(_record_handler(log)).execute_workflow(nodes, edges, {}))
+
+    assert log == ["preprocessing_node", "sentiment", "output_node"]
+    assert "stream" not in results["sent"]["_execution_metadata"]
+
+    log.clear()
+    nodes, edges = _text_chain_nodes([])
+    results = asyncio.run(_engine(_record_handler(log)).execute_workflow(nodes, edges, {}))
+
+    assert log == ["preprocessing_node", "sentiment", "output_node"]
+    assert results["out"]["output"] == []
+    assert "stream" not in results["pre"]["_execution_metadata"]
+    assert results["_run_metadata"]["status"] == "success"
+
+
+def test_streaming_stages_overlap_with_backpressure(monkeypatch):
+    """
+    Tests that a slow stage blocks its producer once the bounded queue between them is full.
+    """
+    monkeypatch.setattr(streaming, "STREAM_QUEUE_SIZE", 1)
+    log = []
+    nodes, edges = _text_chain_nodes([f"text {i}" for i in range(20)], batch_size=1)
+    asyncio.run(_engine(_record_handler(log, {"sentiment": 0.01})).execute_workflow(nodes, edges, {}))
+
+    # the first sentiment call starts before preprocessing has finished...
+    assert log.index("sentiment") < len(log) - 1 - log[::-1].index("preprocessing_node")
+    # ...and preprocessing never runs more than a few batches ahead of sentiment
+    ahead = max(log[:i].count("preprocessing_node") - log[:i].count("sentiment") for i in range(len(log)))
+    assert ahead <= 3
+
+
+def test_streaming_stage_failure_skips_the_rest_of_the_chain():
+    """
+    Tests that a failing batch stops the stream and downstream nodes are skipped.
+    """
+    def handler(request):
+        node_type = request.url.path.split("/")[2]
+        if node_type == "sentiment":
+            return httpx.Response(500, json={"detail": "boom"})
+        return httpx.Response(200, json={"output": {"data": json.loads(request.content)["input"], "type": "raw"}})
+
+    nodes, edges = _text_chain_nodes(["a", "b", "c"])
+    results = asyncio.run(_engine(handler).execute_workflow(nodes, edges, {}))
+
+    assert results["sent"]["_execution_metadata"]["status"] == "error"
+    assert results["pre"]["_execution_metadata"]["status"] == "cancelled"
+    assert results["out"]["_execution_metadata"]["status"] == "skipped"
+    assert results["_run_metadata"]["status"] == "partial"
+
+
+def test_intermediate_outputs_are_released_after_their_consumers():
+    """
+    Tests that only terminal and persisted outputs are kept and the peak held size is reported.
+    """
+    def handler(request):
+        return httpx.Response(200, json={"output": "x" * 1000})
+
+    nodes = [_node("a"), _node("b"), _node("c"), _node("d")]
+    nodes[3]["data"]["persist"] = True
+    edges = [{"source": "a", "target": "b"}, {"source": "a", "target": "c"}, {"source": "d", "target": "c"}]
+    results = asyncio.run(_engine(handler).execute_workflow(nodes, edges, {}))
+
+    assert "output" not in results["a"]
+    assert results["a"]["_execution_metadata"]["output_released"]
+    assert results["b"]["output"] and results["c"]["output"] and results["d"]["output"]
+    # a, b and d are all held when c finishes
+    response_bytes = results["c"]["_execution_metadata"]["payload"]["response_bytes"]
+    assert results["_run_metadata"]["peak_result_bytes"] == 4 * response_bytes
@@ -0,0 +1,225 @@
+import asyncio
+import time
+
+from neogrid.backend.database import database
+
+CODE_WORKFLOW = {
+    "nodes": [
+        {"id": "n1", "data": {"nodeType": "code_analyzer", "input": "def f():\n    return 1\n"}},
+    ],
+    "edges": [],
+}
+
+
+def test_create_and_list_workflows(client, auth_headers):
+    """
+    Tests that a created workflow shows up in the current user's workflow list.
+    """
+    response = client.post("/workflows/", json={"name": "wf", "config_json": CODE_WORKFLOW}, headers=auth_headers)
+    assert response.status_code == 200
+    workflow_id = response.json()["id"]
+
+    response = client.get("/workflows/", headers=auth_headers)
+    assert response.status_code == 200
+    assert workflow_id in [w["id"] for w in response.json()]
+    assert all("config_json" in w for w in response.json())
+
+
+def test_login_rejects_wrong_password(client, auth_headers):
+    """
+    Tests that login with an unknown user or bad password returns 401.
+    """
+    response = client.post("/auth/login", json={"username": "nobody-here", "password": "x"})
+    assert response.status_code == 401
+
+
+def test_execute_workflow_persists_run(client, auth_headers, in_process_engine):
+    """
+    Tests that executing a workflow stores the node results on the run record.
+    """
+    response = client.post("/workflows/", json={"name": "exec", "config_json": CODE_WORKFLOW}, headers=auth_headers)
+    workflow_id = response.json()["id"]
+
+    response = client.post(f"/workflow/{workflow_id}/execute", json={"inputs": {}}, headers=auth_headers)
+    assert response.status_code == 200
+    run = response.json()
+    assert run["workflow_id"] == workflow_id
+    assert run["output_json"]["n1"]["output"]["status"] == "success"
+
+
+def test_execute_unknown_workflow_returns_404(client, auth_headers):
+    """
+    Tests that executing a workflow the user does not own returns 404.
+    """
+    response = client.post("/workflow/999999/execute", json={"inputs": {}}, headers=auth_headers)
+    assert response.status_code == 404
+
+
+def test_run_db_does_not_block_event_loop():
+    """
+    Tests that a slow blocking DB call runs off the event loop, so other coroutines keep running.
+    """
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await database.run_db(time.sleep, 0.2)
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 5
+
+
+def test_large_run_output_is_externalized(client, auth_headers, in_process_engine, monkeypatch):
+    """
+    Tests that an output above the blob threshold is kept out of the row and loads on demand.
+    """
+    from neogrid.backend.database import crud
+    monkeypatch.setattr(crud, "BLOB_THRESHOLD_BYTES", 10)
+
+    response = client.post("/workflows/", json={"name": "big", "config_json": CODE_WORKFLOW}, headers=auth_headers)
+    workflow_id = response.json()["id"]
+    response = client.post(f"/workflow/{workflow_id}/execute", json={"inputs": {}}, headers=auth_headers)
+    assert response.status_code == 200
+    run = response.json()
+    # The execute response still carries the results inline.
+    assert run["output_json"]["n1"]["output"]["status"] == "success"
+    assert run["output_ref"].startswith("sha256:")
+
+    response = client.get(f"/runs/{run['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["output_json"] is None
+
+    response = client.get(f"/runs/{run['id']}/output", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == run["output_json"]
+
+
+def test_workflow_listing_is_paginated(client, auth_headers):
+    """
+    Tests keyset pagination of workflows through the X-Next-Cursor header and summary projection.
+    """
+    created = []
+    for i in range(5):
+        response = client.post("/workflows/", json={"name": f"page-{i}", "config_json": CODE_WORKFLOW}, headers=auth_headers)
+        created.append(response.json()["id"])
+
+    seen = []
+    params = {"limit": 2, "fields": "summary"}
+    while True:
+        response = client.get("/workflows/", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        for workflow in response.json():
+            assert "config_json" not in workflow
+            seen.append(workflow["id"])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params["after"] = cursor
+
+    assert seen == sorted(seen)
+    assert set(created) <= set(seen)
+
+    # Clients that do not page get every workflow, with no cursor.
+    response = client.get("/workflows/", headers=auth_headers)
+    assert [workflow["id"] for workflow in response.json()] == seen
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_run_history_is_paginated_newest_first(client, auth_headers):
+    """
+    Tests that run history pages are newest first, do not overlap and omit blobs by default.
+    """
+    from neogrid.backend.database import crud, database
+
+    response = client.post("/workflows/", json={"name": "history", "config_json": CODE_WORKFLOW}, headers=auth_headers)
+    workflow_id = response.json()["id"]
+    with database.SessionLocal() as db:
+        run_ids = [crud.create_run(db, workflow_id, {"i": i}).id for i in range(5)]
+
+    pages = []
+    params = {"limit": 2}
+    while True:
+        response = client.get(f"/workflow/{workflow_id}/runs", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params["cursor"] = cursor
+
+    listed = [run["id"] for page in pages for run in page]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert listed == sorted(run_ids, reverse=True)
+    assert "input_json" not in pages[0][0]
+
+    response = client.get(f"/workflow/{workflow_id}/runs", params={"fields": "full", "limit": 1}, headers=auth_headers)
+    assert response.json()[0]["input_json"] == {"i": 4}
+
+
+def test_run_history_rejects_bad_cursor(client, auth_headers):
+    """
+    Tests that a malformed cursor returns 400 instead of a server error.
+    """
+    response = client.post("/workflows/", json={"name": "cursor", "config_json": CODE_WORKFLOW}, headers=auth_headers)
+    workflow_id = response.json()["id"]
+    response = client.get(f"/workflow/{workflow_id}/runs", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_run_records_node_timing_and_trace(client, auth_headers, in_process_engine):
+    """
+    Tests that each node's metadata carries timing and payload sizes and that the run
+    exports a Chrome trace.
+    """
+    response = client.post("/workflows/", json={"name": "traced", "config_json": CODE_WORKFLOW}, headers=auth_headers)
+    workflow_id = response.json()["id"]
+    run = client.post(f"/workflow/{workflow_id}/execute", json={"inputs": {}}, headers=auth_headers).json()
+
+    metadata = run["output_json"]["n1"]["_execution_metadata"]
+    timing = metadata["timing"]
+    for key in ("queue_wait_ms", "serialize_ms", "wall_ms", "deserialize_ms", "server_ms", "cpu_ms"):
+        assert timing[key] >= 0
+    assert metadata["payload"]["request_bytes"] > 0
+    assert metadata["payload"]["response_bytes"] > 0
+    assert run["output_json"]["_run_metadata"]["wall_ms"] >= timing["wall_ms"]
+
+    response = client.get(f"/runs/{run['id']}/trace", headers=auth_headers)
+    assert response.status_code == 200
+    events = response.json()["traceEvents"]
+    names = {event["name"] for event in events if event["ph"] == "X"}
+    assert {"n1", "serialize", "request", "handler"} <= names
+
+
+def test_record_chain_streams_through_real_nodes(client, auth_headers, in_process_engine, monkeypatch):
+    """
+    Tests a preprocessing -> sentiment -> output workflow over a record list running as a stream.
+    """
+    from neogrid.backend.benchmarks.stubs import StubPipeline
+    from neogrid.backend.nodes import sentiment
+
+    monkeypatch.setattr(sentiment, "sentiment_analyzer_pipeline",
+                        StubPipeline(lambda text: {"label": "NEGATIVE" if "bad" in text else "POSITIVE", "score": 0.9}))
+    config = {
+        "nodes": [
+            {"id": "pre", "data": {"nodeType": "preprocessing_node", "stream_batch_size": 2, "streaming": True,
+                                   "input": ["Great product!", "Bad, BAD service.", "It works.", "bad"]}},
+            {"id": "sent", "data": {"nodeType": "sentiment", "streaming": True, "persist": True}},
+            {"id": "out", "data": {"nodeType": "output_node"}},
+        ],
+        "edges": [{"source": "pre", "target": "sent"}, {"source": "sent", "target": "out"}],
+    }
+    workflow_id = client.post("/workflows/", json={"name": "stream", "config_json": config}, headers=auth_headers).json()["id"]
+    run = client.post(f"/workflow/{workflow_id}/execute", json={"inputs": {}}, headers=auth_headers).json()
+
+    output = run["output_json"]
+    assert output["sent"]["_execution_metadata"]["stream"] == {"batches": 2, "records": 4}
+    assert [r["label"] for r in output["sent"]["output"]] == ["POSITIVE", "NEGATIVE", "POSITIVE", "NEGATIVE"]
+    assert output["out"]["_execution_metadata"]["status"] == "success"
+    assert client.get(f"/runs/{run['id']}/trace", headers=auth_headers).status_code == 200
@@ -0,0 +1,200 @@
+"""
+Length-bucketed batching for the text model nodes.
+
+A batched model call pads every sequence to the longest one in the batch, so a batch mixing
+tweets and reports spends most of its compute on padding. `run_batched()` instead:
+
+1. counts the tokens of each input with the pipeline's tokenizer;
+2. applies the node's long-input policy to inputs over the model's limit: `truncate` (keep the
+   first tokens), `chunk` (split into windows that fit, overlapping by the node's
+   NEUROGRID_CHUNK_OVERLAP tokens, and combine the per-window outputs) or `error` (reject the
+   request);
+3. groups the inputs (or pieces) into length buckets, sorts them by length and calls the model
+   once per batch of at most NEUROGRID_TEXT_BATCH_SIZE inputs from the same bucket;
+4. reports real and padding tokens of every model call to `neurogrid_batch_tokens_total`.
+
+Repeated texts within a request are run once.
+
+Outputs come back in input order.
+"""
+
+import copy
+import os
+from collections import defaultdict
+
+from . import metrics
+
+# --- Configuration ---
+TEXT_BATCH_SIZE = int(os.getenv("NEUROGRID_TEXT_BATCH_SIZE", "16"))
+# Upper token bounds of the length buckets; longer inputs share the last bucket.
+LENGTH_BUCKETS = tuple(
+    int(bound) for bound in os.getenv("NEUROGRID_LENGTH_BUCKETS", "32,64,128,256,512,1024").split(",") if bound.strip()
+)
+LONG_INPUT_POLICIES = {"sentiment": "chunk", "summarizer": "chunk"}
+LONG_INPUT_POLICIES.update(
+    part.strip().split("=", 1)
+    for part in os.getenv("NEUROGRID_LONG_INPUT_POLICY", "").split(",")
+    if "=" in part
+)
+# Tokens shared by consecutive windows of a chunked input, so text cut at a window boundary is
+# also seen in context. Capped at half a window; summaries would repeat overlapping text.
+CHUNK_OVERLAP = {"sentiment": 64, "summarizer": 0}
+CHUNK_OVERLAP.update(
+    (node_type.strip(), int(tokens))
+    for node_type, tokens in (
+        part.split("=", 1) for part in os.getenv("NEUROGRID_CHUNK_OVERLAP", "").split(",") if "=" in part
+    )
+)
+# Token limits used when the tokenizer does not report a usable model_max_length.
+DEFAULT_MAX_TOKENS = {"sentiment": 512, "summarizer": 1024}
+
+POLICIES = ("truncate", "chunk", "error")
+
+
+class InputTooLong(ValueError):
+    """Raised under the `error` policy for inputs over the model's token limit."""
+
+
+def texts_from_input(value, text_field: str = "text") -> tuple:
+    """
+    Texts of a node input: a string, a list of strings or records (read from `text_field`), or a
+    preprocessing envelope `{"data": ...}`. Returns (texts, whether the input was a batch).
+    """
+    if isinstance(value, dict) and "data" in value:
+        value = value["data"]
+    if isinstance(value, list):
+        return [item.get(text_field, "") if isinstance(item, dict) else str(item) for item in value], True
+    return [value], False
+
+
+def long_input_policy(node_type: str, override: str = None) -> str:
+    """The node's configured policy, or `override` when a request asks for one."""
+    policy = (override or LONG_INPUT_POLICIES.get(node_type, "truncate")).strip()
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown long-input policy '{policy}' for {node_type}; expected one of {POLICIES}")
+    return policy
+
+
+def max_tokens(pipe, node_type: str) -> int:
+    limit = getattr(getattr(pipe, "tokenizer", None), "model_max_length", None)
+    # Tokenizers without a configured limit report a huge sentinel value.
+    if isinstance(limit, int) and 0 < limit < 100_000:
+        return limit
+    return DEFAULT_MAX_TOKENS.get(node_type, 512)
+
+
+def _token_ids(tokenizer, texts):
+    return tokenizer(texts, add_special_tokens=False, truncation=False)["input_ids"]
+
+
+def count_tokens(pipe, texts) -> list:
+    """Token count of each text, falling back to whitespace words for pipelines without a tokenizer."""
+    tokenizer = getattr(pipe, "tokenizer", None)
+    if tokenizer is None:
+        return [len(str(text).split()) for text in texts]
+    return [len(ids) for ids in _token_ids(tokenizer, texts)]
+
+
+def window_starts(length: int, limit: int, overlap: int = 0) -> range:
+    """Start offsets of windows of `limit` tokens, sharing `overlap` tokens, that cover `length` tokens."""
+    overlap = max(0, min(overlap, limit // 2))
+    return range(0, max(length - overlap, 1), limit - overlap)
+
+
+def split_text(pipe, text: str, limit: int, overlap: int = 0) -> list:
+    """
+    Splits a text into windows of at most `limit` tokens, as (piece, tokens). Consecutive
+    windows share `overlap` tokens (at most half a window), so the number of windows grows
+    linearly with the text.
+    """
+    tokenizer = getattr(pipe, "tokenizer", None)
+    if tokenizer is None:
+        words = str(text).split()
+        return [(" ".join(words[i:i + limit]), len(words[i:i + limit]))
+                for i in window_starts(len(words), limit, overlap)]
+    ids = _token_ids(tokenizer, [text])[0]
+    return [(tokenizer.decode(ids[i:i + limit], skip_special_tokens=True), len(ids[i:i + limit]))
+            for i in window_starts(len(ids), limit, overlap)]
+
+
+def bucket_of(length: int, buckets=LENGTH_BUCKETS) -> int:
+    for bound in buckets:
+        if length <= bound:
+            return bound
+    return buckets[-1] if buckets else length
+
+
+def plan_batches(lengths, batch_size: int = None, buckets=None) -> list:
+    """Groups item indices into batches of similar length: by bucket, then sorted by length."""
+    batch_size = batch_size or TEXT_BATCH_SIZE
+    buckets = LENGTH_BUCKETS if buckets is None else buckets
+    by_bucket = defaultdict(list)
+    for index, length in enumerate(lengths):
+        by_bucket[bucket_of(length, buckets)].append(index)
+    batches = []
+    for bound in sorted(by_bucket):
+        members = sorted(by_bucket[bound], key=lambda i: lengths[i])
+        batches.extend(members[i:i + batch_size] for i in range(0, len(members), batch_size))
+    return batches
+
+
+def padding_stats(batch_lengths) -> tuple:
+    """(real tokens, padding tokens) of one batch padded to its longest member."""
+    real = sum(batch_lengths)
+    return real, len(batch_lengths) * max(batch_lengths, default=0) - real
+
+
+def run_batched(pipe, texts, node_type: str, combine=None, policy: str = None, **call_kwargs) -> list:
+    """
+    Runs `pipe` over `texts` in length-bucketed batches and returns one output per text.
+    Repeated texts are run once. `combine(pieces)` merges the outputs of a chunked input,
+    given a list of (output, tokens) in text order. `policy` overrides the node's long-input
+    policy.
+    """
+    if len(texts) > 1 and all(isinstance(text, str) for text in texts):
+        unique = list(dict.fromkeys(texts))
+        if len(unique) < len(texts):
+            metrics.deduplicated_items.inc(len(texts) - len(unique), node_type=node_type, kind="in_batch")
+            outputs = dict(zip(unique, _run_batched(pipe, unique, node_type, combine, policy, **call_kwargs)))
+            return [copy.deepcopy(outputs[text]) for text in texts]
+    return _run_batched(pipe, texts, node_type, combine, policy, **call_kwargs)
+
+
+def _run_batched(pipe, texts, node_type: str, combine=None, policy: str = None, **call_kwargs) -> list:
+    policy = long_input_policy(node_type, policy)
+    limit = max_tokens(pipe, node_type)
+    # Leave room for the special tokens the pipeline adds around each piece.
+    piece_limit = max(limit - 2, 1)
+
+    pieces = []  # (owner index, text, tokens)
+    for owner, (text, length) in enumerate(zip(texts, count_tokens(pipe, texts))):
+        if length <= piece_limit:
+            pieces.append((owner, text, length))
+            continue
+        metrics.long_inputs.inc(node_type=node_type, policy=policy)
+        if policy == "error":
+            raise InputTooLong(f"Input {owner} has {length} tokens; the {node_type} model accepts {limit}.")
+        if policy == "truncate":
+            pieces.append((owner, text, piece_limit))
+        else:
+            # Windows of every long input are batched together with the short inputs.
+            overlap = CHUNK_OVERLAP.get(node_type, 0)
+            pieces.extend((owner, piece, tokens) for piece, tokens in split_text(pipe, text, piece_limit, overlap))
+
+    lengths = [tokens for _, _, tokens in pieces]
+    outputs = [None] * len(pieces)
+    for batch in plan_batches(lengths):
+        real, padding = padding_stats([lengths[i] for i in batch])
+        metrics.batch_tokens.inc(real, node_type=node_type, kind="real")
+        metrics.batch_tokens.inc(padding, node_type=node_type, kind="padding")
+        results = pipe([pieces[i][1] for i in batch], batch_size=len(batch), truncation=True, **call_kwargs)
+        for i, result in zip(batch, results):
+            outputs[i] = result[0] if isinstance(result, list) else result
+
+    grouped = defaultdict(list)
+    for (owner, _, tokens), output in zip(pieces, outputs):
+        grouped[owner].append((output, tokens))
+    return [
+        grouped[owner][0][0] if len(grouped[owner]) == 1 or combine is None else combine(grouped[owner])
+        for owner in range(len(texts))
+    ]
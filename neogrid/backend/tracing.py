@@ -0,0 +1,209 @@
+"""
+Per-node execution tracing.
+
+Node endpoints record what they spend time on (model load, inference, cache lookups) into a
+per-request stats dict held in a context variable. `NodeTimingMiddleware` reports those stats
+back in a standard `Server-Timing` response header, which `WorkflowEngine` folds into each
+node's `_execution_metadata` together with its own client-side timings. `to_chrome_trace`
+turns a run's results into Chrome trace-event JSON (chrome://tracing, Perfetto, speedscope).
+"""
+
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict
+
+from . import metrics, profiling, serialization
+
+_node_stats: ContextVar[Dict[str, Any] | None] = ContextVar("neurogrid_node_stats", default=None)
+
+
+def _new_stats(profile_id: str | None = None) -> Dict[str, Any]:
+    return {"timings": {}, "cache": {}, "profile": profile_id}
+
+
+def current_stats() -> Dict[str, Any] | None:
+    """The stats dict of the node request being handled, or None outside a node request."""
+    return _node_stats.get()
+
+
+def add_timing(name: str, seconds: float):
+    stats = _node_stats.get()
+    if stats is not None:
+        stats["timings"][name] = stats["timings"].get(name, 0.0) + seconds * 1000
+
+
+def record_cache(name: str, hit: bool):
+    """Marks a cache lookup (e.g. an already loaded model) as a hit or miss for this request."""
+    stats = _node_stats.get()
+    if stats is not None:
+        stats["cache"][name] = "hit" if hit else "miss"
+
+
+@contextmanager
+def timed(name: str):
+    """Adds the wall time of the enclosed block to the current request's `name` timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, time.perf_counter() - started)
+
+
+def traced_node(fn):
+    """
+    Decorator for node `/infer` handlers. Records handler wall time and the CPU time of the
+    thread running it (sync handlers run on the threadpool, so thread_time is exact), and runs
+    the handler under the profiler when the request belongs to a profile session.
+    The returned dict is encoded here, still on the threadpool, as a `FastJSONResponse`; its
+    encoding time is reported as `encode`.
+    """
+    node_type = fn.__module__.rsplit(".", 1)[-1]
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        stats = _node_stats.get()
+        session = profiling.session_for(stats["profile"] if stats else None)
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            if session is not None:
+                result = session.run_node(node_type, fn, *args, **kwargs)
+            else:
+                result = fn(*args, **kwargs)
+        finally:
+            add_timing("cpu", time.thread_time() - cpu_started)
+            add_timing("handler", time.perf_counter() - wall_started)
+        if isinstance(result, dict):
+            with timed("encode"):
+                result = serialization.FastJSONResponse(result)
+        return result
+    return wrapper
+
+
+def format_server_timing(stats: Dict[str, Any]) -> str:
+    parts = [f"{name};dur={duration:.3f}" for name, duration in stats["timings"].items()]
+    parts += [f'cache-{name};desc="{status}"' for name, status in stats["cache"].items()]
+    return ", ".join(parts)
+
+
+def parse_server_timing(header: str | None) -> Dict[str, Any]:
+    """Parses a Server-Timing header produced by `format_server_timing`."""
+    parsed: Dict[str, Any] = {"timings": {}, "cache": {}}
+    if not header:
+        return parsed
+    for entry in header.split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        for param in params:
+            key, _, value = param.partition("=")
+            if key == "dur":
+                parsed["timings"][name] = float(value)
+            elif key == "desc" and name.startswith("cache-"):
+                parsed["cache"][name[len("cache-"):]] = value.strip('"')
+    return parsed
+
+
+class NodeTimingMiddleware:
+    """ASGI middleware that collects node stats per request and emits them as Server-Timing."""
+
+    def __init__(self, app, path_prefix: str = "/nodes/"):
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        profile_id = headers.get(profiling.PROFILE_HEADER.lower().encode("latin-1"))
+        stats = _new_stats(profile_id.decode("latin-1") if profile_id else None)
+        token = _node_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and (stats["timings"] or stats["cache"]):
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", format_server_timing(stats).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _node_stats.reset(token)
+            # Label from the matched route's template, never the raw path: unmatched requests
+            # (404s) would otherwise add a label value per path a client makes up.
+            parts = (metrics.route_template(scope) or "").strip("/").split("/")
+            if len(parts) == 3 and parts[0] == self.path_prefix.strip("/") and parts[2] == "infer":
+                metrics.record_node_stats(parts[1], stats, time.perf_counter() - started)
+
+
+# --- Trace export ---
+
+def to_chrome_trace(results: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Builds Chrome trace-event JSON from a run's results. Each node gets its own track with
+    queue wait, serialization, failed attempts and backoff, the request that answered and -
+    nested inside it - the server-side model load and inference spans. Server spans are centred
+    in the request, since the network offset is not measured.
+    """
+    events = []
+    run_meta = results.get("_run_metadata", {})
+    events.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "workflow run"}})
+
+    tid = 0
+    for node_id, result in results.items():
+        meta = result.get("_execution_metadata") if isinstance(result, dict) else None
+        if not meta or "timing" not in meta:
+            continue
+        tid += 1
+        timing = meta["timing"]
+        node_type = meta.get("node_type", "")
+        start_us = meta.get("started_at_ms", 0.0) * 1000
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+                       "args": {"name": f"{node_id} ({node_type})"}})
+
+        def span(name, ts_us, dur_ms, args=None):
+            events.append({"name": name, "cat": node_type, "ph": "X", "pid": 1, "tid": tid,
+                           "ts": round(ts_us, 3), "dur": round(dur_ms * 1000, 3), "args": args or {}})
+
+        queue_wait = timing.get("queue_wait_ms", 0.0)
+        if queue_wait:
+            span("queue_wait", start_us - queue_wait * 1000, queue_wait)
+
+        serialize = timing.get("serialize_ms", 0.0)
+        # Failed attempts and the backoff between them come before the attempt that answered.
+        retried = timing.get("failed_attempts_ms", 0.0) + timing.get("retry_wait_ms", 0.0)
+        wall = timing.get("wall_ms", 0.0)
+        total = serialize + retried + wall + timing.get("deserialize_ms", 0.0)
+        span(node_id, start_us, total, {"status": meta.get("status"), **meta.get("payload", {}),
+                                        "cache": meta.get("cache", {})})
+        span("serialize", start_us, serialize)
+        if retried:
+            span("retries", start_us + serialize * 1000, retried, {"attempts": meta.get("attempts")})
+
+        request_start = start_us + (serialize + retried) * 1000
+        span("request", request_start, wall)
+
+        server = timing.get("server_ms")
+        if server is not None:
+            # The handler's position within the request is not measured. Center it: half of the
+            # time outside the handler (network, server queueing) before it, in µs.
+            server_start = request_start + max(0.0, wall - server) / 2 * 1000
+            span("handler", server_start, server, {"cpu_ms": timing.get("cpu_ms")})
+            offset = server_start
+            for phase in ("model_load", "inference"):
+                duration = timing.get(f"{phase}_ms")
+                if duration:
+                    span(phase, offset, duration)
+                    offset += duration * 1000
+
+        span("deserialize", request_start + wall * 1000, timing.get("deserialize_ms", 0.0))
+
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"run_started_at": run_meta.get("started_at"), "run_wall_ms": run_meta.get("wall_ms")},
+    }
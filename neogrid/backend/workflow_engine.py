@@ -1,17 +1,250 @@
 """
 Enhanced Workflow Execution Engine
-Handles sequential node processing with proper data passing between connected nodes.
+Handles node processing with proper data passing between connected nodes. Nodes whose inputs
+are ready run concurrently, up to a per-run limit, in the order given by the cost model (see
+`cost_model`): nodes on the critical path first.
+Node calls get per-node-type timeouts and retries with jittered backoff, and node types that
+keep failing are cut off by a circuit breaker. Descendants of a failed node are skipped, and a
+running workflow can be cancelled. Chains of record-wise nodes that opt in run as overlapping
+stages over record batches (see `streaming`). Outputs of intermediate nodes are freed once all
+their consumers have run, unless the node persists them.
 """
 
 import httpx
 import json
+import os
+import random
+import time
 from typing import Dict, List, Any, Tuple
 from fastapi import HTTPException
 import asyncio
+from contextlib import nullcontext
+
+from . import cluster, cost_model, metrics, serialization, streaming, tracing
+
+# --- Node call policies ---
+# timeout: seconds per attempt; retries: extra attempts after a transient failure;
+# backoff_base/backoff_max: full-jitter exponential backoff between attempts, in seconds.
+DEFAULT_NODE_POLICY = {"timeout": 30.0, "retries": 2, "backoff_base": 0.2, "backoff_max": 5.0}
+NODE_POLICIES = {
+    # The first call of a model node may include the model download and load.
+    "summarizer": {"timeout": 300.0},
+    "image_caption": {"timeout": 300.0},
+    "sentiment": {"timeout": 120.0},
+    "code_analyzer": {"timeout": 10.0},
+    "input_node": {"timeout": 10.0},
+    "preprocessing_node": {"timeout": 60.0},
+    "postprocessing_node": {"timeout": 30.0},
+    "output_node": {"timeout": 30.0},
+}
+
+
+def _parse_policies(value: str) -> Dict[str, Dict[str, float]]:
+    """
+    Parses per-node-type policy overrides, e.g. '{"summarizer": {"timeout": 600, "retries": 0}}'.
+    Malformed JSON and entries that are not objects of known numeric policy keys are reported
+    and skipped rather than failing the app at import.
+    """
+    try:
+        parsed = json.loads(value or "{}")
+    except ValueError as e:
+        print(f"Ignoring NEUROGRID_NODE_POLICIES: not valid JSON ({e}).")
+        return {}
+    if not isinstance(parsed, dict):
+        print("Ignoring NEUROGRID_NODE_POLICIES: expected an object of node type -> policy.")
+        return {}
+    policies = {}
+    for node_type, policy in parsed.items():
+        if not isinstance(policy, dict) or not all(
+                key in DEFAULT_NODE_POLICY and isinstance(number, (int, float)) and not isinstance(number, bool)
+                for key, number in policy.items()):
+            print(f"Ignoring malformed NEUROGRID_NODE_POLICIES entry for '{node_type}'; expected an object "
+                  f"with numeric {', '.join(DEFAULT_NODE_POLICY)}.")
+            continue
+        policies[node_type] = policy
+    return policies
+
+
+for _node_type, _policy in _parse_policies(os.getenv("NEUROGRID_NODE_POLICIES", "")).items():
+    NODE_POLICIES.setdefault(_node_type, {}).update(_policy)
+
+# Responses worth retrying; other 4xx are the caller's fault and other 5xx are node errors.
+RETRY_STATUSES = {429, 502, 503, 504}
+# Failures that say the node type itself is unhealthy and count toward its circuit breaker, next
+# to connection errors and timeouts. A 500 is usually one bad input and 429 is load shedding.
+BREAKER_STATUSES = {502, 503, 504}
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("NEUROGRID_CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("NEUROGRID_CIRCUIT_RESET_SECONDS", "30"))
+# Node calls (or streams) a run has in flight at once; other ready nodes wait by priority.
+RUN_CONCURRENCY = int(os.getenv("NEUROGRID_RUN_CONCURRENCY", "4"))
+# Prioritize ready nodes by the cost model; 0 runs them in topological (FIFO) order.
+COST_AWARE_SCHEDULING = os.getenv("NEUROGRID_COST_AWARE_SCHEDULING", "1") == "1"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a node type whose circuit breaker is open."""
+
+
+class StreamStageFailed(Exception):
+    """Raised by a stream stage whose node returned an error for a batch."""
+
+    def __init__(self, node_id: str, result: Dict):
+        super().__init__(result.get("error"))
+        self.node_id = node_id
+        self.result = result
+
+
+# Marks the end of a stream on a stage's queue.
+_END_OF_STREAM = object()
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. After `threshold` failed calls it opens and fails fast;
+    after `reset_seconds` it lets one trial call through (half-open), whose outcome closes or
+    re-opens it.
+    """
+
+    def __init__(self, threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        # Open, or half-open with a trial call that has not reported back in time.
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            self.state = "half_open"
+            self._opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+class ResultRefs:
+    """
+    Reference counts of node outputs within a run. Each output is held until every consumer
+    of it has run. Then it is dropped from the results, unless its node persists it (terminal
+    nodes do by default). Also tracks the bytes of outputs held, as measured by their response
+    size, to report the run's peak.
+    """
+
+    def __init__(self, graph: Dict[str, List[str]], persisted: set):
+        self.pending = {node_id: len(targets) for node_id, targets in graph.items()}
+        self.persisted = persisted
+        self.sizes: Dict[str, int] = {}
+        self.live_bytes = 0
+        self.peak_bytes = 0
+
+    def hold(self, results: Dict[str, Any], node_id: str):
+        result = results.get(node_id)
+        if not isinstance(result, dict) or "output" not in result:
+            return
+        size = result.get("_execution_metadata", {}).get("payload", {}).get("response_bytes", 0)
+        self.sizes[node_id] = size
+        self.live_bytes += size
+        self.peak_bytes = max(self.peak_bytes, self.live_bytes)
+        if not self.pending.get(node_id):
+            self._release_if_unneeded(results, node_id)
+
+    def consumed(self, results: Dict[str, Any], sources: List[str]):
+        """Records that a consumer of `sources` has run (or was skipped)."""
+        for source in sources:
+            self.pending[source] -= 1
+            if not self.pending[source]:
+                self._release_if_unneeded(results, source)
+
+    def _release_if_unneeded(self, results: Dict[str, Any], node_id: str):
+        if node_id in self.persisted or node_id not in self.sizes:
+            return
+        result = results[node_id]
+        results[node_id] = {key: value for key, value in result.items() if key != "output"}
+        results[node_id].setdefault("_execution_metadata", {})["output_released"] = True
+        self.live_bytes -= self.sizes.pop(node_id)
+
 
 class WorkflowEngine:
-    def __init__(self, base_url: str = "http://127.0.0.1:8000"):
+    def __init__(self, base_url: str = "http://127.0.0.1:8000", transport: httpx.AsyncBaseTransport | None = None,
+                 workers: cluster.WorkerRegistry | None = None, costs: cost_model.CostModel | None = None,
+                 concurrency: int = RUN_CONCURRENCY, cost_aware: bool = COST_AWARE_SCHEDULING,
+                 export_metrics: bool = False):
         self.base_url = base_url
+        # Optional custom transport, e.g. httpx.ASGITransport to call the app in-process.
+        self.transport = transport
+        # Remote node workers; node types without workers are called at `base_url`.
+        self.workers = cluster.worker_registry if workers is None else workers
+        # Latency history per node type, for scheduling and estimates
+        self.costs = cost_model.node_costs if costs is None else costs
+        self.concurrency = max(1, concurrency)
+        self.cost_aware = cost_aware
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        # Only the global engine reports its breakers, so engines built by tests and benchmarks
+        # do not take over the circuit state gauge.
+        self.export_metrics = export_metrics
+        # run id -> task executing it, for cancellation
+        self._active_runs: Dict[Any, asyncio.Task] = {}
+        self._cancel_requested: set = set()
+
+    def node_policy(self, node: Dict) -> Dict[str, float]:
+        """Call policy of a node: defaults, then its node type's policy, then the node's own `policy`."""
+        node_type = node["data"].get("nodeType", "")
+        return {**DEFAULT_NODE_POLICY, **NODE_POLICIES.get(node_type, {}), **(node["data"].get("policy") or {})}
+
+    def breaker_for(self, node_type: str) -> CircuitBreaker:
+        breaker = self.breakers.get(node_type)
+        if breaker is None:
+            breaker = self.breakers[node_type] = CircuitBreaker()
+            if self.export_metrics:
+                metrics.circuit_state.set_function(lambda: {"closed": 0, "half_open": 0.5, "open": 1}[breaker.state],
+                                                   node_type=node_type)
+        return breaker
+
+    def pick_worker(self, node_type: str, exclude=()) -> cluster.Worker | None:
+        """
+        The worker to send the next call of `node_type` to, preferring workers not in `exclude`,
+        or None to call the API process itself.
+        """
+        if not self.workers.hosts(node_type):
+            return None
+        worker = self.workers.pick(node_type, exclude) or self.workers.pick(node_type)
+        if worker is None and not cluster.WORKER_LOCAL_FALLBACK:
+            raise cluster.NoHealthyWorker(f"no healthy worker hosts '{node_type}'")
+        return worker
+
+    def persisted_nodes(self, graph: Dict[str, List[str]], node_lookup: Dict) -> set:
+        """Nodes whose output is kept in the run output: their `persist` flag, by default terminal nodes."""
+        persisted = set()
+        for node_id, node in node_lookup.items():
+            persist = node["data"].get("persist")
+            if (not graph.get(node_id)) if persist is None else bool(persist):
+                persisted.add(node_id)
+        return persisted
+
+    def cancel(self, run_id: Any) -> bool:
+        """
+        Cancels a running workflow. Returns False if no run with this id is executing here.
+        Only the engine side stops: pending node calls are abandoned and no new nodes start,
+        but a node handler that has already started keeps running on its server's threadpool
+        to completion, and its result is discarded.
+        """
+        task = self._active_runs.get(run_id)
+        if task is None or task.done():
+            return False
+        self._cancel_requested.add(run_id)
+        task.cancel()
+        return True
     
     def build_execution_graph(self, nodes: List[Dict], edges: List[Dict]) -> Dict[str, List[str]]:
         """
@@ -131,42 +364,327 @@ class WorkflowEngine:
         
         return payload
     
-    async def execute_node(self, node: Dict, payload: Dict, client: httpx.AsyncClient) -> Dict:
+    async def execute_node(self, node: Dict, payload: Dict, client: httpx.AsyncClient,
+                           ready_at: float | None = None, run_started: float | None = None,
+                           extra_headers: Dict[str, str] | None = None) -> Dict:
         """
         Execute a single node with the given payload.
+        `ready_at` is when the node's inputs became available and `run_started` when the run began
+        (both perf_counter values); they are used for the timing recorded in `_execution_metadata`.
+        `extra_headers` are sent with the node request (e.g. the profile session id).
         """
         node_type = node["data"]["nodeType"]
-        node_url = f"{self.base_url}/nodes/{node_type}/infer"
-        
+
+        dispatched = time.perf_counter()
+        run_started = dispatched if run_started is None else run_started
+        timing = {"queue_wait_ms": round((dispatched - (ready_at or dispatched)) * 1000, 3)}
+        metadata = {
+            "node_id": node["id"],
+            "node_type": node_type,
+            "started_at_ms": round((dispatched - run_started) * 1000, 3),
+            "timing": timing,
+            "payload": {},
+            "cache": {},
+        }
+
+        policy = self.node_policy(node)
+        breaker = self.breaker_for(node_type)
+        metadata["attempts"] = 0
+
         try:
-            response = await client.post(node_url, json=payload, timeout=30.0)
+            started = time.perf_counter()
+            body = serialization.dumps(payload)
+            timing["serialize_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            metadata["payload"]["request_bytes"] = len(body)
+            headers = {"Content-Type": "application/json", **(extra_headers or {})}
+            failed_workers = set()
+
+            for attempt in range(int(policy["retries"]) + 1):
+                if not breaker.allow():
+                    raise CircuitOpen(f"circuit breaker for '{node_type}' is open")
+                metadata["attempts"] = attempt + 1
+                worker = self.pick_worker(node_type, exclude=failed_workers)
+                node_url = f"{worker.url if worker else self.base_url}/nodes/{node_type}/infer"
+                if worker is not None:
+                    metadata["worker"] = worker.url
+                retry_after = None
+                started = time.perf_counter()
+                try:
+                    with self.workers.track(worker) if worker else nullcontext():
+                        response = await asyncio.wait_for(
+                            client.post(node_url, content=body, headers=headers, timeout=policy["timeout"]),
+                            policy["timeout"])
+                except (httpx.TransportError, asyncio.TimeoutError) as e:
+                    failure = e if str(e) else TimeoutError(f"no response within {policy['timeout']}s")
+                    unhealthy = True
+                    if worker is not None:
+                        self.workers.mark_failed(worker)
+                else:
+                    if response.status_code not in RETRY_STATUSES:
+                        break
+                    failure = httpx.HTTPStatusError(f"node returned {response.status_code}",
+                                                    request=response.request, response=response)
+                    retry_after = response.headers.get("retry-after")
+                    unhealthy = response.status_code in BREAKER_STATUSES
+                finally:
+                    timing["wall_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+                if attempt == int(policy["retries"]):
+                    if unhealthy:
+                        breaker.record_failure()
+                    raise failure
+                # wall_ms is the last attempt's; earlier ones are summed apart so traces can place it.
+                timing["failed_attempts_ms"] = round(timing.get("failed_attempts_ms", 0.0) + timing["wall_ms"], 3)
+                if worker is not None:
+                    failed_workers.add(worker.url)
+                    if self.workers.pick(node_type, exclude=failed_workers) is not None:
+                        # Another worker takes the call right away; one worker failing says
+                        # nothing about the node type, so the breaker is left alone.
+                        metrics.worker_failovers.inc(node_type=node_type)
+                        continue
+                if unhealthy:
+                    breaker.record_failure()
+                metrics.node_retries.inc(node_type=node_type)
+                delay = random.uniform(0, min(policy["backoff_max"], policy["backoff_base"] * 2 ** attempt))
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, min(float(retry_after), policy["backoff_max"]))
+                timing["retry_wait_ms"] = round(timing.get("retry_wait_ms", 0.0) + delay * 1000, 3)
+                await asyncio.sleep(delay)
+
+            metadata["payload"]["response_bytes"] = len(response.content)
+
+            server = tracing.parse_server_timing(response.headers.get("server-timing"))
+            for name, duration in server["timings"].items():
+                timing["server_ms" if name == "handler" else f"{name}_ms"] = duration
+            metadata["cache"] = server["cache"]
+
+            # The node type answered. Errors left here (4xx, 500) come from the input, so one
+            # caller's bad requests cannot open the breaker for everyone.
+            breaker.record_success()
             response.raise_for_status()
-            result = response.json()
-            
+            started = time.perf_counter()
+            result = serialization.loads(response.content)
+            timing["deserialize_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
             # Add execution metadata
-            result["_execution_metadata"] = {
-                "node_id": node["id"],
-                "node_type": node_type,
-                "status": "success"
-            }
-            
+            metadata["status"] = "success"
+            result["_execution_metadata"] = metadata
+            self.costs.observe(node_type, len(body), timing["wall_ms"], metadata["payload"]["response_bytes"])
             return result
-            
+
         except Exception as e:
+            metadata["status"] = "error"
             error_result = {
                 "error": f"Error executing node '{node_type}' ({node['id']}): {str(e)}",
-                "_execution_metadata": {
-                    "node_id": node["id"],
-                    "node_type": node_type,
-                    "status": "error"
-                }
+                "_execution_metadata": metadata
             }
             return error_result
     
+    def stream_chains(self, graph: Dict[str, List[str]], execution_order: List[str],
+                      node_lookup: Dict) -> Dict[str, List[str]]:
+        """
+        Finds chains of streaming nodes that can run as stages: each node's only consumer is the
+        next node, and that node's only input is the previous one. Returns first node -> chain.
+        """
+        incoming_count = {node_id: 0 for node_id in graph}
+        for targets in graph.values():
+            for target in targets:
+                incoming_count[target] += 1
+
+        def streamable(node_id):
+            return node_id in node_lookup and streaming.is_streaming(node_lookup[node_id])
+
+        chains, members = {}, set()
+        for node_id in execution_order:
+            if node_id in members or not streamable(node_id):
+                continue
+            chain = [node_id]
+            while len(graph[chain[-1]]) == 1:
+                following = graph[chain[-1]][0]
+                if incoming_count[following] != 1 or not streamable(following):
+                    break
+                chain.append(following)
+            if len(chain) > 1:
+                chains[node_id] = chain
+                members.update(chain)
+        return chains
+
+    async def _execute_stream(self, chain: List[Dict], batches, client: httpx.AsyncClient, run_started: float,
+                              extra_headers: Dict[str, str] | None, persisted: set = frozenset()) -> Dict[str, Dict]:
+        """
+        Runs a chain of streaming nodes over record batches. Each node is a stage calling the node
+        once per batch; stages are connected by bounded queues, so a slow stage blocks its
+        producers. Only the outputs of the last node and of persisted nodes are kept (merged
+        from their batch outputs); the other nodes report how many records they passed on.
+        Returns node id -> result.
+        """
+        queues = [asyncio.Queue(maxsize=streaming.STREAM_QUEUE_SIZE) for _ in chain]
+        batch_results = {node["id"]: [] for node in chain}
+        kept_outputs = {node["id"]: [] for index, node in enumerate(chain)
+                        if index == len(chain) - 1 or node["id"] in persisted}
+
+        async def produce():
+            for batch in batches:
+                await queues[0].put((time.perf_counter(), batch))
+            await queues[0].put((None, _END_OF_STREAM))
+
+        async def run_stage(index):
+            node = chain[index]
+            while True:
+                ready_at, batch = await queues[index].get()
+                if batch is _END_OF_STREAM:
+                    break
+                payload = self.merge_node_parameters(node["data"], {"input": batch})
+                result = await self.execute_node(node, payload, client, ready_at, run_started, extra_headers)
+                if result.get("error"):
+                    raise StreamStageFailed(node["id"], result)
+                output = result.get("output")
+                batch_results[node["id"]].append({
+                    "metadata": result["_execution_metadata"],
+                    "records": len(streaming.records_of(node["data"]["nodeType"], output)),
+                })
+                if node["id"] in kept_outputs:
+                    kept_outputs[node["id"]].append(output)
+                if index + 1 < len(chain):
+                    await queues[index + 1].put((time.perf_counter(), output))
+            if index + 1 < len(chain):
+                await queues[index + 1].put((None, _END_OF_STREAM))
+
+        tasks = [asyncio.ensure_future(produce())] + [asyncio.ensure_future(run_stage(i)) for i in range(len(chain))]
+        failure = None
+        try:
+            await asyncio.gather(*tasks)
+        except StreamStageFailed as e:
+            failure = e
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = {}
+        failed_index = next(i for i, node in enumerate(chain) if node["id"] == failure.node_id) if failure else None
+        for index, node in enumerate(chain):
+            node_id = node["id"]
+            if failure and index > failed_index:
+                results[node_id] = self._not_run_result(node, "skipped", f"upstream node {failure.node_id} did not succeed")
+                continue
+            metadata = self._stream_metadata(node, batch_results[node_id])
+            if failure and index == failed_index:
+                metadata["stream"]["batches"] += 1
+                results[node_id] = {**failure.result, "_execution_metadata": {
+                    **failure.result["_execution_metadata"], "stream": metadata["stream"]}}
+            elif failure:
+                results[node_id] = self._not_run_result(
+                    node, "cancelled", f"stream stopped after node {failure.node_id} failed")
+                results[node_id]["_execution_metadata"]["stream"] = metadata["stream"]
+            elif node_id in kept_outputs:
+                results[node_id] = {"output": streaming.merge_outputs(node["data"]["nodeType"], kept_outputs[node_id]),
+                                    "_execution_metadata": metadata}
+            else:
+                results[node_id] = {"streamed_to": chain[index + 1]["id"], "_execution_metadata": metadata}
+        return results
+
+    def _stream_metadata(self, node: Dict, batches: List[Dict]) -> Dict:
+        """Execution metadata of a stream stage: its batch calls' timings and byte counts summed."""
+        metadata = {
+            "node_id": node["id"],
+            "node_type": node["data"].get("nodeType", ""),
+            "status": "success",
+            "started_at_ms": batches[0]["metadata"]["started_at_ms"] if batches else 0.0,
+            "attempts": 0,
+            "timing": {},
+            "payload": {},
+            "cache": batches[-1]["metadata"].get("cache", {}) if batches else {},
+            "stream": {"batches": len(batches), "records": sum(b["records"] for b in batches)},
+        }
+        for batch in batches:
+            metadata["attempts"] += batch["metadata"].get("attempts", 0)
+            for section in ("timing", "payload"):
+                for name, value in batch["metadata"].get(section, {}).items():
+                    metadata[section][name] = round(metadata[section].get(name, 0) + value, 3)
+        return metadata
+
+    def _not_run_result(self, node: Dict, status: str, reason: str) -> Dict:
+        return {
+            status: reason,
+            "_execution_metadata": {"node_id": node["id"], "node_type": node["data"].get("nodeType", ""),
+                                    "status": status},
+        }
+
+    def plan(self, graph: Dict[str, List[str]], execution_order: List[str], node_lookup: Dict,
+             edges: List[Dict], user_inputs: Dict[str, Any]) -> Tuple[Dict[str, tuple], Dict[str, Any]]:
+        """
+        Predicts every node's input size and latency with the cost model and simulates the run.
+        Returns the dispatch priority of each node (lowest first) and the estimate: completion
+        time, critical path and per-node predictions.
+        """
+        incoming = {node_id: [] for node_id in graph}
+        for source, targets in graph.items():
+            for target in targets:
+                incoming[target].append(source)
+
+        input_bytes, costs, output_bytes = {}, {}, {}
+        for node_id in execution_order:
+            node = node_lookup.get(node_id)
+            if node is None:
+                costs[node_id] = output_bytes[node_id] = 0
+                continue
+            node_type = node["data"].get("nodeType", "")
+            if incoming[node_id]:
+                size = sum(output_bytes[source] for source in incoming[node_id])
+            else:
+                payload = self.merge_node_parameters(
+                    node["data"], self.get_node_inputs(node_id, node["data"], {}, edges, user_inputs))
+                size = len(serialization.dumps(payload))
+            input_bytes[node_id] = size
+            costs[node_id] = self.costs.predict_ms(node_type, size)
+            output_bytes[node_id] = self.costs.predict_output_bytes(node_type, size)
+
+        rank = cost_model.ranks(graph, execution_order, costs)
+        position = {node_id: index for index, node_id in enumerate(execution_order)}
+        if self.cost_aware:
+            # Highest rank first; among equals the cheaper node, which frees its slot sooner.
+            priority = {node_id: (-rank[node_id], costs[node_id], position[node_id]) for node_id in graph}
+        else:
+            priority = {node_id: (position[node_id],) for node_id in graph}
+        times = cost_model.simulate(graph, costs, priority, self.concurrency)
+
+        estimate = {
+            "estimated_ms": round(max((finish for _, finish in times.values()), default=0.0), 3),
+            "concurrency": self.concurrency,
+            "critical_path": cost_model.critical_path(graph, rank),
+            "nodes": {
+                node_id: {
+                    "node_type": node_lookup[node_id]["data"].get("nodeType", ""),
+                    "input_bytes": input_bytes[node_id],
+                    "estimated_ms": round(costs[node_id], 3),
+                    "start_ms": round(times[node_id][0], 3),
+                    "finish_ms": round(times[node_id][1], 3),
+                    "samples": self.costs.samples(node_lookup[node_id]["data"].get("nodeType", "")),
+                }
+                for node_id in execution_order if node_id in node_lookup
+            },
+        }
+        return priority, estimate
+
+    def estimate(self, nodes: List[Dict], edges: List[Dict], user_inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Estimated completion time of a run of the workflow with these inputs; see `plan`."""
+        graph = self.build_execution_graph(nodes, edges)
+        execution_order = self.topological_sort(graph)
+        _, estimate = self.plan(graph, execution_order, {node["id"]: node for node in nodes}, edges, user_inputs)
+        return estimate
+
     async def execute_workflow(self, nodes: List[Dict], edges: List[Dict], 
-                             user_inputs: Dict[str, Any]) -> Dict[str, Any]:
+                             user_inputs: Dict[str, Any],
+                             extra_headers: Dict[str, str] | None = None,
+                             run_id: Any = None) -> Dict[str, Any]:
         """
-        Execute the entire workflow with proper sequential processing and data passing.
+        Execute the entire workflow with proper data passing, running ready nodes concurrently.
+        Nodes downstream of a failed node are skipped. Passing `run_id` makes the run
+        cancellable through `cancel(run_id)`; a cancelled run returns the results so far.
+        Outputs of nodes that do not persist are dropped once their consumers have run; the
+        peak size of the outputs held is reported as `_run_metadata.peak_result_bytes`, and the
+        completion time predicted before the run as `_run_metadata.estimated_ms`.
         """
         try:
             # Build execution graph and determine order
@@ -175,37 +693,149 @@ class WorkflowEngine:
             
             # Create node lookup
             node_lookup = {node["id"]: node for node in nodes}
+            priority, estimate = self.plan(graph, execution_order, node_lookup, edges, user_inputs)
             
             results = {}
-            
-            async with httpx.AsyncClient() as client:
+            refs = ResultRefs(graph, self.persisted_nodes(graph, node_lookup))
+            run_started = time.perf_counter()
+            started_at = time.time()
+
+            task = asyncio.ensure_future(self._execute_graph(
+                graph, execution_order, node_lookup, edges, user_inputs, results, run_started, extra_headers, refs,
+                priority, estimate))
+            if run_id is not None:
+                self._active_runs[run_id] = task
+            status = "success"
+            try:
+                await task
+            except asyncio.CancelledError:
+                if run_id not in self._cancel_requested:
+                    raise
+                status = "cancelled"
                 for node_id in execution_order:
-                    if node_id not in node_lookup:
-                        continue
-                    
-                    node = node_lookup[node_id]
-                    
-                    # Determine inputs for this node
-                    computed_inputs = self.get_node_inputs(
-                        node_id, node["data"], results, edges, user_inputs
-                    )
-                    
-                    # Merge with node parameters
-                    payload = self.merge_node_parameters(node["data"], computed_inputs)
-                    
-                    # Execute the node
-                    result = await self.execute_node(node, payload, client)
-                    results[node_id] = result
-                    
-                    # Stop execution if there's an error (optional - can be configured)
-                    if isinstance(result, dict) and result.get("error"):
-                        print(f"Error in node {node_id}: {result['error']}")
-                        # Continue execution for now, but mark the error
-            
+                    if node_id in node_lookup and node_id not in results:
+                        results[node_id] = self._not_run_result(node_lookup[node_id], "cancelled",
+                                                                "run was cancelled")
+            finally:
+                if run_id is not None:
+                    self._active_runs.pop(run_id, None)
+                    self._cancel_requested.discard(run_id)
+
+            if status == "success" and any(isinstance(r, dict) and r.get("error") for r in results.values()):
+                status = "partial"
+            results["_run_metadata"] = {
+                "started_at": started_at,
+                "wall_ms": round((time.perf_counter() - run_started) * 1000, 3),
+                "estimated_ms": estimate["estimated_ms"],
+                "status": status,
+                "peak_result_bytes": refs.peak_bytes,
+            }
             return results
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Workflow execution failed: {str(e)}")
 
+    async def _execute_graph(self, graph: Dict[str, List[str]], execution_order: List[str], node_lookup: Dict,
+                             edges: List[Dict], user_inputs: Dict[str, Any], results: Dict[str, Any],
+                             run_started: float, extra_headers: Dict[str, str] | None, refs: ResultRefs,
+                             priority: Dict[str, tuple], estimate: Dict[str, Any]):
+        # perf_counter timestamps of when each node finished, to derive queue wait
+        finished_at = {}
+        # Nodes that failed or were skipped; their descendants are skipped too.
+        failed = set()
+        incoming = {node_id: [] for node_id in graph}
+        for source, targets in graph.items():
+            for target in targets:
+                incoming[target].append(source)
+        # Inputs each node still waits for; at zero it joins `ready`.
+        waiting = {node_id: len(sources) for node_id, sources in incoming.items()}
+        ready = [node_id for node_id in execution_order if waiting[node_id] == 0]
+        # In-flight task -> the node ids it runs (several for a stream)
+        running: Dict[asyncio.Future, List[str]] = {}
+
+        chains = self.stream_chains(graph, execution_order, node_lookup)
+
+        def finish(node_id):
+            finished_at[node_id] = time.perf_counter()
+            refs.hold(results, node_id)
+            refs.consumed(results, incoming[node_id])
+            for target in graph[node_id]:
+                waiting[target] -= 1
+                if waiting[target] == 0 and target not in results:
+                    ready.append(target)
+
+        async with httpx.AsyncClient(transport=self.transport) as client:
+            try:
+                while ready or running:
+                    ready.sort(key=priority.__getitem__)
+                    while ready and len(running) < self.concurrency:
+                        node_id = ready.pop(0)
+                        if node_id not in node_lookup:
+                            finish(node_id)
+                            continue
+
+                        node = node_lookup[node_id]
+
+                        failed_upstream = [dep for dep in incoming[node_id] if dep in failed]
+                        if failed_upstream:
+                            results[node_id] = self._not_run_result(
+                                node, "skipped", f"upstream node(s) {', '.join(failed_upstream)} did not succeed")
+                            failed.add(node_id)
+                            finish(node_id)
+                            continue
+
+                        # Determine inputs for this node
+                        computed_inputs = self.get_node_inputs(
+                            node_id, node["data"], results, edges, user_inputs
+                        )
+
+                        # Merge with node parameters
+                        payload = self.merge_node_parameters(node["data"], computed_inputs)
+
+                        # Execute a chain of streaming nodes over record batches if its input is a non-empty
+                        # record list; an empty one gets a single ordinary call, like an unstreamed node.
+                        batches = streaming.split_records(
+                            payload.get("input"), int(node["data"].get("stream_batch_size", streaming.STREAM_BATCH_SIZE))
+                        ) if node_id in chains else None
+                        if batches is not None:
+                            chain = [node_lookup[member] for member in chains[node_id]]
+                            task = asyncio.ensure_future(self._execute_stream(
+                                chain, batches, client, run_started, extra_headers, refs.persisted))
+                            running[task] = chains[node_id]
+                        else:
+                            ready_at = max((finished_at[dep] for dep in incoming[node_id] if dep in finished_at),
+                                           default=run_started)
+                            task = asyncio.ensure_future(
+                                self.execute_node(node, payload, client, ready_at, run_started, extra_headers))
+                            running[task] = [node_id]
+                        # Drop the loop's references to the inputs so released outputs can be freed.
+                        del computed_inputs, payload, batches
+
+                    if not running:
+                        continue
+                    done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        members = running.pop(task)
+                        if len(members) > 1:
+                            # A stream: one result per chain member
+                            node_results = task.result()
+                        else:
+                            node_results = {members[0]: task.result()}
+                        results.update(node_results)
+                        for member, result in node_results.items():
+                            metadata = result["_execution_metadata"]
+                            metadata["estimated_ms"] = estimate["nodes"][member]["estimated_ms"]
+                            if metadata["status"] != "success":
+                                if result.get("error"):
+                                    print(f"Error in node {member}: {result['error']}")
+                                failed.add(member)
+                        for member in members:
+                            finish(member)
+            finally:
+                for task in running:
+                    task.cancel()
+                if running:
+                    await asyncio.gather(*running, return_exceptions=True)
+
 # Global workflow engine instance
-workflow_engine = WorkflowEngine()
+workflow_engine = WorkflowEngine(export_metrics=True)